@@ -41,6 +41,14 @@ class BaseAgent(abc.ABC):
 
         pass
 
+    def registerRules(self, rules):
+        """
+        Inspect the rules of the game that is about to start (e.g. the time limits).
+        Called before `BaseAgent.registerInitialState`.
+        """
+
+        pass
+
     def observationFunction(self, state):
         """
         Make an observation on the state of the game.
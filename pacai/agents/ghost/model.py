@@ -0,0 +1,110 @@
+"""
+Models of how ghosts move, for agents that plan against them (e.g. expectimax).
+"""
+
+from pacai.agents.base import BaseAgent
+from pacai.util import lru
+
+DEFAULT_CACHE_SIZE = 2 ** 14
+
+PACMAN_AGENT_INDEX = 0
+
+class GhostModel(object):
+    """
+    Predicts ghost moves using the distribution of a `pacai.agents.ghost.base.GhostAgent`.
+
+    A ghost's distribution only depends on its position, direction, and whether it is scared,
+    along with where pacman is (and the walls, which do not change during a game).
+    So distributions are cached under just that, and shared between all ghosts.
+    """
+
+    def __init__(self, ghostType = 'RandomGhost', cacheSize = DEFAULT_CACHE_SIZE, **ghostArgs):
+        """
+        Args:
+            ghostType: The name of the ghost agent class to model.
+            cacheSize: The number of distributions to cache (per board).
+            ghostArgs: Arguments for the ghost agents.
+        """
+
+        self._ghostType = ghostType
+        self._ghostArgs = ghostArgs
+        self._cacheSize = cacheSize
+
+        # {agentIndex: ghost agent, ...}
+        self._ghosts = {}
+
+        # {walls: LRUCache, ...}
+        self._caches = {}
+        self._lastWalls = None
+        self._lastCache = None
+
+    def getDistribution(self, state, agentIndex):
+        """
+        Get the ghost's possible actions along with their probabilities,
+        as a list of (action, probability) from the most to the least likely.
+        Actions that can't happen are left out.
+        """
+
+        cache = self._getCache(state.getWalls())
+
+        ghostState = state.getAgentState(agentIndex)
+        key = (
+            ghostState.getPosition(),
+            ghostState.getDirection(),
+            ghostState.isScared(),
+            state.getAgentState(PACMAN_AGENT_INDEX).getPosition(),
+        )
+
+        distribution = cache.get(key)
+        if (distribution is None):
+            distribution = self._computeDistribution(state, agentIndex)
+            cache.put(key, distribution)
+
+        return distribution
+
+    def getGhostType(self):
+        return self._ghostType
+
+    def getStats(self):
+        stats = {'hits': 0, 'misses': 0, 'size': 0}
+
+        for cache in self._caches.values():
+            for (key, value) in cache.getStats().items():
+                stats[key] += value
+
+        return stats
+
+    def __getstate__(self):
+        # The caches can be rebuilt, so don't send them along (e.g. to worker processes).
+        state = self.__dict__.copy()
+        state['_caches'] = {}
+        state['_lastWalls'] = None
+        state['_lastCache'] = None
+
+        return state
+
+    def _computeDistribution(self, state, agentIndex):
+        if (agentIndex not in self._ghosts):
+            self._ghosts[agentIndex] = BaseAgent.loadAgent(self._ghostType, agentIndex,
+                    self._ghostArgs)
+
+        distribution = self._ghosts[agentIndex].getDistribution(state)
+        outcomes = [(action, probability) for (action, probability) in distribution.items()
+                if probability > 0]
+
+        # Most likely first, ties in action order (so the order is deterministic).
+        outcomes.sort(key = lambda outcome: (-outcome[1], outcome[0]))
+
+        return tuple(outcomes)
+
+    def _getCache(self, walls):
+        if (walls is self._lastWalls):
+            return self._lastCache
+
+        if (walls not in self._caches):
+            self._caches[walls] = lru.LRUCache(self._cacheSize)
+
+        self._lastWalls = walls
+        self._lastCache = self._caches[walls]
+
+        return self._lastCache
@@ -1,4 +1,4 @@
 """
 The `pacai.agents.learning` package contains only agents that learn from their environment,
-like Q-learning.
+like Q-learning, or that plan over a model of it, like policy iteration.
 """
@@ -0,0 +1,84 @@
+import array
+
+class FeatureWeights(object):
+    """
+    Weights for named features, stored in one flat float array.
+
+    Feature names are interned to dense indices the first time they are seen,
+    and a feature dict (as returned by a `pacai.core.featureExtractors.FeatureExtractor`)
+    is turned into a sparse vector: an index array and a value array.
+    Dot products and updates then only touch the array entries of the vector's features.
+    Unseen features have a weight of 0.0.
+    """
+
+    def __init__(self):
+        self._weights = array.array('d')
+
+        self._indexes = {}
+        self._names = []
+
+    def add(self, vector, scale):
+        """
+        Add a multiple of a sparse vector to the weights.
+        """
+
+        weights = self._weights
+        indexes, values = vector
+
+        for i in range(len(indexes)):
+            weights[indexes[i]] += scale * values[i]
+
+    def dot(self, vector):
+        """
+        Get the dot product of the weights and a sparse vector.
+        """
+
+        weights = self._weights
+        indexes, values = vector
+
+        total = 0.0
+        for i in range(len(indexes)):
+            total += values[i] * weights[indexes[i]]
+
+        return total
+
+    def getIndex(self, name):
+        index = self._indexes.get(name)
+        if (index is None):
+            index = len(self._names)
+            self._indexes[name] = index
+            self._names.append(name)
+            self._weights.append(0.0)
+
+        return index
+
+    def getWeight(self, name):
+        index = self._indexes.get(name)
+        if (index is None):
+            return 0.0
+
+        return self._weights[index]
+
+    def getWeights(self):
+        """
+        Get the weights as a {name: weight} dict.
+        """
+
+        return dict(zip(self._names, self._weights))
+
+    def setWeight(self, name, weight):
+        self._weights[self.getIndex(name)] = weight
+
+    def toSparse(self, features):
+        """
+        Turn a {name: value} feature dict into a sparse (indexes, values) vector.
+        The features keep their (dict) order.
+        """
+
+        indexes = array.array('l', [self.getIndex(name) for name in features])
+        values = array.array('d', features.values())
+
+        return indexes, values
+
+    def __len__(self):
+        return len(self._names)
@@ -0,0 +1,141 @@
+import logging
+import time
+
+from pacai.agents.learning.value import ValueEstimationAgent
+from pacai.core.mdp import CompiledMDP
+
+# A policy only changes for an action this much better, so ties can't make it cycle.
+IMPROVEMENT_EPSILON = 1e-9
+
+class PolicyIterationAgent(ValueEstimationAgent):
+    """
+    A policy iteration agent.
+
+    Like `pacai.student.valueIterationAgent.ValueIterationAgent`,
+    it takes a `pacai.core.mdp.MarkovDecisionProcess` and plans over it on initialization.
+    Starting from an arbitrary policy, it alternates between evaluating the policy
+    and greedily improving it, until the policy stops changing.
+
+    Evaluation is exact (a linear solve) by default,
+    which usually takes only a handful of iterations on mid-sized MDPs.
+    With evalSweeps, the policy is instead evaluated by that many sweeps
+    (modified policy iteration), which is cheaper per iteration on large MDPs.
+
+    The MDP is planned over in its `pacai.core.mdp.CompiledMDP` form.
+    """
+
+    def __init__(self, index, mdp, gamma = 0.9, iters = 100, evalSweeps = 0,
+            tolerance = 1e-6, **kwargs):
+        """
+        Args:
+            mdp: The `pacai.core.mdp.MarkovDecisionProcess` to plan over.
+            gamma: The discount factor.
+            iters: The most policy iterations to run.
+            evalSweeps: Evaluate each policy with this many sweeps (0 for an exact solve).
+            tolerance: With evalSweeps, also wait for no value to change by more than this.
+        """
+
+        super().__init__(index, gamma = gamma, **kwargs)
+
+        self.mdp = mdp
+        self.iters = int(iters)
+        self.evalSweeps = int(evalSweeps)
+        self.tolerance = float(tolerance)
+
+        startTime = time.time()
+
+        self.compiledMDP = CompiledMDP(mdp)
+        self.numIterations = 0
+        self._run()
+
+        self.runTime = time.time() - startTime
+
+        logging.debug('Policy iteration ran %d iterations in %.3f seconds.' %
+                (self.numIterations, self.runTime))
+
+    def getAction(self, state):
+        """
+        Returns the policy at the state (no exploration).
+        """
+
+        return self.getPolicy(state)
+
+    def getPolicy(self, state):
+        if (state in self.policy):
+            return self.policy[state]
+
+        # States outside of the mdp (e.g. walls asked about by a display) take any action.
+        actions = self.mdp.getPossibleActions(state)
+        if (len(actions) == 0):
+            return None
+
+        return actions[0]
+
+    def getQValue(self, state, action):
+        if (state not in self.values):
+            return 0.0
+
+        row = self.compiledMDP.getRow(self.compiledMDP.getStateId(state), action)
+        if (row is None):
+            return 0.0
+
+        return self.compiledMDP.getRowValue(row, self.valueList, self.discountRate)
+
+    def getValue(self, state):
+        return self.values.get(state, 0.0)
+
+    def _improve(self, policyRows, values):
+        """
+        Get the greedy policy for the values,
+        keeping the current row of a state unless another is strictly better.
+        """
+
+        compiled = self.compiledMDP
+        newRows = []
+
+        for stateId in range(compiled.getNumStates()):
+            value, row = compiled.backup(stateId, values, self.discountRate)
+
+            oldRow = policyRows[stateId]
+            if (oldRow is not None and row is not None and compiled.getRowValue(oldRow, values,
+                    self.discountRate) >= value - IMPROVEMENT_EPSILON):
+                row = oldRow
+
+            newRows.append(row)
+
+        return newRows
+
+    def _run(self):
+        compiled = self.compiledMDP
+        states = compiled.getStates()
+
+        # Start with the first action of every state.
+        policyRows = []
+        for stateId in range(len(states)):
+            rows = compiled.getRows(stateId)
+            if (len(rows) == 0):
+                policyRows.append(None)
+            else:
+                policyRows.append(rows[0])
+
+        values = [0.0] * len(states)
+
+        for i in range(self.iters):
+            newValues = compiled.evaluatePolicy(policyRows, self.discountRate, values,
+                    sweeps = self.evalSweeps)
+            change = max([abs(new - old) for (new, old) in zip(newValues, values)], default = 0.0)
+            values = newValues
+
+            self.numIterations += 1
+
+            newRows = self._improve(policyRows, values)
+            stable = (newRows == policyRows)
+            policyRows = newRows
+
+            if (stable and (self.evalSweeps == 0 or change <= self.tolerance)):
+                break
+
+        self.valueList = values
+        self.values = dict(zip(states, values))
+        self.policy = {state: (row if row is None else compiled.getRowAction(row))
+                for (state, row) in zip(states, policyRows)}
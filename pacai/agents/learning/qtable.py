@@ -0,0 +1,152 @@
+import array
+
+# The number of action columns a table starts with (it grows if more actions are seen).
+DEFAULT_WIDTH = 8
+
+# The number of recently seen states that are remembered by identity.
+NUM_RECENT_STATES = 2
+
+class QTable(object):
+    """
+    A table of Q-values for discrete states and actions, stored in one flat float array.
+
+    States and actions are interned to dense ids the first time they are seen,
+    and the Q-value of (state id, action id) is at `stateId * width + actionId`.
+    Unseen pairs have a Q-value of 0.0.
+
+    Interning a state is a single dict lookup (game states cache their hash),
+    and the last few states are also remembered by identity,
+    since a learner sees the same state object in `getAction` and then in `update`.
+    """
+
+    def __init__(self, width = DEFAULT_WIDTH):
+        self._width = width
+        self._values = array.array('d')
+
+        self._stateIds = {}
+        self._actionIds = {}
+        self._actions = []
+
+        # [(state, stateId), ...], most recent last.
+        self._recent = []
+
+    def getActionId(self, action):
+        actionId = self._actionIds.get(action)
+        if (actionId is not None):
+            return actionId
+
+        actionId = len(self._actions)
+        self._actionIds[action] = actionId
+        self._actions.append(action)
+
+        if (actionId >= self._width):
+            self._widen(2 * self._width)
+
+        return actionId
+
+    def getActions(self):
+        return self._actions
+
+    def getBest(self, stateId, actions):
+        """
+        Get the (value, action) of the best of the given actions in a state,
+        or (0.0, None) if there are no actions.
+        Ties go to the earliest action.
+        """
+
+        # Intern the actions first, since a new action may widen the table.
+        actionIds = [self.getActionId(action) for action in actions]
+
+        values = self._values
+        base = stateId * self._width
+
+        bestValue = 0.0
+        bestAction = None
+
+        for (action, actionId) in zip(actions, actionIds):
+            value = values[base + actionId]
+            if (bestAction is None or value > bestValue):
+                bestValue = value
+                bestAction = action
+
+        return bestValue, bestAction
+
+    def getStates(self):
+        """
+        Get the interned states, in id order.
+        """
+
+        states = [None] * len(self._stateIds)
+        for (state, stateId) in self._stateIds.items():
+            states[stateId] = state
+
+        return states
+
+    def getStateId(self, state):
+        for (recentState, stateId) in self._recent:
+            if (recentState is state):
+                return stateId
+
+        stateId = self._stateIds.get(state)
+        if (stateId is None):
+            stateId = len(self._stateIds)
+            self._stateIds[state] = stateId
+            self._values.extend([0.0] * self._width)
+
+        self._recent.append((state, stateId))
+        if (len(self._recent) > NUM_RECENT_STATES):
+            self._recent.pop(0)
+
+        return stateId
+
+    def getValue(self, stateId, actionId):
+        return self._values[stateId * self._width + actionId]
+
+    def getValues(self):
+        """
+        Get the flat array of Q-values (row `stateId`, column `actionId`).
+        """
+
+        return self._values
+
+    def getWidth(self):
+        return self._width
+
+    def load(self, states, actions, width, values):
+        """
+        Replace the whole table with interned states and actions (in id order),
+        and a flat array of their Q-values laid out with the given width.
+        """
+
+        if (len(values) != len(states) * width or len(actions) > width):
+            raise ValueError('%d Q-values do not fit %d states by %d actions (width %d).' %
+                    (len(values), len(states), len(actions), width))
+
+        self._width = width
+        self._values = values
+
+        self._stateIds = {state: stateId for (stateId, state) in enumerate(states)}
+        self._actionIds = {action: actionId for (actionId, action) in enumerate(actions)}
+        self._actions = list(actions)
+
+        self._recent = []
+
+    def setValue(self, stateId, actionId, value):
+        self._values[stateId * self._width + actionId] = value
+
+    def __len__(self):
+        return len(self._stateIds)
+
+    def _widen(self, width):
+        """
+        Re-layout the table with more action columns.
+        """
+
+        values = array.array('d', [0.0] * (len(self._stateIds) * width))
+        for stateId in range(len(self._stateIds)):
+            old = stateId * self._width
+            new = stateId * width
+            values[new:new + self._width] = self._values[old:old + self._width]
+
+        self._width = width
+        self._values = values
@@ -2,7 +2,11 @@ import abc
 import logging
 import time
 
+from pacai.agents.learning.replay import DEFAULT_BATCH_SIZE
+from pacai.agents.learning.replay import DEFAULT_IMPORTANCE_EXPONENT
+from pacai.agents.learning.replay import ReplayBuffer
 from pacai.agents.learning.value import ValueEstimationAgent
+from pacai.util import util
 
 class ReinforcementAgent(ValueEstimationAgent):
     """
@@ -12,10 +16,17 @@ class ReinforcementAgent(ValueEstimationAgent):
     The environment will call `ReinforcementAgent.observeTransition`,
     which will then call `ReinforcementAgent.update` (which you should override).
     Use `ReinforcementAgent.getLegalActions` to know which actions are available in a state.
+
+    With a replay size, observed (training) transitions are instead kept in a
+    `pacai.agents.learning.replay.ReplayBuffer`, and every few transitions
+    a minibatch sampled from it is passed to `ReinforcementAgent.update`.
+    With prioritized replay, transitions are sampled by their last TD error,
+    and each update's learning rate is scaled by the transition's importance weight.
     """
 
     def __init__(self, index, actionFn = None, numTraining = 100, epsilon = 0.5,
-            alpha = 0.5, gamma = 1, **kwargs):
+            alpha = 0.5, gamma = 1, replaySize = 0, replayBatch = DEFAULT_BATCH_SIZE,
+            replayEvery = None, prioritizedReplay = False, **kwargs):
         """
         Args:
             actionFn: A function which takes a state and returns the list of legal actions.
@@ -23,6 +34,14 @@ class ReinforcementAgent(ValueEstimationAgent):
             epsilon: The exploration rate.
             gamma: The discount factor.
             numTraining: The number of training episodes.
+            replaySize: The number of transitions to remember for replay (0 for no replay).
+            replayBatch: The number of transitions replayed per minibatch.
+            replayEvery: Replay a minibatch every this many observed transitions
+                         (defaults to replayBatch).
+                         Each replayed transition costs an update,
+                         so replaying more often than that makes learning
+                         replayBatch / replayEvery times slower than without replay.
+            prioritizedReplay: Sample transitions to replay by priority (instead of uniformly).
         """
         super().__init__(index, **kwargs)
 
@@ -38,6 +57,17 @@ class ReinforcementAgent(ValueEstimationAgent):
         self.alpha = float(alpha)
         self.discountRate = float(gamma)
 
+        self.replayBuffer = None
+        self.replayBatch = int(replayBatch)
+        self.replayEvery = self.replayBatch
+        if (replayEvery is not None):
+            self.replayEvery = int(replayEvery)
+
+        self.numObserved = 0
+        if (int(replaySize) > 0):
+            self.replayBuffer = ReplayBuffer(int(replaySize),
+                    prioritized = util.parseBool(prioritizedReplay))
+
     @abc.abstractmethod
     def update(self, state, action, nextState, reward):
         """
@@ -74,7 +104,50 @@ class ReinforcementAgent(ValueEstimationAgent):
         """
 
         self.episodeRewards += deltaReward
-        self.update(state, action, nextState, deltaReward)
+
+        if (self.replayBuffer is None or not self.isInTraining()):
+            self.update(state, action, nextState, deltaReward)
+            return
+
+        terminal = (len(self.getLegalActions(nextState)) == 0)
+        self.replayBuffer.add(state, action, nextState, deltaReward, terminal)
+
+        self.numObserved += 1
+        if (self.numObserved % self.replayEvery == 0):
+            self.replay()
+
+    def replay(self):
+        """
+        Sample a minibatch from the replay buffer and update on each of its transitions.
+        """
+
+        buffer = self.replayBuffer
+        indexes = buffer.sample(self.replayBatch)
+
+        if (not buffer.isPrioritized()):
+            for index in indexes:
+                state, action, nextState, reward, terminal = buffer.getTransition(index)
+                self.update(state, action, nextState, reward)
+
+            return
+
+        alpha = self.alpha
+        weights = buffer.getImportanceWeights(indexes, DEFAULT_IMPORTANCE_EXPONENT)
+
+        try:
+            for (index, weight) in zip(indexes, weights):
+                state, action, nextState, reward, terminal = buffer.getTransition(index)
+
+                error = reward - self.getQValue(state, action)
+                if (not terminal):
+                    error += self.discountRate * self.getValue(nextState)
+
+                self.alpha = alpha * weight
+                self.update(state, action, nextState, reward)
+
+                buffer.setPriority(index, error)
+        finally:
+            self.alpha = alpha
 
     def startEpisode(self):
         """
@@ -0,0 +1,221 @@
+import array
+import random
+
+# The default number of transitions sampled per replayed minibatch.
+DEFAULT_BATCH_SIZE = 32
+
+# How strongly priorities skew sampling (0 is uniform sampling).
+DEFAULT_PRIORITY_EXPONENT = 0.6
+
+# How strongly sampled transitions are re-weighted to undo the skew (1 undoes it fully).
+DEFAULT_IMPORTANCE_EXPONENT = 0.4
+
+# Added to every priority, so every transition can still be sampled again.
+PRIORITY_EPSILON = 1e-3
+
+class ReplayBuffer(object):
+    """
+    A bounded (ring) memory of observed transitions, to learn from again.
+
+    Transitions are stored in compact arrays:
+    (state id, action id, reward, next state id, terminal).
+    States and actions are interned to ids, and a state is forgotten (and its id reused)
+    once the last transition that mentions it is overwritten.
+
+    Minibatches are sampled uniformly, or (when prioritized) in proportion to
+    each transition's priority (its last TD error) raised to the priority exponent.
+    Prioritized sampling is backed by a sum tree, so sampling and updating a priority
+    take time logarithmic in the capacity.
+    """
+
+    def __init__(self, capacity, prioritized = False,
+            priorityExponent = DEFAULT_PRIORITY_EXPONENT):
+        if (capacity <= 0):
+            raise ValueError('A replay buffer needs a positive capacity, got %d.' % (capacity))
+
+        self._capacity = capacity
+        self._prioritized = prioritized
+        self._priorityExponent = priorityExponent
+
+        self._size = 0
+        # Where the next transition goes.
+        self._next = 0
+
+        self._stateIds = array.array('l', [0] * capacity)
+        self._actionIds = array.array('l', [0] * capacity)
+        self._rewards = array.array('d', [0.0] * capacity)
+        self._nextStateIds = array.array('l', [0] * capacity)
+        self._terminals = array.array('b', [0] * capacity)
+
+        self._states = []
+        self._stateRefs = array.array('l')
+        self._stateIdMap = {}
+        self._freeStateIds = []
+
+        self._actions = []
+        self._actionIdMap = {}
+
+        # A sum tree over the (skewed) priorities, with the leaves at [numLeaves, 2 * numLeaves).
+        self._numLeaves = 1
+        while (self._numLeaves < capacity):
+            self._numLeaves *= 2
+
+        self._tree = None
+        self._maxPriority = 1.0
+        if (prioritized):
+            self._tree = array.array('d', [0.0] * (2 * self._numLeaves))
+
+    def add(self, state, action, nextState, reward, terminal):
+        """
+        Remember a transition, overwriting the oldest one if the buffer is full.
+        New transitions get the highest priority seen so far, so they are sampled soon.
+        Returns the transition's index.
+        """
+
+        index = self._next
+
+        if (self._size == self._capacity):
+            self._releaseState(self._stateIds[index])
+            self._releaseState(self._nextStateIds[index])
+        else:
+            self._size += 1
+
+        self._stateIds[index] = self._internState(state)
+        self._actionIds[index] = self._internAction(action)
+        self._rewards[index] = reward
+        self._nextStateIds[index] = self._internState(nextState)
+        self._terminals[index] = int(terminal)
+
+        if (self._prioritized):
+            self._setLeaf(index, self._maxPriority ** self._priorityExponent)
+
+        self._next = (index + 1) % self._capacity
+        return index
+
+    def getCapacity(self):
+        return self._capacity
+
+    def getImportanceWeights(self, indexes, importanceExponent = DEFAULT_IMPORTANCE_EXPONENT):
+        """
+        Get the weights that correct for prioritized sampling of the transitions,
+        scaled so the largest is 1.0.
+        Without prioritization, every weight is 1.0.
+        """
+
+        if (not self._prioritized):
+            return [1.0] * len(indexes)
+
+        total = self._tree[1]
+        weights = []
+        for index in indexes:
+            probability = self._tree[self._numLeaves + index] / total
+            weights.append((self._size * probability) ** -importanceExponent)
+
+        maxWeight = max(weights, default = 1.0)
+        return [weight / maxWeight for weight in weights]
+
+    def getNumStates(self):
+        """
+        Get the number of distinct states the stored transitions mention.
+        """
+
+        return len(self._stateIdMap)
+
+    def getTransition(self, index):
+        """
+        Get a stored transition as (state, action, nextState, reward, terminal).
+        """
+
+        return (self._states[self._stateIds[index]], self._actions[self._actionIds[index]],
+                self._states[self._nextStateIds[index]], self._rewards[index],
+                bool(self._terminals[index]))
+
+    def isPrioritized(self):
+        return self._prioritized
+
+    def sample(self, batchSize = DEFAULT_BATCH_SIZE):
+        """
+        Sample the indexes of a minibatch of transitions (with replacement).
+        """
+
+        if (self._size == 0):
+            return []
+
+        if (not self._prioritized):
+            return [random.randrange(self._size) for i in range(batchSize)]
+
+        tree = self._tree
+        numLeaves = self._numLeaves
+
+        indexes = []
+        for i in range(batchSize):
+            target = random.random() * tree[1]
+
+            node = 1
+            while (node < numLeaves):
+                node *= 2
+                if (target >= tree[node] and tree[node + 1] > 0.0):
+                    target -= tree[node]
+                    node += 1
+
+            indexes.append(node - numLeaves)
+
+        return indexes
+
+    def setPriority(self, index, error):
+        """
+        Set the priority of a transition from the magnitude of its (TD) error.
+        """
+
+        priority = abs(error) + PRIORITY_EPSILON
+        self._maxPriority = max(self._maxPriority, priority)
+
+        self._setLeaf(index, priority ** self._priorityExponent)
+
+    def __len__(self):
+        return self._size
+
+    def _internAction(self, action):
+        actionId = self._actionIdMap.get(action)
+        if (actionId is None):
+            actionId = len(self._actions)
+            self._actionIdMap[action] = actionId
+            self._actions.append(action)
+
+        return actionId
+
+    def _internState(self, state):
+        stateId = self._stateIdMap.get(state)
+        if (stateId is None):
+            if (len(self._freeStateIds) > 0):
+                stateId = self._freeStateIds.pop()
+                self._states[stateId] = state
+            else:
+                stateId = len(self._states)
+                self._states.append(state)
+                self._stateRefs.append(0)
+
+            self._stateIdMap[state] = stateId
+
+        self._stateRefs[stateId] += 1
+        return stateId
+
+    def _releaseState(self, stateId):
+        self._stateRefs[stateId] -= 1
+        if (self._stateRefs[stateId] > 0):
+            return
+
+        del self._stateIdMap[self._states[stateId]]
+        self._states[stateId] = None
+        self._freeStateIds.append(stateId)
+
+    def _setLeaf(self, index, value):
+        tree = self._tree
+
+        node = self._numLeaves + index
+        tree[node] = value
+
+        node //= 2
+        while (node >= 1):
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+            node //= 2
@@ -0,0 +1,151 @@
+"""
+Saving and loading what a `pacai.agents.learning.reinforcement.ReinforcementAgent` has learned,
+so that it can be warm-started (e.g. for evaluation) instead of retrained.
+
+Learned parameters are saved in two files:
+the parameters themselves, as a flat binary array of little-endian doubles (at the given path),
+and a small pickled sidecar (at the path plus `SIDECAR_EXTENSION`)
+with what the array's entries are for.
+
+Q-values (from `pacai.student.qlearningAgents.QLearningAgent`) are saved in the layout of a
+`pacai.agents.learning.qtable.QTable`: the sidecar has the states and actions (in id order),
+and the array has a row of Q-values per state.
+Weights (from `pacai.student.qlearningAgents.ApproximateQAgent`) are saved as the sidecar's
+feature names and an array of their weights.
+
+Either Q-value backend (dict or array table) can load Q-values saved by either.
+"""
+
+import array
+import logging
+import os
+import pickle
+import sys
+
+from pacai.agents.learning.qtable import QTable
+from pacai.agents.learning.reinforcement import ReinforcementAgent
+from pacai.student.qlearningAgents import QLearningAgent
+
+# The version of the saved format, bumped on incompatible changes.
+FORMAT_VERSION = 1
+
+# Appended to the parameters' path to get the sidecar's.
+SIDECAR_EXTENSION = '.keys'
+
+KIND_Q_VALUES = 'q-values'
+KIND_WEIGHTS = 'weights'
+
+def loadWeights(agent, path):
+    """
+    Load saved (by `saveWeights`) parameters into an agent, replacing what it has learned.
+    """
+
+    path = os.path.expanduser(path)
+
+    with open(path + SIDECAR_EXTENSION, 'rb') as file:
+        sidecar = pickle.load(file)
+
+    if (sidecar.get('version') != FORMAT_VERSION):
+        raise ValueError('Unsupported weights format version (%s) in %s.' %
+                (sidecar.get('version'), path + SIDECAR_EXTENSION))
+
+    values = array.array('d')
+    with open(path, 'rb') as file:
+        values.fromfile(file, sidecar['count'])
+
+    if (sys.byteorder == 'big'):
+        values.byteswap()
+
+    if (sidecar['kind'] == KIND_WEIGHTS):
+        if (not hasattr(agent, 'setWeights')):
+            raise ValueError('Cannot load weights into an agent without weights (%s).' %
+                    (agent.__class__.__name__))
+
+        agent.setWeights(dict(zip(sidecar['features'], values)))
+    elif (sidecar['kind'] == KIND_Q_VALUES):
+        _loadQValues(agent, sidecar['states'], sidecar['actions'], sidecar['width'], values)
+    else:
+        raise ValueError('Unknown kind of weights (%s) in %s.' %
+                (sidecar['kind'], path + SIDECAR_EXTENSION))
+
+    logging.info('Loaded %d learned %s from %s.' % (len(values), sidecar['kind'], path))
+
+def saveWeights(agent, path):
+    """
+    Save what an agent has learned (its weights or Q-values).
+    Both files are replaced atomically, so an interrupted save never leaves a broken one.
+    """
+
+    if (not isinstance(agent, ReinforcementAgent)):
+        raise ValueError('Only reinforcement agents have weights to save, got %s.' %
+                (agent.__class__.__name__))
+
+    if (hasattr(agent, 'getWeights')):
+        weights = agent.getWeights()
+
+        sidecar = {'kind': KIND_WEIGHTS, 'features': list(weights.keys())}
+        values = array.array('d', weights.values())
+    else:
+        table = _getQTable(agent)
+
+        sidecar = {
+            'kind': KIND_Q_VALUES,
+            'states': table.getStates(),
+            'actions': list(table.getActions()),
+            'width': table.getWidth(),
+        }
+        values = table.getValues()
+
+    sidecar['version'] = FORMAT_VERSION
+    sidecar['count'] = len(values)
+
+    path = os.path.expanduser(path)
+    directory = os.path.dirname(path)
+    if (directory != ''):
+        os.makedirs(directory, exist_ok = True)
+
+    if (sys.byteorder == 'big'):
+        values = array.array('d', values)
+        values.byteswap()
+
+    with open(path + '.tmp', 'wb') as file:
+        values.tofile(file)
+
+    with open(path + SIDECAR_EXTENSION + '.tmp', 'wb') as file:
+        pickle.dump(sidecar, file)
+
+    os.replace(path + '.tmp', path)
+    os.replace(path + SIDECAR_EXTENSION + '.tmp', path + SIDECAR_EXTENSION)
+
+    logging.info('Saved %d learned %s to %s.' % (sidecar['count'], sidecar['kind'], path))
+    return path
+
+def _getQTable(agent):
+    """
+    Get an agent's Q-values as a `pacai.agents.learning.qtable.QTable`.
+    """
+
+    if (getattr(agent, 'qTable', None) is not None):
+        return agent.qTable
+
+    table = QTable()
+    for ((state, action), value) in agent.values.items():
+        table.setValue(table.getStateId(state), table.getActionId(action), value)
+
+    return table
+
+def _loadQValues(agent, states, actions, width, values):
+    if (not isinstance(agent, QLearningAgent)):
+        raise ValueError('Cannot load Q-values into an agent without Q-values (%s).' %
+                (agent.__class__.__name__))
+
+    if (getattr(agent, 'qTable', None) is not None):
+        agent.qTable.load(states, actions, width, values)
+        return
+
+    agent.values = {}
+    for (stateId, state) in enumerate(states):
+        for (actionId, action) in enumerate(actions):
+            value = values[stateId * width + actionId]
+            if (value != 0.0):
+                agent.values[state, action] = value
@@ -0,0 +1,974 @@
+"""
+A reusable engine for depth-limited adversarial search (minimax, alpha-beta, and expectimax)
+backed by a transposition table.
+
+The same position is often reached through different move orders
+(e.g. pacman moving east then north, or north then east).
+The transposition table remembers the value of positions that have already been searched,
+so they do not need to be expanded again.
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from pacai.agents.ghost.model import GhostModel
+from pacai.agents.search import book
+from pacai.agents.search import ordering
+from pacai.agents.search.multiagent import MultiAgentSearchAgent
+from pacai.core import endgame
+from pacai.core.directions import Directions
+from pacai.util import util
+
+MODE_MINIMAX = 'minimax'
+MODE_ALPHA_BETA = 'alphabeta'
+MODE_EXPECTIMAX = 'expectimax'
+MODES = [MODE_MINIMAX, MODE_ALPHA_BETA, MODE_EXPECTIMAX]
+
+DEFAULT_TABLE_SIZE = 2 ** 16
+
+# How expectimax handles chance nodes (below the fully expanded plies):
+# expand every outcome, expand only the most likely outcomes, or sample outcomes.
+CHANCE_FULL = 'full'
+CHANCE_TOP = 'top'
+CHANCE_SAMPLE = 'sample'
+CHANCE_MODES = [CHANCE_FULL, CHANCE_TOP, CHANCE_SAMPLE]
+
+# The number of outcomes to expand (or sample) at a reduced chance node.
+DEFAULT_CHANCE_OUTCOMES = 2
+
+# The deepest an iterative deepening search will go if it never runs out of time.
+DEFAULT_MAX_DEPTH = 64
+
+# How many nodes to expand between checks of the deadline.
+DEADLINE_CHECK_INTERVAL = 32
+
+# The time per move to use when no moveTime is given.
+# (The rules' timeouts are far longer, e.g. 30 seconds in pacman, and only bound this.)
+DEFAULT_MOVE_TIME = 1.0
+
+# The fraction of the rules' move warning time that an agent will at most use for searching.
+# The rest is a safety margin for the work around the search.
+MOVE_TIME_FRACTION = 0.8
+
+PACMAN_AGENT_INDEX = 0
+
+# How a stored value relates to the true value of a position.
+# Alpha-beta only learns bounds for positions whose search was cut off.
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+def getMoveTime(agentIndex, moveTime, rules):
+    """
+    The number of seconds an agent should search for each move:
+    moveTime if it is not None, and otherwise `DEFAULT_MOVE_TIME`
+    (capped to a fraction of the rules' move warning time).
+    """
+
+    if (moveTime is not None):
+        return moveTime
+
+    if (rules is None):
+        return DEFAULT_MOVE_TIME
+
+    return min(DEFAULT_MOVE_TIME, rules.getMoveWarningTime(agentIndex) * MOVE_TIME_FRACTION)
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its deadline passes.
+    """
+
+    pass
+
+class TranspositionTable(object):
+    """
+    A bounded table of search results keyed by (state, agent to move).
+
+    Each entry holds the remaining depth that the position was searched to,
+    the value (and what kind of bound the value is), the best action found,
+    and the deviation of the value (see `AdversarialSearch`).
+    A value is only reused for a search of the same remaining depth,
+    while the best action is useful (for move ordering) from a search of any depth.
+
+    The table is direct-mapped (every key has exactly one slot, picked by the state's hash).
+    Entries keep their state, and a probe only hits on an equal state,
+    since different states can share a hash.
+    When two keys compete for a slot, the entry searched to a greater depth is kept
+    (it cost more to compute), unless it is left over from a previous search.
+    """
+
+    def __init__(self, size = DEFAULT_TABLE_SIZE):
+        self._size = max(1, int(size))
+        self._slots = [None] * self._size
+
+        # Bumped on every new search, so stale entries can be replaced.
+        self._generation = 0
+
+        self._probes = 0
+        self._hits = 0
+        self._stores = 0
+        self._overwrites = 0
+
+    def clear(self):
+        self._slots = [None] * self._size
+        self._generation = 0
+
+    def getSize(self):
+        return self._size
+
+    def getStats(self):
+        return {
+            'probes': self._probes,
+            'hits': self._hits,
+            'stores': self._stores,
+            'overwrites': self._overwrites,
+        }
+
+    def newSearch(self):
+        """
+        Mark the start of a new search.
+        Entries from earlier searches stay usable, but lose their priority when replacing.
+        """
+
+        self._generation += 1
+
+    def probe(self, state, agentIndex):
+        """
+        Returns the entry for the key as a tuple:
+        (depth, value, flag, action, deviation),
+        or None if the key is not in the table.
+        """
+
+        self._probes += 1
+
+        entry = self._slots[(hash(state) * 8 + agentIndex) % self._size]
+        if (entry is None or entry[1] != agentIndex or entry[0] != state):
+            return None
+
+        self._hits += 1
+        return entry[2:7]
+
+    def store(self, state, agentIndex, depth, value, flag, action, deviation = 0.0):
+        index = (hash(state) * 8 + agentIndex) % self._size
+        old = self._slots[index]
+
+        if (old is not None):
+            sameKey = (old[1] == agentIndex and old[0] == state)
+            if (not sameKey and old[7] == self._generation and old[2] > depth):
+                # Depth-preferred: keep the more expensive entry.
+                return
+
+            if (not sameKey):
+                self._overwrites += 1
+
+        self._stores += 1
+        self._slots[index] = (state, agentIndex, depth, value, flag, action, deviation,
+                self._generation)
+
+    def __len__(self):
+        return self._size - self._slots.count(None)
+
+class AdversarialSearch(object):
+    """
+    Depth-limited adversarial search over `pacai.core.gamestate.AbstractGameState`s.
+
+    One ply of depth is a move by every agent, starting with the agent at the root.
+    The maximizing agents (by default just the root agent) pick the best value for them,
+    the other agents either pick the worst value (minimax and alpha-beta)
+    or choose uniformly at random among their legal actions (expectimax).
+    Agents whose position is unknown (e.g. unobserved opponents in capture) are skipped.
+
+    In expectimax, the chance agents can follow a `pacai.agents.ghost.model.GhostModel`
+    (instead of picking uniformly at random).
+    Below the first fullChancePlies plies, chance nodes can be reduced to their most likely
+    outcomes, or to a sample of outcomes (see `CHANCE_MODES`).
+    The expected value is then taken over the reduced (reweighted) outcomes.
+    Each value carries a deviation: the total variation distance between the weights used
+    and the true probabilities, summed down the tree (the worst child at choice nodes).
+    The error of a value is at most its deviation times the range of the leaf values.
+    """
+
+    def __init__(self, evalFn, mode = MODE_ALPHA_BETA, tableSize = DEFAULT_TABLE_SIZE,
+            allowStop = True, moveOrdering = None, ghostModel = None, chanceMode = CHANCE_FULL,
+            chanceOutcomes = DEFAULT_CHANCE_OUTCOMES, fullChancePlies = 0, valueRange = None,
+            seed = None):
+        """
+        Args:
+            evalFn: A function from a game state to a value (from the maximizers' point of view).
+            mode: One of `MODES`.
+            tableSize: The number of entries in the transposition table (0 to disable it).
+            allowStop: Whether agents are allowed to consider stopping.
+            moveOrdering: A `pacai.agents.search.ordering.MoveOrdering`
+                          (defaults to one with the default heuristics).
+            ghostModel: A `pacai.agents.ghost.model.GhostModel` for the chance agents
+                        (None for uniformly random).
+            chanceMode: One of `CHANCE_MODES`.
+            chanceOutcomes: The number of outcomes to expand (or sample) at reduced chance nodes.
+            fullChancePlies: Chance nodes less than this many plies (moves) below the root
+                             are always fully expanded.
+            valueRange: The difference between the largest and smallest possible leaf values,
+                        used for the error bound.
+                        If None, the range of the leaf values seen in the search is used
+                        (making the bound an estimate).
+            seed: The seed for sampling chance outcomes.
+        """
+
+        if (mode not in MODES):
+            raise ValueError("Unknown adversarial search mode: '%s'." % (mode))
+
+        if (chanceMode not in CHANCE_MODES):
+            raise ValueError("Unknown chance mode: '%s'." % (chanceMode))
+
+        self._evalFn = evalFn
+        self._mode = mode
+        self._allowStop = allowStop
+
+        self._table = None
+        if (tableSize > 0):
+            self._table = TranspositionTable(tableSize)
+
+        if (moveOrdering is None):
+            moveOrdering = ordering.MoveOrdering()
+        self._moveOrdering = moveOrdering
+
+        self._ghostModel = ghostModel
+        self._chanceMode = chanceMode
+        self._chanceOutcomes = max(1, int(chanceOutcomes))
+        self._fullChancePlies = int(fullChancePlies)
+        self._valueRange = valueRange
+        self._rng = random.Random(seed)
+
+        # The deviation of the value returned by the last call to _search().
+        self._deviation = 0.0
+
+        # The settings the table's values were computed under.
+        self._rootIndex = None
+        self._maximizers = None
+        self._rootHash = None
+
+        # When to give up on the current search (a time.time() value).
+        self._deadline = None
+
+        # The best root action from the previous iteration of an iterative deepening search.
+        self._rootAction = None
+
+        self.resetStats()
+
+    def getMode(self):
+        return self._mode
+
+    def getMoveOrdering(self):
+        return self._moveOrdering
+
+    def getErrorBound(self):
+        """
+        A bound on how far the value of the last search can be from the full expectimax value
+        (0 when every chance node was fully expanded).
+        """
+
+        if (self._lastDeviation == 0.0):
+            return 0.0
+
+        valueRange = self._valueRange
+        if (valueRange is None):
+            valueRange = self._maxLeafValue - self._minLeafValue
+
+        return self._lastDeviation * valueRange
+
+    def getStats(self):
+        stats = {
+            'nodes': self._nodes,
+            'evaluations': self._evaluations,
+            'chanceNodes': self._chanceNodes,
+            'reducedChanceNodes': self._reducedChanceNodes,
+            'deviation': self._lastDeviation,
+            'errorBound': self.getErrorBound(),
+            'minLeafValue': self._minLeafValue,
+            'maxLeafValue': self._maxLeafValue,
+            'choiceNodes': self._choiceNodes,
+            'cutoffs': self._cutoffs,
+            'firstMoveCutoffs': self._firstMoveCutoffs,
+            'tableCutoffs': self._tableCutoffs,
+            # The fraction of choice nodes that were cut off.
+            'cutoffRate': self._cutoffs / max(1, self._choiceNodes),
+            # The fraction of cutoffs caused by the first move searched (a measure of ordering).
+            'firstMoveCutoffRate': self._firstMoveCutoffs / max(1, self._cutoffs),
+        }
+
+        if (self._table is not None):
+            stats['table'] = self._table.getStats()
+
+        return stats
+
+    def getTranspositionTable(self):
+        return self._table
+
+    def resetStats(self):
+        self._nodes = 0
+        self._evaluations = 0
+        self._chanceNodes = 0
+        self._reducedChanceNodes = 0
+        self._lastDeviation = 0.0
+        self._minLeafValue = math.inf
+        self._maxLeafValue = -math.inf
+        self._choiceNodes = 0
+        self._cutoffs = 0
+        self._firstMoveCutoffs = 0
+        self._tableCutoffs = 0
+
+    def getPrincipalVariation(self, state, agentIndex, maxLength = DEFAULT_MAX_DEPTH):
+        """
+        Follow the best actions stored in the transposition table from the given state.
+        Returns a list of (agent index, action) for the expected line of play.
+        """
+
+        line = []
+        if (self._table is None):
+            return line
+
+        while (len(line) < maxLength and not state.isOver()):
+            entry = self._table.probe(state, agentIndex)
+            if (entry is None or entry[3] is None):
+                break
+
+            line.append((agentIndex, entry[3]))
+            state = state.generateSuccessor(agentIndex, entry[3])
+            agentIndex = (agentIndex + 1) % state.getNumAgents()
+
+        return line
+
+    def iterativeSearch(self, state, agentIndex, maxDepth = DEFAULT_MAX_DEPTH, deadline = None,
+            maximizers = None):
+        """
+        Search to depth 1, 2, 3, ... (up to maxDepth) until the deadline (a time.time() value).
+        The first iteration always runs to completion, so there is always an answer.
+        Each iteration orders its moves using the best moves found by the previous ones.
+        Returns (value, best action, depth) of the deepest completed iteration.
+        """
+
+        result = (None, None, 0)
+        self._rootAction = None
+
+        try:
+            for depth in range(1, int(maxDepth) + 1):
+                iterationDeadline = deadline
+                if (depth == 1):
+                    iterationDeadline = None
+
+                value, action = self.search(state, agentIndex, depth, maximizers = maximizers,
+                        deadline = iterationDeadline)
+                result = (value, action, depth)
+
+                self._rootAction = action
+
+                if (deadline is not None and time.time() >= deadline):
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self._rootAction = None
+
+        return result
+
+    def search(self, state, agentIndex, depth, maximizers = None, rootIndex = None,
+            alpha = -math.inf, beta = math.inf, deadline = None):
+        """
+        Search from the state with agentIndex to move.
+        Returns (value, best action).
+
+        Args:
+            maximizers: The agents that maximize (defaults to just agentIndex).
+            rootIndex: The agent whose turns count down the depth (defaults to agentIndex).
+                       Set it to search a subtree of a larger search.
+            alpha: The value the maximizers are already guaranteed.
+            beta: The value the minimizers are already guaranteed.
+                  A value outside of (alpha, beta) is only a bound on the true value.
+            deadline: When to give up (a time.time() value), by raising a `SearchTimeout`.
+        """
+
+        if (maximizers is None):
+            maximizers = [agentIndex]
+
+        if (rootIndex is None):
+            rootIndex = agentIndex
+
+        self._startSearch(state, rootIndex, frozenset(maximizers))
+        return self._runSearch(state, agentIndex, depth, 0, alpha, beta, deadline)
+
+    def searchSubtree(self, root, state, agentIndex, depth, maximizers, rootIndex,
+            alpha = -math.inf, beta = math.inf, deadline = None):
+        """
+        Search the state one move below the root, as a part of a search from the root
+        (e.g. a single root move of a search that is split up).
+        Unlike a `AdversarialSearch.search` from the state,
+        the move ordering (killers and history) stays that of the root,
+        and the state is searched as the first ply below it.
+        Returns (value, best action) of the state.
+
+        Args:
+            depth: The remaining depth at the state.
+            maximizers: The agents that maximize.
+            rootIndex: The agent to move at the root.
+        """
+
+        self._startSearch(root, rootIndex, frozenset(maximizers))
+        return self._runSearch(state, agentIndex, depth, 1, alpha, beta, deadline)
+
+    def _checkDeadline(self):
+        if (self._deadline is not None and time.time() >= self._deadline):
+            raise SearchTimeout()
+
+    def _evaluate(self, state):
+        self._evaluations += 1
+        value = self._evalFn(state)
+
+        if (value < self._minLeafValue):
+            self._minLeafValue = value
+
+        if (value > self._maxLeafValue):
+            self._maxLeafValue = value
+
+        return value
+
+    def _getActions(self, state, agentIndex):
+        actions = state.getLegalActions(agentIndex)
+
+        if (not self._allowStop and len(actions) > 1):
+            actions = [action for action in actions if action != Directions.STOP]
+
+        return actions
+
+    def _nextAgent(self, state, agentIndex, depth):
+        nextIndex = (agentIndex + 1) % state.getNumAgents()
+        if (nextIndex == self._rootIndex):
+            depth -= 1
+
+        return nextIndex, depth
+
+    def _orderActions(self, state, agentIndex, actions, ply, tableAction, isMax):
+        """
+        Get the (action, successor) pairs to search, most promising first.
+        At the root of an iterative deepening search,
+        the previous iteration's choice is used in place of the table's.
+        """
+
+        if (ply == 0 and self._rootAction is not None):
+            tableAction = self._rootAction
+
+        return self._moveOrdering.order(state, agentIndex, actions, ply, tableAction, isMax,
+                self._evaluate)
+
+    def _runSearch(self, state, agentIndex, depth, ply, alpha, beta, deadline):
+        try:
+            self._deadline = deadline
+            result = self._search(state, agentIndex, int(depth), ply, alpha, beta)
+        finally:
+            self._deadline = None
+
+        self._lastDeviation = self._deviation
+        return result
+
+    def _search(self, state, agentIndex, depth, ply, alpha, beta):
+        """
+        Returns (value, best action) for the state with agentIndex to move,
+        ply moves below the root.
+        """
+
+        if (depth <= 0 or state.isOver()):
+            self._deviation = 0.0
+            return self._evaluate(state), None
+
+        if (state.getAgentPosition(agentIndex) is None):
+            # We can't see this agent, so it can't move in our search.
+            nextIndex, nextDepth = self._nextAgent(state, agentIndex, depth)
+            return self._search(state, nextIndex, nextDepth, ply, alpha, beta)
+
+        self._nodes += 1
+        if (self._nodes % DEADLINE_CHECK_INTERVAL == 0):
+            self._checkDeadline()
+
+        tableAction = None
+        if (self._table is not None):
+            entry = self._table.probe(state, agentIndex)
+
+            if (entry is not None):
+                tableAction = entry[3]
+
+            if (entry is not None and entry[0] == depth):
+                (entryDepth, value, flag, action, deviation) = entry
+
+                if ((flag == EXACT)
+                        or (flag == LOWER_BOUND and value >= beta)
+                        or (flag == UPPER_BOUND and value <= alpha)):
+                    self._tableCutoffs += 1
+                    self._deviation = deviation
+                    return value, action
+
+        actions = self._getActions(state, agentIndex)
+        isMax = (agentIndex in self._maximizers)
+
+        if (self._mode == MODE_EXPECTIMAX and not isMax):
+            value = self._chanceValue(state, agentIndex, actions, depth, ply)
+            bestAction = None
+            flag = EXACT
+        else:
+            moves = self._orderActions(state, agentIndex, actions, ply, tableAction, isMax)
+            value, bestAction, flag = self._choiceValue(state, agentIndex, moves, depth, ply,
+                    alpha, beta, isMax)
+
+        if (self._table is not None):
+            self._table.store(state, agentIndex, depth, value, flag, bestAction,
+                    self._deviation)
+
+        return value, bestAction
+
+    def _startSearch(self, root, rootIndex, maximizers):
+        """
+        Get the table and move ordering ready for a search from the root.
+        """
+
+        if (self._table is not None):
+            if (rootIndex != self._rootIndex or maximizers != self._maximizers):
+                # Stored values depend on who is at the root and who is maximizing.
+                self._table.clear()
+
+            self._table.newSearch()
+
+        rootHash = hash(root)
+        if (rootHash != self._rootHash):
+            self._moveOrdering.newRoot()
+
+        self._rootIndex = rootIndex
+        self._maximizers = maximizers
+        self._rootHash = rootHash
+
+    def _choiceValue(self, state, agentIndex, moves, depth, ply, alpha, beta, isMax):
+        """
+        The value of a node where the agent picks its best (or worst, for minimizers) action.
+        The moves are (action, successor) pairs, where the successor may not be generated yet.
+        Returns (value, best action, flag).
+        """
+
+        self._choiceNodes += 1
+        nextIndex, nextDepth = self._nextAgent(state, agentIndex, depth)
+
+        prune = (self._mode == MODE_ALPHA_BETA)
+        if (not prune):
+            alpha = -math.inf
+            beta = math.inf
+
+        originalAlpha = alpha
+        originalBeta = beta
+
+        bestValue = -math.inf if isMax else math.inf
+        bestAction = None
+        deviation = 0.0
+
+        for i in range(len(moves)):
+            action, successor = moves[i]
+            if (successor is None):
+                successor = state.generateSuccessor(agentIndex, action)
+
+            value, _ = self._search(successor, nextIndex, nextDepth, ply + 1, alpha, beta)
+            deviation = max(deviation, self._deviation)
+
+            if (isMax):
+                if (value > bestValue):
+                    bestValue = value
+                    bestAction = action
+                alpha = max(alpha, bestValue)
+            else:
+                if (value < bestValue):
+                    bestValue = value
+                    bestAction = action
+                beta = min(beta, bestValue)
+
+            if (prune and alpha >= beta):
+                self._cutoffs += 1
+                if (i == 0):
+                    self._firstMoveCutoffs += 1
+
+                self._moveOrdering.recordCutoff(state, agentIndex, action, ply, depth)
+                break
+
+        if (bestValue <= originalAlpha):
+            flag = UPPER_BOUND
+        elif (bestValue >= originalBeta):
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+
+        self._deviation = deviation
+        return bestValue, bestAction, flag
+
+    def _chanceValue(self, state, agentIndex, actions, depth, ply):
+        """
+        The expected value of a node where the agent picks at random
+        (uniformly, or following the ghost model).
+        """
+
+        self._chanceNodes += 1
+        nextIndex, nextDepth = self._nextAgent(state, agentIndex, depth)
+
+        if (self._ghostModel is not None):
+            outcomes = self._ghostModel.getDistribution(state, agentIndex)
+        else:
+            outcomes = [(action, 1.0 / len(actions)) for action in actions]
+
+        weights, deviation = self._reduceOutcomes(outcomes, ply)
+
+        total = 0.0
+        for (action, weight) in weights:
+            successor = state.generateSuccessor(agentIndex, action)
+            value, _ = self._search(successor, nextIndex, nextDepth, ply + 1,
+                    -math.inf, math.inf)
+
+            total += weight * value
+            deviation += weight * self._deviation
+
+        self._deviation = deviation
+        return total
+
+    def _reduceOutcomes(self, outcomes, ply):
+        """
+        Pick the outcomes of a chance node to expand.
+        Returns a list of (action, weight) and the total variation distance between
+        the weights and the outcomes' probabilities.
+        """
+
+        if (self._chanceMode == CHANCE_FULL or ply < self._fullChancePlies
+                or len(outcomes) <= self._chanceOutcomes):
+            return outcomes, 0.0
+
+        self._reducedChanceNodes += 1
+
+        if (self._chanceMode == CHANCE_TOP):
+            # Outcomes are either uniform or (from the ghost model) the most likely first.
+            kept = outcomes[:self._chanceOutcomes]
+
+            mass = sum([probability for (action, probability) in kept])
+            weights = [(action, probability / mass) for (action, probability) in kept]
+
+            return weights, 1.0 - mass
+
+        # Sample (with replacement) and weight each outcome by how often it was drawn.
+        probabilities = [probability for (action, probability) in outcomes]
+        samples = self._rng.choices(range(len(outcomes)), weights = probabilities,
+                k = self._chanceOutcomes)
+
+        counts = [0] * len(outcomes)
+        for i in samples:
+            counts[i] += 1
+
+        weights = []
+        deviation = 0.0
+        for i in range(len(outcomes)):
+            weight = counts[i] / self._chanceOutcomes
+            deviation += abs(weight - probabilities[i]) / 2.0
+
+            if (counts[i] > 0):
+                weights.append((outcomes[i][0], weight))
+
+        return weights, deviation
+
+class AdversarialSearchAgent(MultiAgentSearchAgent):
+    """
+    A `pacai.agents.search.multiagent.MultiAgentSearchAgent` that picks its actions with
+    an `AdversarialSearch` (and its transposition table, which is kept between moves).
+
+    With iterative deepening turned on, the agent searches deeper and deeper until its
+    time for the move runs out (and the tree depth is ignored).
+    The time per move is moveTime if given, and otherwise `DEFAULT_MOVE_TIME`
+    (or a fraction of the rules' `getMoveWarningTime`, if that is less).
+
+    The move ordering heuristics (see `pacai.agents.search.ordering`) are joined with a '+',
+    e.g. ordering=table+killers+history+eval (or ordering=none).
+
+    In expectimax mode, ghostModel names the ghost agent class that chance nodes follow
+    (e.g. ghostModel=DirectionalGhost),
+    and chanceMode/chanceOutcomes/fullChancePlies reduce the deeper chance nodes.
+
+    With endgameFood set, pacman plays perfectly once that little food is left
+    and the endgame table (see `pacai.core.endgame`) says the game is won.
+    Tables are loaded from endgameDir, and ones that are not there yet are built there
+    in the background (while the agent keeps searching its moves).
+
+    With a bookDir, positions in the layout's opening book (see `pacai.agents.search.book`)
+    are played from the book instead of searched.
+
+    In capture games, the agent's whole team maximizes and opponents minimize.
+    Since capture scores are from red's point of view, the evaluation is negated for blue agents.
+
+    Examples:
+    `python3 -m pacai.bin.pacman -p AdversarialSearchAgent --agent-args mode=alphabeta,depth=3`
+    `python3 -m pacai.bin.pacman -p AdversarialSearchAgent --agent-args iterative,moveTime=0.5`
+    """
+
+    def __init__(self, index, mode = MODE_ALPHA_BETA, tableSize = DEFAULT_TABLE_SIZE,
+            allowStop = True, iterative = False, moveTime = None, maxDepth = DEFAULT_MAX_DEPTH,
+            ordering = '+'.join(ordering.DEFAULT_HEURISTICS), ghostModel = None,
+            chanceMode = CHANCE_FULL, chanceOutcomes = DEFAULT_CHANCE_OUTCOMES,
+            fullChancePlies = 0, seed = None, bookDir = None, endgameFood = 0,
+            endgameWorkers = 1, endgameDir = endgame.DEFAULT_CACHE_DIR, **kwargs):
+        super().__init__(index, **kwargs)
+
+        self._mode = mode
+        self._tableSize = int(tableSize)
+        self._allowStop = util.parseBool(allowStop)
+        self._ordering = ordering
+
+        if (ghostModel is not None and ghostModel.lower() == 'none'):
+            ghostModel = None
+
+        self._ghostModelName = ghostModel
+        self._ghostModel = None
+        if (ghostModel is not None):
+            self._ghostModel = GhostModel(ghostModel)
+
+        if (seed is not None):
+            seed = int(seed)
+
+        self._chanceOptions = {
+            'chanceMode': chanceMode,
+            'chanceOutcomes': int(chanceOutcomes),
+            'fullChancePlies': int(fullChancePlies),
+            'seed': seed,
+        }
+
+        self._iterative = util.parseBool(iterative)
+        self._maxDepth = int(maxDepth)
+
+        self._moveTime = None
+        if (moveTime is not None):
+            self._moveTime = float(moveTime)
+
+        self._bookDir = bookDir
+        self._book = None
+        self._bookHits = 0
+
+        self._endgameFood = int(endgameFood)
+        self._endgameWorkers = int(endgameWorkers)
+        self._endgameDir = endgameDir
+        self._endgame = None
+        self._endgameMoves = 0
+        # (food, process) of the endgame table being built in the background.
+        self._endgameBuild = None
+
+        self._engine = None
+        self._maximizers = None
+        self._rules = None
+
+    def getAction(self, state):
+        if (self._engine is None):
+            self.registerInitialState(state)
+
+        if (self._endgameFood > 0 and state.getNumFood() <= self._endgameFood):
+            result = self._getEndgameAction(state)
+            if (result is not None):
+                self._endgameMoves += 1
+                return result[0]
+
+        if (self._book is not None):
+            minDepth = self.getTreeDepth()
+            if (self._iterative):
+                minDepth = 0
+
+            entry = self._book.lookup(state, self.index, minDepth = minDepth)
+            if (entry is not None):
+                self._bookHits += 1
+                return entry[0]
+
+        value, action, depth = self.searchAction(state)
+
+        if (action is None):
+            return state.getLegalActions(self.index)[0]
+
+        return action
+
+    def searchAction(self, state):
+        """
+        Search for the best action (ignoring any opening book).
+        Returns (value, best action, depth searched).
+        """
+
+        if (self._engine is None):
+            self.registerInitialState(state)
+
+        if (self._iterative):
+            deadline = time.time() + self.getMoveTime()
+            value, action, depth = self._engine.iterativeSearch(state, self.index,
+                    maxDepth = self._maxDepth, deadline = deadline, maximizers = self._maximizers)
+            logging.debug('Agent %d searched to depth %d.' % (self.index, depth))
+        else:
+            depth = self.getTreeDepth()
+            value, action = self._engine.search(state, self.index, depth,
+                    maximizers = self._maximizers)
+
+        return value, action, depth
+
+    def createSearchEngine(self, evalFn):
+        """
+        Create the engine that will pick this agent's actions.
+        Children can override this to use a different engine.
+        """
+
+        moveOrdering = ordering.MoveOrdering(self.getOrderingHeuristics())
+
+        return AdversarialSearch(evalFn, mode = self._mode, tableSize = self._tableSize,
+                allowStop = self._allowStop, moveOrdering = moveOrdering,
+                ghostModel = self._ghostModel, **self._chanceOptions)
+
+    def getBook(self):
+        return self._book
+
+    def getBookHits(self):
+        return self._bookHits
+
+    def getBookSettings(self):
+        """
+        The settings that an opening book must have been searched with for this agent to use it:
+        every option that changes the values of a search.
+        """
+
+        settings = {
+            'mode': self._mode,
+            'evalFn': self.getEvaluationFunctionName(),
+            'allowStop': self._allowStop,
+            'ghostModel': self._ghostModelName,
+            'iterative': self._iterative,
+        }
+
+        if (self._iterative):
+            settings['maxDepth'] = self._maxDepth
+            settings['moveTime'] = self._moveTime
+        else:
+            settings['depth'] = self.getTreeDepth()
+
+        # Chance nodes only exist in expectimax.
+        if (self._mode == MODE_EXPECTIMAX):
+            settings.update(self._chanceOptions)
+
+        return settings
+
+    def getEndgameMoves(self):
+        return self._endgameMoves
+
+    def getEndgameTable(self):
+        return self._endgame
+
+    def getMode(self):
+        return self._mode
+
+    def getMoveTime(self):
+        """
+        The number of seconds to spend searching for each move.
+        """
+
+        return getMoveTime(self.index, self._moveTime, self._rules)
+
+    def getOrderingHeuristics(self):
+        return ordering.parseHeuristics(self._ordering)
+
+    def getSearchEngine(self):
+        return self._engine
+
+    def getTableSize(self):
+        return self._tableSize
+
+    def isStopAllowed(self):
+        return self._allowStop
+
+    def registerInitialState(self, state):
+        super().registerInitialState(state)
+
+        evalFn = self.getEvaluationFunction()
+        self._maximizers = [self.index]
+
+        if (hasattr(state, 'getRedTeamIndices')):
+            if (state.isOnRedTeam(self.index)):
+                self._maximizers = state.getRedTeamIndices()
+            else:
+                self._maximizers = state.getBlueTeamIndices()
+                evalFn = NegatedEvaluation(evalFn)
+
+        self._engine = self.createSearchEngine(evalFn)
+
+        if (self._bookDir is not None and self._book is None):
+            self._book = book.OpeningBook.load(self._bookDir, state.getInitialLayout(),
+                    self.getBookSettings())
+
+    def registerRules(self, rules):
+        self._rules = rules
+
+    def _getEndgameAction(self, state):
+        """
+        Get the fastest winning action (and its plies) from the endgame table,
+        or None if the state is not a won endgame.
+        """
+
+        if (self.index != PACMAN_AGENT_INDEX or hasattr(state, 'getRedTeamIndices')):
+            return None
+
+        food = set(state.getFoodList())
+        if (self._endgame is None or not food <= set(self._endgame.getFood())):
+            # Food only gets eaten, so this table covers the rest of the game.
+            self._endgame = self._loadEndgameTable(state, food)
+            if (self._endgame is None):
+                return None
+
+        return self._endgame.getAction(state)
+
+    def _loadEndgameTable(self, state, food):
+        """
+        Load the endgame table for the food from the disk cache,
+        and start building it in the background if it is not there.
+        Returns None while the table is not ready, since building it can take much longer
+        than a move is allowed to.
+        """
+
+        walls = state.getWalls()
+        numGhosts = state.getNumAgents() - 1
+        if (len(food) > endgame.MAX_FOOD or numGhosts < 1 or numGhosts > endgame.MAX_GHOSTS):
+            return None
+
+        if (self._endgameBuild is not None):
+            buildFood, process = self._endgameBuild
+            if (process.is_alive()):
+                return None
+
+            # A table built for more food also covers this food.
+            if (food <= buildFood):
+                if (process.exitcode != 0):
+                    return None
+
+                food = buildFood
+
+        path = endgame.getCachePath(walls, food, numGhosts, self._endgameDir)
+        if (os.path.isfile(path)):
+            return endgame.EndgameTable(walls, food, numGhosts, cacheDir = self._endgameDir)
+
+        logging.debug('Agent %d is building an endgame table in the background.' % (self.index))
+
+        kwargs = {'cacheDir': self._endgameDir, 'numWorkers': self._endgameWorkers}
+        process = multiprocessing.Process(target = endgame.EndgameTable,
+                args = (walls, sorted(food), numGhosts), kwargs = kwargs)
+        process.start()
+
+        self._endgameBuild = (food, process)
+        return None
+
+class NegatedEvaluation(object):
+    """
+    An evaluation function from the other side's point of view.
+    (A class rather than a closure, so it can be sent to worker processes.)
+    """
+
+    def __init__(self, evalFn):
+        self._evalFn = evalFn
+
+    def __call__(self, state):
+        return -self._evalFn(state)
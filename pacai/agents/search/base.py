@@ -10,6 +10,10 @@ from pacai.core.search.position import PositionSearchProblem
 from pacai.core.search.problem import SearchProblem
 from pacai.student.search import depthFirstSearch
 from pacai.util import reflection
+from pacai.util import util
+
+# The most visited locations that will be handed to the view for highlighting.
+MAX_HIGHLIGHT_LOCATIONS = 2000
 
 class SearchAgent(BaseAgent):
     """
@@ -25,6 +29,7 @@ class SearchAgent(BaseAgent):
             fn: Union[str, Callable[[SearchProblem], any]] = depthFirstSearch,
             prob: Union[str, Callable[[AbstractGameState], SearchProblem]] = PositionSearchProblem,
             heuristic: Union[str, Callable] = nullHeuristic,
+            recordVisits = True,
             **kwargs):
         super().__init__(index, **kwargs)
 
@@ -44,6 +49,10 @@ class SearchAgent(BaseAgent):
             self.searchFunction = fn
         logging.info('[SearchAgent] using function %s.' % (self.searchFunction))
 
+        # Whether the search problem should record its visits (for the GUI highlights).
+        # Headless runs can turn this off and skip the bookkeeping.
+        self._recordVisits = util.parseBool(recordVisits)
+
         # The actions the search produced.
         self._actions = []
 
@@ -64,13 +73,15 @@ class SearchAgent(BaseAgent):
 
         starttime = time.time()
         problem = self.searchType(state)  # Makes a new search problem.
+        problem.setRecordVisits(self._recordVisits)
 
         self._actions = self.searchFunction(problem)  # Find a path.
         self._actionIndex = 0
 
         totalCost = problem.actionsCost(self._actions)
 
-        state.setHighlightLocations(problem.getVisitHistory())
+        if (self._recordVisits):
+            state.setHighlightLocations(problem.getVisitHistory(MAX_HIGHLIGHT_LOCATIONS))
 
         logging.info('Path found with total cost of %d in %.1f seconds' %
                 (totalCost, time.time() - starttime))
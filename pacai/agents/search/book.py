@@ -0,0 +1,206 @@
+"""
+Opening books: persistent, per-layout caches of searched positions.
+
+Layouts are fixed, so every game on a layout starts from the same few positions,
+and an agent would otherwise search them again (at full depth) in every game.
+A book maps a position to the (action, depth, value) found by searching it,
+and is built offline (see `buildBook` and `pacai.bin.book`).
+An `pacai.agents.search.adversarial.AdversarialSearchAgent` given a bookDir
+plays book moves without searching.
+
+Python's hashes of states are not stable between runs (strings are hashed with a random seed),
+so books are keyed by a digest of the layout text and of each position instead.
+A book also records the settings it was searched with,
+so it is only used by agents with the same settings.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+DEFAULT_BOOK_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pacai', 'books')
+
+# The number of hex digits kept from a digest.
+KEY_LENGTH = 16
+
+class OpeningBook(object):
+    """
+    A mapping from positions (with an agent to move) to the result of searching them.
+    """
+
+    def __init__(self, layout, settings = None):
+        """
+        Args:
+            layout: The `pacai.core.layout.Layout` this book is for.
+            settings: A JSON-able dict of the search settings the book's entries come from.
+        """
+
+        self._layoutKey = layoutKey(layout)
+
+        if (settings is None):
+            settings = {}
+        self._settings = settings
+
+        # {position key: (action, depth, value), ...}
+        self._entries = {}
+
+    def getLayoutKey(self):
+        return self._layoutKey
+
+    def getPath(self, bookDir):
+        return os.path.join(os.path.expanduser(bookDir), 'book-%s.json' % (self._layoutKey))
+
+    def getSettings(self):
+        return self._settings
+
+    def lookup(self, state, agentIndex, minDepth = 0):
+        """
+        Get the book's (action, depth, value) for the agent to move in the state,
+        or None if the position is not in the book (or was not searched at least minDepth deep).
+        """
+
+        entry = self._entries.get(positionKey(state, agentIndex))
+        if (entry is None or entry[1] < minDepth):
+            return None
+
+        # Guard against key collisions.
+        if (entry[0] not in state.getLegalActions(agentIndex)):
+            return None
+
+        return entry
+
+    def save(self, bookDir):
+        path = self.getPath(bookDir)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+
+        data = {
+            'layout': self._layoutKey,
+            'settings': self._settings,
+            'entries': self._entries,
+        }
+
+        with open(path, 'w') as file:
+            json.dump(data, file)
+
+        logging.info('Saved an opening book of %d positions to %s.' % (len(self), path))
+        return path
+
+    def store(self, state, agentIndex, action, depth, value):
+        """
+        Add the result of a search to the book.
+        A shallower result never replaces a deeper one.
+        """
+
+        key = positionKey(state, agentIndex)
+
+        old = self._entries.get(key)
+        if (old is not None and old[1] > depth):
+            return
+
+        self._entries[key] = (action, depth, value)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def load(bookDir, layout, settings = None):
+        """
+        Load the book for the layout from the directory.
+        If there is no book (or its settings don't match), an empty book is returned.
+        """
+
+        book = OpeningBook(layout, settings)
+        path = book.getPath(bookDir)
+
+        if (not os.path.isfile(path)):
+            return book
+
+        with open(path, 'r') as file:
+            data = json.load(file)
+
+        if (settings is not None and data['settings'] != settings):
+            logging.warning('Ignoring opening book with different settings (%s): %s.' %
+                    (str(data['settings']), path))
+            return book
+
+        book._settings = data['settings']
+        book._entries = {key: tuple(entry) for (key, entry) in data['entries'].items()}
+
+        return book
+
+def buildBook(state, agents, moves, book = None):
+    """
+    Search every position reachable in the first few moves of a game,
+    and store the results in a book.
+
+    Args:
+        state: The starting state of the game.
+        agents: {agentIndex: agent, ...} of the agents to build the book for.
+                Each agent must have a searchAction(state) method
+                (like `pacai.agents.search.adversarial.AdversarialSearchAgent`),
+                and have already been shown the state.
+        moves: The number of moves (by each agent) to cover.
+        book: The book to add to (a new one is made if None).
+    """
+
+    if (book is None):
+        book = OpeningBook(state.getInitialLayout())
+
+    numAgents = state.getNumAgents()
+
+    # Expand the game tree a ply at a time, keeping each position once.
+    frontier = [state]
+    for ply in range(moves * numAgents):
+        agentIndex = ply % numAgents
+        agent = agents.get(agentIndex)
+
+        seen = set()
+        nextFrontier = []
+
+        for current in frontier:
+            if (current.isOver()):
+                continue
+
+            if (agent is not None):
+                value, action, depth = agent.searchAction(current)
+                if (action is not None):
+                    book.store(current, agentIndex, action, depth, value)
+
+            for action in current.getLegalActions(agentIndex):
+                successor = current.generateSuccessor(agentIndex, action)
+
+                key = positionKey(successor, (agentIndex + 1) % numAgents)
+                if (key not in seen):
+                    seen.add(key)
+                    nextFrontier.append(successor)
+
+        logging.debug('Opening book ply %d: %d positions searched, %d next.' %
+                (ply, len(frontier), len(nextFrontier)))
+        frontier = nextFrontier
+
+    return book
+
+def layoutKey(layout):
+    """
+    A stable key for a layout.
+    """
+
+    return _digest('\n'.join(layout.layoutText))
+
+def positionKey(state, agentIndex):
+    """
+    A stable key for a position: everything that matters to a search
+    (the agent to move, the score, the agents, the food, and the capsules).
+    """
+
+    agents = [(agentState.getPosition(), agentState.getDirection(), agentState.isPacman(),
+            agentState.getScaredTimer()) for agentState in state.getAgentStates()]
+
+    position = (agentIndex, state.getScore(), agents, sorted(state.getFood().asList()),
+            sorted(state.getCapsules()))
+
+    return _digest(repr(position))
+
+def _digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:KEY_LENGTH]
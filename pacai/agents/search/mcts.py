@@ -0,0 +1,533 @@
+"""
+Monte Carlo tree search (UCT) for pacman and capture.
+
+Instead of expanding every move to a fixed depth (like expectimax),
+the tree is grown one node at a time towards the moves that look best so far
+(using the UCB1 rule to balance trying good moves against trying rarely tried ones),
+and each new node is valued by playing the game out with a cheap rollout policy.
+The cost of a search is set by a time or iteration budget instead of a depth,
+so it does not blow up with the number of ghosts.
+
+In classic pacman, rollouts run on a `pacai.core.simulator.PacmanSimulator`,
+which plays moves in place instead of copying a game state for every move,
+and a rollout is valued by its final score (negated when the ghosts are the maximizers).
+Other games (e.g. capture) roll out with `generateSuccessor` and the agent's evaluation function.
+
+Rollouts can be batched (several rollouts from each new node),
+and batches can be spread over a persistent pool of worker processes.
+
+For capture, `createTeam` makes a team of two `MonteCarloAgent`s,
+e.g. `python3 -m pacai.bin.capture -r pacai.agents.search.mcts --red-args iterations=50`.
+"""
+
+import logging
+import math
+import multiprocessing
+import random
+import time
+
+from pacai.agents.search import adversarial
+from pacai.agents.search.multiagent import MultiAgentSearchAgent
+from pacai.bin.pacman import PACMAN_AGENT_INDEX
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.directions import Directions
+from pacai.core.simulator import PacmanSimulator
+from pacai.util import util
+
+ROLLOUT_RANDOM = 'random'
+ROLLOUT_GREEDY = 'greedy'
+ROLLOUT_POLICIES = [ROLLOUT_RANDOM, ROLLOUT_GREEDY]
+
+# How the other side is modeled inside the tree.
+# Adversarial opponents pick the moves that are worst for us (by UCB1),
+# random opponents pick uniformly at random.
+OPPONENT_ADVERSARIAL = 'adversarial'
+OPPONENT_RANDOM = 'random'
+OPPONENT_MODELS = [OPPONENT_ADVERSARIAL, OPPONENT_RANDOM]
+
+DEFAULT_EXPLORATION = math.sqrt(2)
+
+# The number of moves (by any agent) in a rollout.
+DEFAULT_ROLLOUT_DEPTH = 40
+
+# The probability that a greedy rollout picks the best move by the evaluation function
+# (when rolling out without a simulator).
+GREEDY_PROBABILITY = 0.8
+
+class _Node(object):
+    """
+    A node in the search tree: a state and the agent to move in it.
+    Values are totals from the maximizers' point of view.
+    """
+
+    __slots__ = ('state', 'agentIndex', 'children', 'untried', 'visits', 'total')
+
+    def __init__(self, state, agentIndex, actions):
+        self.state = state
+        self.agentIndex = agentIndex
+        self.children = {}
+        self.untried = actions
+        self.visits = 0
+        self.total = 0.0
+
+class MonteCarloTreeSearch(object):
+    """
+    A UCT search that can be run for a number of iterations or until a deadline.
+    The tree is kept between searches, so a search from a state that was
+    already in the tree (e.g. the state after our move and the opponents' replies)
+    starts with all the rollouts that were done under it.
+    """
+
+    def __init__(self, evalFn, rolloutPolicy = ROLLOUT_GREEDY,
+            rolloutDepth = DEFAULT_ROLLOUT_DEPTH, exploration = DEFAULT_EXPLORATION,
+            opponentModel = OPPONENT_ADVERSARIAL, allowStop = True, fastRollouts = True,
+            batchSize = 1, numWorkers = 0, reuseTree = True, seed = None):
+        """
+        Args:
+            evalFn: A function from a game state to a value (from the maximizers' point of view).
+                    Must be picklable if workers are used.
+            rolloutPolicy: One of `ROLLOUT_POLICIES`.
+            rolloutDepth: The most moves (by any agent) in a rollout.
+            exploration: The UCB1 exploration constant (values are scaled to [0, 1]).
+            opponentModel: One of `OPPONENT_MODELS`.
+            allowStop: Whether agents in the tree are allowed to consider stopping.
+            fastRollouts: Roll out classic pacman games on a `PacmanSimulator`.
+            batchSize: The number of rollouts from each new node.
+            numWorkers: The number of worker processes for rollouts (0 to roll out in process).
+            reuseTree: Keep the part of the tree under the next searched state.
+            seed: The seed for the rollouts.
+        """
+
+        if (rolloutPolicy not in ROLLOUT_POLICIES):
+            raise ValueError("Unknown rollout policy: '%s'." % (rolloutPolicy))
+
+        if (opponentModel not in OPPONENT_MODELS):
+            raise ValueError("Unknown opponent model: '%s'." % (opponentModel))
+
+        self._evalFn = evalFn
+        self._rolloutPolicy = rolloutPolicy
+        self._rolloutDepth = int(rolloutDepth)
+        self._exploration = float(exploration)
+        self._opponentModel = opponentModel
+        self._allowStop = allowStop
+        self._fastRollouts = fastRollouts
+        self._batchSize = max(1, int(batchSize))
+        self._numWorkers = int(numWorkers)
+        self._reuseTree = reuseTree
+
+        self._rng = random.Random(seed)
+        self._pool = None
+
+        self._root = None
+        self._maximizers = None
+
+        # The range of values seen so far, used to scale values for UCB1.
+        self._minValue = math.inf
+        self._maxValue = -math.inf
+
+        self.resetStats()
+
+    def close(self):
+        """
+        Shut down the rollout workers (if any).
+        """
+
+        if (self._pool is not None):
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def getRoot(self):
+        return self._root
+
+    def getStats(self):
+        return {
+            'iterations': self._iterations,
+            'rollouts': self._rollouts,
+            'nodes': self._nodes,
+            'reusedVisits': self._reusedVisits,
+        }
+
+    def resetStats(self):
+        self._iterations = 0
+        self._rollouts = 0
+        self._nodes = 0
+        self._reusedVisits = 0
+
+    def search(self, state, agentIndex, iterations = None, deadline = None, maximizers = None):
+        """
+        Grow the tree from the state (with agentIndex to move) until either the number of
+        iterations have been run or the deadline (a time.time() value) passes.
+        At least one iteration is always run.
+        Returns the most visited action (or None if the agent has no legal actions).
+        """
+
+        if (iterations is None and deadline is None):
+            raise ValueError('A search needs a number of iterations or a deadline.')
+
+        if (maximizers is None):
+            maximizers = [agentIndex]
+        maximizers = frozenset(maximizers)
+
+        root = None
+        if (self._reuseTree and maximizers == self._maximizers):
+            root = self._findNode(state, agentIndex)
+
+        if (root is None):
+            root = self._createNode(state, agentIndex)
+            self._minValue = math.inf
+            self._maxValue = -math.inf
+        else:
+            self._reusedVisits += root.visits
+
+        self._root = root
+        self._maximizers = maximizers
+
+        count = 0
+        while (True):
+            self._iterate(root)
+            count += 1
+
+            if (iterations is not None and count >= iterations):
+                break
+
+            if (deadline is not None and time.time() >= deadline):
+                break
+
+        self._iterations += count
+
+        if (len(root.children) == 0):
+            return None
+
+        return max(root.children.items(), key = lambda item: item[1].visits)[0]
+
+    def _createNode(self, state, agentIndex):
+        self._nodes += 1
+
+        # Skip agents we can't see, they can't move in our search.
+        for i in range(state.getNumAgents()):
+            if (state.isOver() or state.getAgentPosition(agentIndex) is not None):
+                break
+
+            agentIndex = (agentIndex + 1) % state.getNumAgents()
+
+        actions = []
+        if (not state.isOver()):
+            actions = _getActions(state, agentIndex, self._allowStop)
+            self._rng.shuffle(actions)
+
+        return _Node(state, agentIndex, actions)
+
+    def _findNode(self, state, agentIndex):
+        """
+        Look for the state in the old tree (at most a round of moves below the old root).
+        """
+
+        if (self._root is None):
+            return None
+
+        level = [self._root]
+        for i in range(state.getNumAgents() + 1):
+            nextLevel = []
+
+            for node in level:
+                if (node.agentIndex == agentIndex and node.state == state):
+                    return node
+
+                nextLevel += node.children.values()
+
+            level = nextLevel
+
+        return None
+
+    def _iterate(self, root):
+        """
+        Run one round of selection, expansion, rollouts, and backpropagation.
+        """
+
+        path = [root]
+        node = root
+
+        # Select.
+        while (len(node.untried) == 0 and len(node.children) > 0):
+            node = self._select(node)
+            path.append(node)
+
+        # Expand.
+        if (len(node.untried) > 0):
+            action = node.untried.pop()
+            successor = node.state.generateSuccessor(node.agentIndex, action)
+            child = self._createNode(successor, (node.agentIndex + 1) % successor.getNumAgents())
+
+            node.children[action] = child
+            node = child
+            path.append(node)
+
+        # Roll out.
+        values = self._rollout(node)
+
+        for value in values:
+            self._minValue = min(self._minValue, value)
+            self._maxValue = max(self._maxValue, value)
+
+        # Backpropagate.
+        total = sum(values)
+        for node in path:
+            node.visits += len(values)
+            node.total += total
+
+    def _rollout(self, node):
+        """
+        Get the values of a batch of rollouts from the node.
+        """
+
+        state = node.state
+        if (state.isOver()):
+            return [self._terminalValue(state)]
+
+        fast = (self._fastRollouts and isinstance(state, PacmanGameState))
+        greedy = (self._rolloutPolicy == ROLLOUT_GREEDY)
+
+        tasks = []
+        for i in range(self._batchSize):
+            tasks.append((state, node.agentIndex, self._rng.getrandbits(32), self._rolloutDepth,
+                    greedy, fast, self._maximizers, self._allowStop))
+
+        if (self._numWorkers > 0 and len(tasks) > 1):
+            values = self._getPool().map(_rolloutTask, tasks)
+        else:
+            values = [rollout(*task, evalFn = self._evalFn) for task in tasks]
+
+        self._rollouts += len(values)
+        return values
+
+    def _select(self, node):
+        """
+        Pick the child to descend into.
+        """
+
+        isMax = (node.agentIndex in self._maximizers)
+        if (not isMax and self._opponentModel == OPPONENT_RANDOM):
+            return self._rng.choice(list(node.children.values()))
+
+        span = max(self._maxValue - self._minValue, 1e-9)
+        logVisits = math.log(max(1, node.visits))
+
+        bestScore = -math.inf
+        bestChild = None
+        for child in node.children.values():
+            value = ((child.total / child.visits) - self._minValue) / span
+            if (not isMax):
+                value = 1.0 - value
+
+            score = value + self._exploration * math.sqrt(logVisits / child.visits)
+            if (score > bestScore):
+                bestScore = score
+                bestChild = child
+
+        return bestChild
+
+    def _terminalValue(self, state):
+        if (self._fastRollouts and isinstance(state, PacmanGameState)):
+            # Keep terminal values on the same scale as the simulated rollouts.
+            return _orientScore(state.getScore(), self._maximizers)
+
+        return self._evalFn(state)
+
+    def _getPool(self):
+        if (self._pool is None):
+            self._pool = multiprocessing.Pool(self._numWorkers, initializer = _initWorker,
+                    initargs = (self._evalFn,))
+
+        return self._pool
+
+class MonteCarloAgent(MultiAgentSearchAgent):
+    """
+    An agent that picks its actions with a `MonteCarloTreeSearch`.
+
+    The search runs for the given number of iterations or for the given number of seconds
+    (by default `pacai.agents.search.adversarial.DEFAULT_MOVE_TIME`), whichever comes first.
+    In capture games, the agent's whole team maximizes
+    and the evaluation is negated for blue agents.
+    In classic games, the evaluation is negated for ghosts.
+
+    Examples:
+    `python3 -m pacai.bin.pacman -p MonteCarloAgent --agent-args iterations=500`
+    `python3 -m pacai.bin.pacman -p MonteCarloAgent --agent-args moveTime=0.2,workers=4,batchSize=8`
+    """
+
+    def __init__(self, index, iterations = None, moveTime = None,
+            rolloutPolicy = ROLLOUT_GREEDY, rolloutDepth = DEFAULT_ROLLOUT_DEPTH,
+            exploration = DEFAULT_EXPLORATION, opponentModel = OPPONENT_ADVERSARIAL,
+            allowStop = True, fastRollouts = True, batchSize = 1, workers = 0,
+            reuseTree = True, seed = None, **kwargs):
+        super().__init__(index, **kwargs)
+
+        self._iterations = None
+        if (iterations is not None):
+            self._iterations = int(iterations)
+
+        self._moveTime = None
+        if (moveTime is not None):
+            self._moveTime = float(moveTime)
+
+        if (seed is not None):
+            seed = int(seed)
+
+        self._options = {
+            'rolloutPolicy': rolloutPolicy,
+            'rolloutDepth': int(rolloutDepth),
+            'exploration': float(exploration),
+            'opponentModel': opponentModel,
+            'allowStop': util.parseBool(allowStop),
+            'fastRollouts': util.parseBool(fastRollouts),
+            'batchSize': int(batchSize),
+            'numWorkers': int(workers),
+            'reuseTree': util.parseBool(reuseTree),
+            'seed': seed,
+        }
+
+        self._engine = None
+        self._maximizers = None
+        self._rules = None
+
+    def final(self, state):
+        super().final(state)
+
+        if (self._engine is not None):
+            self._engine.close()
+
+    def getAction(self, state):
+        if (self._engine is None):
+            self.registerInitialState(state)
+
+        deadline = None
+        if (self._iterations is None or self._moveTime is not None):
+            deadline = time.time() + self.getMoveTime()
+
+        action = self._engine.search(state, self.index, iterations = self._iterations,
+                deadline = deadline, maximizers = self._maximizers)
+        logging.debug('Agent %d search stats: %s.' % (self.index, self._engine.getStats()))
+
+        if (action is None):
+            return Directions.STOP
+
+        return action
+
+    def getMoveTime(self):
+        """
+        The number of seconds to spend searching for each move.
+        """
+
+        return adversarial.getMoveTime(self.index, self._moveTime, self._rules)
+
+    def getSearchEngine(self):
+        return self._engine
+
+    def registerInitialState(self, state):
+        super().registerInitialState(state)
+
+        evalFn = self.getEvaluationFunction()
+        self._maximizers = [self.index]
+
+        if (hasattr(state, 'getRedTeamIndices')):
+            if (state.isOnRedTeam(self.index)):
+                self._maximizers = state.getRedTeamIndices()
+            else:
+                self._maximizers = state.getBlueTeamIndices()
+                evalFn = adversarial.NegatedEvaluation(evalFn)
+        elif (self.index != PACMAN_AGENT_INDEX):
+            # Scores are from pacman's point of view.
+            evalFn = adversarial.NegatedEvaluation(evalFn)
+
+        if (self._engine is not None):
+            self._engine.close()
+
+        self._engine = MonteCarloTreeSearch(evalFn, **self._options)
+
+    def registerRules(self, rules):
+        self._rules = rules
+
+def createTeam(firstIndex, secondIndex, isRed, **kwargs):
+    """
+    Create a capture team of two `MonteCarloAgent`s.
+    Any arguments (e.g. from --red-args) are passed to both agents.
+    """
+
+    return [
+        MonteCarloAgent(firstIndex, **kwargs),
+        MonteCarloAgent(secondIndex, **kwargs),
+    ]
+
+def rollout(state, agentIndex, seed, maxMoves, greedy, fast, maximizers, allowStop,
+        evalFn = None):
+    """
+    Play a game out from the state (with agentIndex to move) and get its value.
+
+    With fast set (classic pacman only), the game is played on a `PacmanSimulator`
+    and valued by its final score (from the maximizers' point of view).
+    Otherwise the game is played with `generateSuccessor` and valued with evalFn.
+    A greedy rollout (without a simulator) has each agent take the successor with the
+    best evaluation (from its side's point of view) most of the time.
+    """
+
+    rng = random.Random(seed)
+
+    if (fast):
+        simulator = PacmanSimulator(state)
+        return _orientScore(simulator.rollout(agentIndex, rng, maxMoves, greedy = greedy),
+                maximizers)
+
+    numAgents = state.getNumAgents()
+    moves = 0
+    while (not state.isOver() and moves < maxMoves):
+        if (state.getAgentPosition(agentIndex) is not None):
+            actions = _getActions(state, agentIndex, allowStop)
+
+            if (greedy and rng.random() < GREEDY_PROBABILITY):
+                successors = [state.generateSuccessor(agentIndex, action) for action in actions]
+                values = [evalFn(successor) for successor in successors]
+
+                if (agentIndex in maximizers):
+                    best = max(values)
+                else:
+                    best = min(values)
+
+                bestIndexes = [i for i in range(len(values)) if values[i] == best]
+                state = successors[rng.choice(bestIndexes)]
+            else:
+                state = state.generateSuccessor(agentIndex, rng.choice(actions))
+
+            moves += 1
+
+        agentIndex = (agentIndex + 1) % numAgents
+
+    return evalFn(state)
+
+def _orientScore(score, maximizers):
+    """
+    Classic scores are from pacman's point of view, flip them when the ghosts are searching.
+    """
+
+    if (PACMAN_AGENT_INDEX in maximizers):
+        return score
+
+    return -score
+
+def _getActions(state, agentIndex, allowStop):
+    actions = state.getLegalActions(agentIndex)
+
+    if (not allowStop and len(actions) > 1):
+        actions = [action for action in actions if action != Directions.STOP]
+
+    return actions
+
+# The evaluation function of this process (when it is a worker).
+_workerEvalFn = None
+
+def _initWorker(evalFn):
+    global _workerEvalFn
+    _workerEvalFn = evalFn
+
+def _rolloutTask(task):
+    return rollout(*task, evalFn = _workerEvalFn)
@@ -10,10 +10,17 @@ class MultiAgentSearchAgent(BaseAgent):
         super().__init__(index, **kwargs)
 
         self._evaluationFunction = reflection.qualifiedImport(evalFn)
+        self._evaluationFunctionName = evalFn
         self._treeDepth = int(depth)
 
     def getEvaluationFunction(self):
         return self._evaluationFunction
 
+    def getEvaluationFunctionName(self):
+        return self._evaluationFunctionName
+
     def getTreeDepth(self):
         return self._treeDepth
+
+    def setEvaluationFunction(self, evalFn):
+        self._evaluationFunction = evalFn
@@ -0,0 +1,151 @@
+"""
+Move ordering for `pacai.agents.search.adversarial.AdversarialSearch`.
+
+Alpha-beta prunes the most when the best move is searched first,
+but legal actions always come back in the same fixed order.
+A `MoveOrdering` sorts the actions at each node using a combination of heuristics
+(in priority order):
+ - `HEURISTIC_TABLE` -- The best move found by an earlier search of the same position.
+ - `HEURISTIC_KILLERS` -- Moves that recently caused a cutoff at the same ply.
+ - `HEURISTIC_HISTORY` -- How often (and how deep) a move from the same position caused cutoffs.
+ - `HEURISTIC_EVAL` -- The static evaluation of the successor (expensive, off by default).
+"""
+
+HEURISTIC_TABLE = 'table'
+HEURISTIC_KILLERS = 'killers'
+HEURISTIC_HISTORY = 'history'
+HEURISTIC_EVAL = 'eval'
+HEURISTICS = [HEURISTIC_TABLE, HEURISTIC_KILLERS, HEURISTIC_HISTORY, HEURISTIC_EVAL]
+
+DEFAULT_HEURISTICS = [HEURISTIC_TABLE, HEURISTIC_KILLERS, HEURISTIC_HISTORY]
+
+# The number of killer moves remembered per ply.
+NUM_KILLERS = 2
+
+class MoveOrdering(object):
+    """
+    Orders actions and learns from the cutoffs that the search reports back.
+    Subclasses can override `MoveOrdering.order` and `MoveOrdering.recordCutoff`
+    to plug in their own ordering.
+    """
+
+    def __init__(self, heuristics = DEFAULT_HEURISTICS):
+        for heuristic in heuristics:
+            if (heuristic not in HEURISTICS):
+                raise ValueError("Unknown move ordering heuristic: '%s'." % (heuristic))
+
+        self._heuristics = list(heuristics)
+
+        self._useTable = (HEURISTIC_TABLE in heuristics)
+        self._useKillers = (HEURISTIC_KILLERS in heuristics)
+        self._useHistory = (HEURISTIC_HISTORY in heuristics)
+        self._useEval = (HEURISTIC_EVAL in heuristics)
+
+        # {(ply, agentIndex): [action, ...], ...}
+        self._killers = {}
+
+        # {(agentIndex, position, action): score, ...}
+        self._history = {}
+
+    def getHeuristics(self):
+        return self._heuristics
+
+    def newRoot(self):
+        """
+        Called when the search starts from a new position.
+        Killers are tied to plies from the old root, so they are dropped.
+        History is aged so that old cutoffs slowly stop mattering.
+        """
+
+        self._killers.clear()
+
+        for key in list(self._history.keys()):
+            score = self._history[key] // 2
+            if (score == 0):
+                del self._history[key]
+            else:
+                self._history[key] = score
+
+    def order(self, state, agentIndex, actions, ply, bestAction, isMax, evaluate):
+        """
+        Sort the actions from the most to the least promising.
+
+        Args:
+            bestAction: The best action from an earlier search (or None).
+            isMax: Whether the agent is maximizing (matters for the static evaluation).
+            evaluate: A function from a state to its value.
+
+        Returns:
+            A list of (action, successor) pairs.
+            The successor is None if it has not been generated yet.
+        """
+
+        if (len(actions) <= 1):
+            return [(action, None) for action in actions]
+
+        if (not self._useTable):
+            bestAction = None
+
+        killers = ()
+        if (self._useKillers):
+            killers = self._killers.get((ply, agentIndex), ())
+
+        position = None
+        if (self._useHistory):
+            position = state.getAgentPosition(agentIndex)
+
+        ordered = []
+        for action in actions:
+            successor = None
+            key = [int(action == bestAction), 0, 0, 0]
+
+            if (action in killers):
+                key[1] = NUM_KILLERS - killers.index(action)
+
+            if (self._useHistory):
+                key[2] = self._history.get((agentIndex, position, action), 0)
+
+            if (self._useEval):
+                successor = state.generateSuccessor(agentIndex, action)
+                key[3] = evaluate(successor)
+                if (not isMax):
+                    key[3] = -key[3]
+
+            ordered.append((key, action, successor))
+
+        # The sort is stable, so ties keep the legal action order.
+        ordered.sort(key = lambda item: item[0], reverse = True)
+
+        return [(action, successor) for (key, action, successor) in ordered]
+
+    def recordCutoff(self, state, agentIndex, action, ply, depth):
+        """
+        Remember that the action caused a cutoff with depth remaining.
+        """
+
+        if (self._useKillers):
+            killers = self._killers.setdefault((ply, agentIndex), [])
+            if (action in killers):
+                killers.remove(action)
+
+            killers.insert(0, action)
+            del killers[NUM_KILLERS:]
+
+        if (self._useHistory):
+            key = (agentIndex, state.getAgentPosition(agentIndex), action)
+            self._history[key] = self._history.get(key, 0) + depth * depth
+
+def parseHeuristics(value):
+    """
+    Parse a list of heuristics written like 'table+killers+history'.
+    'none' (or an empty string) means no ordering.
+    """
+
+    if (isinstance(value, (list, tuple))):
+        return list(value)
+
+    value = str(value).strip()
+    if (value in ('', 'none')):
+        return []
+
+    return [heuristic.strip() for heuristic in value.split('+')]
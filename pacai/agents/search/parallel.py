@@ -0,0 +1,228 @@
+"""
+Adversarial search that splits the moves at the root across a pool of worker processes.
+
+The subtree under each root move can be searched on its own,
+so the root moves are handed out to workers and the best of the results is picked.
+Alpha-beta gets less pruning when subtrees are searched at the same time,
+so by default the eldest brother (the most promising root move) is searched first
+and its value is given to the younger brothers as a bound ("young brothers wait").
+
+The pool is created once and kept for the whole game.
+Each worker keeps its own engine (and so its own transposition table and move ordering)
+between moves, along with anything the evaluation function caches at the module level
+(e.g. distance tables for the layout).
+"""
+
+import math
+import multiprocessing
+import os
+
+from pacai.agents.search import adversarial
+from pacai.agents.search import ordering
+from pacai.util import util
+
+DEFAULT_NUM_WORKERS = os.cpu_count() or 1
+
+# The engine of this process (when it is a worker).
+_workerEngine = None
+
+class ParallelSearch(adversarial.AdversarialSearch):
+    """
+    An `pacai.agents.search.adversarial.AdversarialSearch` that searches root moves in parallel.
+    Searches below the root (or with only one root move) are done in this process.
+
+    The pool of workers is started on the first parallel search,
+    and should be shut down with `ParallelSearch.close` when it is no longer needed.
+    """
+
+    def __init__(self, evalFn, numWorkers = DEFAULT_NUM_WORKERS, mode = adversarial.MODE_ALPHA_BETA,
+            tableSize = adversarial.DEFAULT_TABLE_SIZE, allowStop = True,
+            heuristics = ordering.DEFAULT_HEURISTICS, youngBrothersWait = True, ghostModel = None,
+            chanceMode = adversarial.CHANCE_FULL,
+            chanceOutcomes = adversarial.DEFAULT_CHANCE_OUTCOMES, fullChancePlies = 0,
+            seed = None):
+        """
+        Args:
+            evalFn: A function from a game state to a value (from the maximizers' point of view).
+                    It is sent to the workers, so it should be picklable.
+            numWorkers: The number of worker processes.
+            heuristics: The move ordering heuristics (for this process and the workers).
+            youngBrothersWait: Search the first root move before the others (alpha-beta only).
+
+        The ghost model and chance options are the same as for
+        `pacai.agents.search.adversarial.AdversarialSearch` (and are sent to the workers).
+        """
+
+        chanceOptions = {
+            'ghostModel': ghostModel,
+            'chanceMode': chanceMode,
+            'chanceOutcomes': chanceOutcomes,
+            'fullChancePlies': fullChancePlies,
+            'seed': seed,
+        }
+
+        super().__init__(evalFn, mode = mode, tableSize = tableSize, allowStop = allowStop,
+                moveOrdering = ordering.MoveOrdering(heuristics), **chanceOptions)
+
+        self._numWorkers = max(1, int(numWorkers))
+        self._youngBrothersWait = youngBrothersWait
+
+        self._workerArgs = (evalFn, dict(chanceOptions, **{
+            'mode': mode,
+            'tableSize': tableSize,
+            'allowStop': allowStop,
+            'heuristics': list(heuristics),
+        }))
+
+        self._pool = None
+
+    def close(self):
+        """
+        Shut down the workers.
+        """
+
+        if (self._pool is not None):
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def getNumWorkers(self):
+        return self._numWorkers
+
+    def search(self, state, agentIndex, depth, maximizers = None, rootIndex = None,
+            alpha = -math.inf, beta = math.inf, deadline = None):
+        if (rootIndex is not None or depth <= 0 or state.isOver()
+                or state.getAgentPosition(agentIndex) is None):
+            return super().search(state, agentIndex, depth, maximizers = maximizers,
+                    rootIndex = rootIndex, alpha = alpha, beta = beta, deadline = deadline)
+
+        actions = self._getActions(state, agentIndex)
+        if (len(actions) <= 1):
+            return super().search(state, agentIndex, depth, maximizers = maximizers,
+                    alpha = alpha, beta = beta, deadline = deadline)
+
+        if (maximizers is None):
+            maximizers = [agentIndex]
+        maximizers = frozenset(maximizers)
+        isMax = (agentIndex in maximizers)
+
+        # Try the best move from the last iteration first.
+        if (self._rootAction in actions):
+            actions.remove(self._rootAction)
+            actions.insert(0, self._rootAction)
+
+        nextIndex = (agentIndex + 1) % state.getNumAgents()
+        nextDepth = depth
+        if (nextIndex == agentIndex):
+            nextDepth -= 1
+
+        results = []
+        if (self._youngBrothersWait and self.getMode() == adversarial.MODE_ALPHA_BETA):
+            # Search it below this root, so the move ordering (killers and history) is kept.
+            successor = state.generateSuccessor(agentIndex, actions[0])
+            value, _ = self.searchSubtree(state, successor, nextIndex, nextDepth, maximizers,
+                    agentIndex, alpha = alpha, beta = beta, deadline = deadline)
+            results.append((actions[0], value))
+
+            if (isMax):
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+
+            actions = actions[1:]
+
+        pool = self._getPool()
+        pending = []
+        for action in actions:
+            successor = state.generateSuccessor(agentIndex, action)
+            args = (state, successor, nextIndex, nextDepth, maximizers, agentIndex, alpha, beta,
+                    deadline)
+            pending.append((action, pool.apply_async(_searchSubtree, args)))
+
+        timedOut = False
+        for (action, result) in pending:
+            output = result.get()
+            if (output is None):
+                timedOut = True
+                continue
+
+            value, nodes = output
+            self._nodes += nodes
+            results.append((action, value))
+
+        if (timedOut):
+            raise adversarial.SearchTimeout()
+
+        bestAction, bestValue = results[0]
+        for (action, value) in results[1:]:
+            if ((isMax and value > bestValue) or (not isMax and value < bestValue)):
+                bestAction = action
+                bestValue = value
+
+        return bestValue, bestAction
+
+    def _getPool(self):
+        if (self._pool is None):
+            self._pool = multiprocessing.Pool(self._numWorkers, initializer = _initWorker,
+                    initargs = self._workerArgs)
+
+        return self._pool
+
+class ParallelSearchAgent(adversarial.AdversarialSearchAgent):
+    """
+    An `pacai.agents.search.adversarial.AdversarialSearchAgent` that uses a `ParallelSearch`.
+    Takes all the same options, plus the number of workers.
+    Since the evaluation function is sent to the workers, it must be picklable
+    (e.g. a module-level function).
+
+    Example:
+    `python3 -m pacai.bin.pacman -p ParallelSearchAgent --agent-args workers=4,iterative`
+    """
+
+    def __init__(self, index, workers = DEFAULT_NUM_WORKERS, youngBrothersWait = True, **kwargs):
+        super().__init__(index, **kwargs)
+
+        self._numWorkers = int(workers)
+        self._youngBrothersWait = util.parseBool(youngBrothersWait)
+
+    def createSearchEngine(self, evalFn):
+        engine = self.getSearchEngine()
+        if (engine is not None):
+            engine.close()
+
+        return ParallelSearch(evalFn, numWorkers = self._numWorkers, mode = self.getMode(),
+                tableSize = self.getTableSize(), allowStop = self.isStopAllowed(),
+                heuristics = self.getOrderingHeuristics(),
+                youngBrothersWait = self._youngBrothersWait, ghostModel = self._ghostModel,
+                **self._chanceOptions)
+
+    def final(self, state):
+        super().final(state)
+
+        engine = self.getSearchEngine()
+        if (engine is not None):
+            engine.close()
+
+def _initWorker(evalFn, options):
+    global _workerEngine
+
+    options = dict(options)
+    heuristics = options.pop('heuristics')
+    _workerEngine = adversarial.AdversarialSearch(evalFn,
+            moveOrdering = ordering.MoveOrdering(heuristics), **options)
+
+def _searchSubtree(root, state, agentIndex, depth, maximizers, rootIndex, alpha, beta, deadline):
+    """
+    Search a subtree (one root move) in a worker.
+    Returns (value, nodes expanded), or None if the deadline passed.
+    """
+
+    _workerEngine.resetStats()
+
+    try:
+        value, _ = _workerEngine.searchSubtree(root, state, agentIndex, depth, maximizers,
+                rootIndex, alpha = alpha, beta = beta, deadline = deadline)
+    except adversarial.SearchTimeout:
+        return None
+
+    return value, _workerEngine.getStats()['nodes']
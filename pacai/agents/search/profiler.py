@@ -0,0 +1,326 @@
+"""
+Profiling for multi-agent search.
+
+A `ProfilingAgent` wraps any agent (typically a
+`pacai.agents.search.multiagent.MultiAgentSearchAgent`) and records, for every move:
+the nodes generated at each ply, the time spent generating successors and evaluating states,
+the effective branching factor, and (when the agent uses a search engine with stats,
+like `pacai.agents.search.adversarial.AdversarialSearch`) its cutoffs and table hit rate.
+Each move is written to its own JSON file, which `pacai.bin.profile` can summarize.
+
+Successors are counted by handing the wrapped agent a profiled copy of the state.
+The copy's class is a cached subclass of the state's class that times `generateSuccessor`,
+and its successors are profiled in turn.
+Agents that are not wrapped (or wrappers that are disabled) pay nothing.
+
+Note that profiled states only compare equal to other profiled states,
+and they are sent to worker processes as plain states (so work done in workers is not counted).
+"""
+
+import copy
+import json
+import logging
+import os
+import time
+
+from pacai.agents.base import BaseAgent
+from pacai.util import util
+
+DEFAULT_PROFILE_DIR = 'profile'
+
+# The engine stats that are per-move counts (the rest are rates or running values).
+COUNTED_STATS = ['nodes', 'evaluations', 'choiceNodes', 'chanceNodes', 'reducedChanceNodes',
+        'cutoffs', 'firstMoveCutoffs', 'tableCutoffs', 'iterations', 'rollouts']
+
+# How closely to solve for the effective branching factor.
+BRANCHING_FACTOR_TOLERANCE = 1e-6
+
+# {state class: profiled subclass, ...}
+_profiledClasses = {}
+
+class SearchProfiler(object):
+    """
+    Collects the profile of one move at a time.
+    """
+
+    def __init__(self):
+        self._moveStart = None
+        self._resetMove()
+
+    def evaluate(self, evalFn, state):
+        """
+        Call the evaluation function on the state, and time it.
+        """
+
+        startTime = time.perf_counter()
+        value = evalFn(state)
+        self._evalTime += time.perf_counter() - startTime
+        self._evaluations += 1
+
+        return value
+
+    def finishMove(self, engineStats = None):
+        """
+        Finish profiling the current move, and get its profile.
+
+        Args:
+            engineStats: The difference in the search engine's stats over the move
+                         (see `statsDifference`).
+        """
+
+        totalTime = time.perf_counter() - self._moveStart
+        self._moveStart = None
+
+        maxPly = 0
+        if (len(self._plyNodes) > 0):
+            maxPly = max(self._plyNodes)
+
+        nodesPerPly = [self._plyNodes.get(ply, 0) for ply in range(1, maxPly + 1)]
+        numNodes = sum(nodesPerPly)
+
+        profile = {
+            'time': totalTime,
+            'successorTime': self._successorTime,
+            'evalTime': self._evalTime,
+            'otherTime': max(0.0, totalTime - self._successorTime - self._evalTime),
+            'successors': numNodes,
+            'evaluations': self._evaluations,
+            'nodesPerPly': nodesPerPly,
+            'maxPly': maxPly,
+            'branchingFactor': effectiveBranchingFactor(numNodes, maxPly),
+        }
+
+        if (engineStats is not None):
+            profile['engine'] = engineStats
+
+            if ('choiceNodes' in engineStats and 'cutoffs' in engineStats):
+                profile['cutoffRate'] = (engineStats['cutoffs']
+                        / max(1, engineStats['choiceNodes']))
+
+            if ('tableProbes' in engineStats and 'tableHits' in engineStats):
+                profile['tableHitRate'] = (engineStats['tableHits']
+                        / max(1, engineStats['tableProbes']))
+
+        self._resetMove()
+        return profile
+
+    def recordSuccessor(self, ply, elapsed):
+        self._plyNodes[ply] = self._plyNodes.get(ply, 0) + 1
+        self._successorTime += elapsed
+
+    def startMove(self, state):
+        """
+        Start profiling a move from the state.
+        Returns a profiled copy of the state to search from.
+        """
+
+        self._resetMove()
+        self._moveStart = time.perf_counter()
+
+        profiled = copy.copy(state)
+        profiled.__class__ = _getProfiledClass(type(state))
+        profiled._profiler = self
+        profiled._profilePly = 0
+
+        return profiled
+
+    def _resetMove(self):
+        # {ply: nodes, ...}
+        self._plyNodes = {}
+        self._successorTime = 0.0
+        self._evalTime = 0.0
+        self._evaluations = 0
+
+class ProfiledEvaluation(object):
+    """
+    An evaluation function that reports its time to a `SearchProfiler`.
+    """
+
+    def __init__(self, profiler, evalFn):
+        self._profiler = profiler
+        self._evalFn = evalFn
+
+    def __call__(self, state):
+        return self._profiler.evaluate(self._evalFn, state)
+
+class ProfilingAgent(BaseAgent):
+    """
+    Profiles another agent's search, writing a JSON file per move into profileDir.
+    Any agent args that are not for the profiler are passed along to the profiled agent.
+
+    Example:
+    `python3 -m pacai.bin.pacman -p ProfilingAgent --null-graphics
+            --agent-args agent=AdversarialSearchAgent,depth=3,profileDir=profile`
+    and then `python3 -m pacai.bin.profile profile`.
+    """
+
+    def __init__(self, index, agent = 'AdversarialSearchAgent', profileDir = DEFAULT_PROFILE_DIR,
+            enabled = True, **kwargs):
+        super().__init__(index)
+
+        self._agent = BaseAgent.loadAgent(agent, index, kwargs)
+        self._profileDir = profileDir
+        self._enabled = util.parseBool(enabled)
+
+        self._profiler = None
+        self._game = 0
+        self._move = 0
+
+        if (self._enabled):
+            self._profiler = SearchProfiler()
+
+            if (hasattr(self._agent, 'setEvaluationFunction')):
+                self._agent.setEvaluationFunction(ProfiledEvaluation(self._profiler,
+                        self._agent.getEvaluationFunction()))
+
+            os.makedirs(self._profileDir, exist_ok = True)
+
+    def final(self, state):
+        self._agent.final(state)
+        self._game += 1
+
+    def getAction(self, state):
+        if (not self._enabled):
+            return self._agent.getAction(state)
+
+        beforeStats = self._getEngineStats()
+
+        profiled = self._profiler.startMove(state)
+        action = self._agent.getAction(profiled)
+
+        engineStats = None
+        afterStats = self._getEngineStats()
+        if (afterStats is not None):
+            engineStats = statsDifference(beforeStats, afterStats)
+
+        profile = self._profiler.finishMove(engineStats)
+        profile['agent'] = self.index
+        profile['game'] = self._game
+        profile['move'] = self._move
+        profile['action'] = action
+
+        self._writeProfile(profile)
+        self._move += 1
+
+        return action
+
+    def getAgent(self):
+        return self._agent
+
+    def getProfileDir(self):
+        return self._profileDir
+
+    def isEnabled(self):
+        return self._enabled
+
+    def observationFunction(self, state):
+        return self._agent.observationFunction(state)
+
+    def registerInitialState(self, state):
+        self._agent.registerInitialState(state)
+
+    def registerRules(self, rules):
+        self._agent.registerRules(rules)
+
+    def _getEngineStats(self):
+        if (not hasattr(self._agent, 'getSearchEngine')):
+            return None
+
+        engine = self._agent.getSearchEngine()
+        if (engine is None or not hasattr(engine, 'getStats')):
+            return None
+
+        return engine.getStats()
+
+    def _writeProfile(self, profile):
+        path = os.path.join(self._profileDir, 'move-%d-%05d.json' % (self.index, self._move))
+
+        with open(path, 'w') as file:
+            json.dump(profile, file, indent = 4)
+
+        logging.debug('Wrote the profile of move %d to %s.' % (self._move, path))
+
+def effectiveBranchingFactor(numNodes, depth):
+    """
+    The branching factor b of a uniform tree with the same number of (non-root) nodes and depth:
+    b + b^2 + ... + b^depth = numNodes.
+    """
+
+    if (depth <= 0 or numNodes <= 0):
+        return 0.0
+
+    def treeSize(branchingFactor):
+        return sum([branchingFactor ** ply for ply in range(1, depth + 1)])
+
+    low = 0.0
+    high = float(numNodes)
+    while (high - low > BRANCHING_FACTOR_TOLERANCE):
+        middle = (low + high) / 2.0
+        if (treeSize(middle) < numNodes):
+            low = middle
+        else:
+            high = middle
+
+    return (low + high) / 2.0
+
+def statsDifference(before, after):
+    """
+    The per-move counts from two snapshots of a search engine's stats
+    (see `COUNTED_STATS`, and the table's probes and hits).
+    """
+
+    if (before is None):
+        before = {}
+
+    difference = {}
+    for key in COUNTED_STATS:
+        if (key in after):
+            difference[key] = after[key] - before.get(key, 0)
+
+    if ('table' in after):
+        beforeTable = before.get('table', {})
+        difference['tableProbes'] = after['table']['probes'] - beforeTable.get('probes', 0)
+        difference['tableHits'] = after['table']['hits'] - beforeTable.get('hits', 0)
+
+    return difference
+
+def _getProfiledClass(stateClass):
+    if (stateClass in _profiledClasses):
+        return _profiledClasses[stateClass]
+
+    if (stateClass in _profiledClasses.values()):
+        return stateClass
+
+    def generateSuccessor(self, agentIndex, action):
+        startTime = time.perf_counter()
+        successor = stateClass.generateSuccessor(self, agentIndex, action)
+        elapsed = time.perf_counter() - startTime
+
+        successor._profilePly = self._profilePly + 1
+        self._profiler.recordSuccessor(successor._profilePly, elapsed)
+
+        return successor
+
+    def copyState(self):
+        state = object.__new__(type(self))
+        state.__dict__.update(self.__dict__)
+        return state
+
+    def reduceState(self):
+        # Send the plain state (e.g. to worker processes).
+        state = object.__new__(stateClass)
+        state.__dict__.update(self.__dict__)
+        del state._profiler
+        del state._profilePly
+
+        return (copy.copy, (state,))
+
+    profiledClass = type('Profiled' + stateClass.__name__, (stateClass,), {
+        'generateSuccessor': generateSuccessor,
+        '__copy__': copyState,
+        '__reduce__': reduceState,
+        '__hash__': stateClass.__hash__,
+    })
+
+    _profiledClasses[stateClass] = profiledClass
+    return profiledClass
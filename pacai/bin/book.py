@@ -0,0 +1,154 @@
+"""
+Precompute opening books (see `pacai.agents.search.book`) for fixed layouts.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import textwrap
+import time
+
+from pacai.agents.base import BaseAgent
+from pacai.agents.search import book
+from pacai.bin.capture import CaptureGameState
+from pacai.bin.pacman import PacmanGameState
+from pacai.bin.pacman import parseAgentArgs
+from pacai.core.layout import getLayout
+from pacai.util.logs import initLogging
+from pacai.util.logs import updateLoggingLevel
+
+DEFAULT_CAPTURE_LENGTH = 1200
+
+def precompute(layoutName, agentName = 'AdversarialSearchAgent', agentArgs = {},
+        agentIndices = None, moves = 2, bookDir = book.DEFAULT_BOOK_DIR, capture = None):
+    """
+    Build (or extend) the opening book for a layout and save it.
+
+    Args:
+        agentIndices: The agents to build the book for
+                      (defaults to pacman, or every agent in capture).
+        capture: Whether the layout is for capture (defaults to whether its name says so).
+    """
+
+    if (capture is None):
+        capture = ('Capture' in layoutName)
+
+    layout = getLayout(layoutName)
+    if (layout is None):
+        raise ValueError('Unknown layout: %s.' % (layoutName))
+
+    if (capture):
+        state = CaptureGameState(layout, DEFAULT_CAPTURE_LENGTH)
+    else:
+        state = PacmanGameState(layout)
+
+    if (agentIndices is None):
+        agentIndices = [0]
+        if (capture):
+            agentIndices = list(range(state.getNumAgents()))
+
+    agents = {}
+    for agentIndex in agentIndices:
+        agent = BaseAgent.loadAgent(agentName, agentIndex, agentArgs)
+        agent.registerInitialState(state)
+        agents[agentIndex] = agent
+
+    # All the agents share the same settings.
+    settings = agents[agentIndices[0]].getBookSettings()
+    openingBook = book.OpeningBook.load(bookDir, layout, settings)
+    size = len(openingBook)
+
+    startTime = time.time()
+    book.buildBook(state, agents, moves, openingBook)
+
+    logging.info('Searched the first %d moves of %s in %.2f seconds, %d new positions.' %
+            (moves, layoutName, time.time() - startTime, len(openingBook) - size))
+
+    openingBook.save(bookDir)
+    return openingBook
+
+def parseOptions(argv):
+    description = """
+    DESCRIPTION:
+        Precompute the opening book for layouts, by searching every position
+        reachable in the first few moves.
+        Agents use the book when given the same book dir and settings.
+
+    EXAMPLES:
+        (1) python -m pacai.bin.book -l contestClassic --agent-args depth=4
+            python -m pacai.bin.pacman -l contestClassic -p AdversarialSearchAgent \\
+                --agent-args depth=4,bookDir=~/.cache/pacai/books
+            - Build a depth 4 book for contestClassic, and play with it.
+        (2) python -m pacai.bin.book -l defaultCapture -l mediumCapture --moves 3
+            - Build books covering the first three moves of two capture layouts.
+    """
+
+    parser = argparse.ArgumentParser(description = textwrap.dedent(description),
+        prog = os.path.basename(__file__), formatter_class = argparse.RawTextHelpFormatter)
+
+    parser.add_argument('-a', '--agent-args', dest = 'agentArgs',
+            action = 'store', type = str, default = None,
+            help = 'comma separated arguments to be passed to the agent '
+                + '(e.g. \'opt1=val1,opt2,opt3=val3\') (default: %(default)s)')
+
+    parser.add_argument('-i', '--agent-index', dest = 'agentIndices',
+            action = 'append', type = int, default = None,
+            help = 'build the book for this agent, can be given more than once '
+                + '(default: pacman, or every agent in capture)')
+
+    parser.add_argument('-l', '--layout', dest = 'layouts',
+            action = 'append', type = str, default = None,
+            help = 'build a book for this layout, can be given more than once '
+                + '(default: contestClassic)')
+
+    parser.add_argument('-m', '--moves', dest = 'moves',
+            action = 'store', type = int, default = 2,
+            help = 'the number of moves (by each agent) to cover (default: %(default)s)')
+
+    parser.add_argument('-p', '--agent', dest = 'agent',
+            action = 'store', type = str, default = 'AdversarialSearchAgent',
+            help = 'the agent that searches the positions (default: %(default)s)')
+
+    parser.add_argument('-q', '--quiet', dest = 'quiet',
+            action = 'store_true', default = False,
+            help = 'set logging level to warning (default: %(default)s)')
+
+    parser.add_argument('--book-dir', dest = 'bookDir',
+            action = 'store', type = str, default = book.DEFAULT_BOOK_DIR,
+            help = 'where to load/save books (default: %(default)s)')
+
+    options, otherjunk = parser.parse_known_args(argv)
+
+    if len(otherjunk) != 0:
+        raise ValueError('Unrecognized options: \'%s\'.' % (str(otherjunk)))
+
+    if (options.quiet):
+        updateLoggingLevel(logging.WARNING)
+
+    if (options.layouts is None):
+        options.layouts = ['contestClassic']
+
+    return options
+
+def main(argv):
+    """
+    Entry point for precomputing opening books.
+    The args are a blind pass of `sys.argv` with the executable stripped.
+    """
+
+    initLogging()
+
+    options = parseOptions(argv)
+    agentArgs = parseAgentArgs(options.agentArgs)
+
+    books = []
+    for layoutName in options.layouts:
+        books.append(precompute(layoutName, options.agent, agentArgs,
+                agentIndices = options.agentIndices, moves = options.moves,
+                bookDir = options.bookDir))
+
+    return books
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
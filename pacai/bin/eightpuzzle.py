@@ -1,168 +1,134 @@
+import argparse
+import logging
+import os
 import random
+import sys
+import textwrap
+import time
 
+from pacai.core import slidingpuzzle
 from pacai.core.search import search
 from pacai.core.search.problem import SearchProblem
 from pacai.util.logs import initLogging
+from pacai.util.logs import updateLoggingLevel
 
-class EightPuzzleState:
+class SlidingPuzzleState:
     """
-    The Eight Puzzle is described in the course textbook on page 64.
+    The mechanics of a sliding tile puzzle of width (and height) SIZE.
 
-    This class defines the mechanics of the puzzle itself.
-    The task of recasting this puzzle as a search problem is left to
-    the EightPuzzleSearchProblem class.
+    The cells are packed into a single integer (4 bits per cell),
+    see `pacai.core.slidingpuzzle` for the representation.
+    So copying, hashing, and comparing puzzles are all cheap integer operations.
     """
 
+    SIZE = 3
+
     def __init__(self, numbers):
         """
-        Constructs a new eight puzzle from an ordering of numbers.
-
-        numbers: a list of integers from 0 to 8 representing an instance of the eight puzzle.
-        0 represents the blank space.
-        Thus, the list:
-        [1, 0, 2, 3, 4, 5, 6, 7, 8]
-
-        Represents the eight puzzle:
-        -------------
-        | 1 |   | 2 |
-        -------------
-        | 3 | 4 | 5 |
-        -------------
-        | 6 | 7 | 8 |
-        ------------
-
-        The state of the puzzle is stored in a 2-dimensional list (a list of lists) 'cells'.
+        Constructs a new puzzle from a row-major ordering of numbers,
+        where 0 represents the blank space.
         """
 
-        self.cells = []
-        numbers = numbers[:]  # Make a copy so as not to cause side-effects.
-        numbers.reverse()
-        for row in range(3):
-            self.cells.append([])
-            for col in range(3):
-                self.cells[row].append(numbers.pop())
-                if self.cells[row][col] == 0:
-                    self.blankLocation = row, col
+        if (sorted(numbers) != list(range(self.SIZE * self.SIZE))):
+            raise ValueError('A puzzle needs each number from 0 to %d exactly once.' %
+                    (self.SIZE * self.SIZE - 1))
 
-    def isGoal(self):
+        self._packed = slidingpuzzle.pack(numbers)
+        self._blank = numbers.index(0)
+
+    @classmethod
+    def fromPacked(cls, packed, blank = None):
+        """
+        Construct a puzzle directly from its packed representation.
         """
-        Checks to see if the puzzle is in its goal state.
 
-        -------------
-        |   | 1 | 2 |
-        -------------
-        | 3 | 4 | 5 |
-        -------------
-        | 6 | 7 | 8 |
-        -------------
+        if (blank is None):
+            blank = slidingpuzzle.findBlank(packed, cls.SIZE)
+
+        puzzle = cls.__new__(cls)
+        puzzle._packed = packed
+        puzzle._blank = blank
 
-        >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).isGoal()
-        True
+        return puzzle
 
-        >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).isGoal()
-        False
+    @property
+    def blankLocation(self):
+        """
+        The (row, col) of the blank space.
         """
 
-        current = 0
-        for row in range(3):
-            for col in range(3):
-                if current != self.cells[row][col]:
-                    return False
-                current += 1
-        return True
+        return divmod(self._blank, self.SIZE)
 
-    def legalMoves(self):
+    @property
+    def cells(self):
+        """
+        The state of the puzzle as a 2-dimensional list (a list of rows).
+        This is built on every access, so favor the methods of this class.
         """
-            Returns a list of legal moves from the current state.
 
-        Moves consist of moving the blank space up, down, left or right.
-        These are encoded as 'up', 'down', 'left' and 'right' respectively.
+        numbers = slidingpuzzle.unpack(self._packed, self.SIZE)
+        return [numbers[(row * self.SIZE):((row + 1) * self.SIZE)] for row in range(self.SIZE)]
 
-        >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).legalMoves()
-        ['down', 'right']
-        """
+    def getPacked(self):
+        return self._packed
 
-        moves = []
-        row, col = self.blankLocation
-        if(row != 0):
-            moves.append('up')
+    def isGoal(self):
+        """
+        Checks to see if the puzzle is in its goal state
+        (the blank in the top left and all the other numbers in order).
+        """
 
-        if(row != 2):
-            moves.append('down')
+        return self._packed == slidingpuzzle.goalState(self.SIZE)
 
-        if(col != 0):
-            moves.append('left')
+    def legalMoves(self):
+        """
+        Returns a list of legal moves from the current state.
 
-        if(col != 2):
-            moves.append('right')
+        Moves consist of moving the blank space up, down, left or right.
+        These are encoded as 'up', 'down', 'left' and 'right' respectively.
+        """
 
-        return moves
+        return [move for (move, newBlank) in slidingpuzzle.getMoveTable(self.SIZE)[self._blank]]
 
     def result(self, move):
         """
-        Returns a new eightPuzzle with the current state and blankLocation
+        Returns a new puzzle with the current state and blankLocation
         updated based on the provided move.
 
         The move should be a string drawn from a list returned by legalMoves.
-        Illegal moves will raise an exception, which may be an array bounds
-        exception.
+        Illegal moves will raise an exception.
 
         NOTE: This function *does not* change the current object.
         Instead, it returns a new object.
         """
 
-        row, col = self.blankLocation
-        if (move == 'up'):
-            newrow = row - 1
-            newcol = col
-        elif (move == 'down'):
-            newrow = row + 1
-            newcol = col
-        elif (move == 'left'):
-            newrow = row
-            newcol = col - 1
-        elif (move == 'right'):
-            newrow = row
-            newcol = col + 1
-        else:
-            raise Exception('Illegal Move')
-
-        # Create a copy of the current eightPuzzle
-        newPuzzle = EightPuzzleState([0, 0, 0, 0, 0, 0, 0, 0, 0])
-        newPuzzle.cells = [values[:] for values in self.cells]
-        # And update it to reflect the move
-        newPuzzle.cells[row][col] = self.cells[newrow][newcol]
-        newPuzzle.cells[newrow][newcol] = self.cells[row][col]
-        newPuzzle.blankLocation = newrow, newcol
-
-        return newPuzzle
+        for (legalMove, newBlank) in slidingpuzzle.getMoveTable(self.SIZE)[self._blank]:
+            if (move == legalMove):
+                packed = slidingpuzzle.applyMove(self._packed, self._blank, newBlank)
+                return self.fromPacked(packed, newBlank)
+
+        raise Exception('Illegal Move')
 
     # Utilities for comparison and display
     def __eq__(self, other):
         """
-        Overloads '==' such that two eightPuzzles with the same state are equal.
-
-        >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]) == \
-            EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).result('left')
-        True
+        Overloads '==' such that two puzzles with the same state are equal.
         """
 
-        for row in range(3):
-            if self.cells[row] != other.cells[row]:
-                return False
-
-        return True
+        return isinstance(other, SlidingPuzzleState) and self._packed == other._packed
 
     def __hash__(self):
-        return hash(str(self.cells))
+        return hash(self._packed)
 
     def __getAsciiString(self):
         """
             Returns a display string for the maze
         """
 
+        width = len(str(self.SIZE * self.SIZE - 1))
+
         lines = []
-        horizontalLine = ('-' * (13))
+        horizontalLine = ('-' * (self.SIZE * (width + 3) + 1))
         lines.append(horizontalLine)
 
         for row in self.cells:
@@ -170,7 +136,7 @@ class EightPuzzleState:
             for col in row:
                 if col == 0:
                     col = ' '
-                rowLine = rowLine + ' ' + col.__str__() + ' |'
+                rowLine = rowLine + ' ' + str(col).rjust(width) + ' |'
             lines.append(rowLine)
             lines.append(horizontalLine)
 
@@ -179,6 +145,49 @@ class EightPuzzleState:
     def __str__(self):
         return self.__getAsciiString()
 
+class EightPuzzleState(SlidingPuzzleState):
+    """
+    The Eight Puzzle is described in the course textbook on page 64.
+
+    This class defines the mechanics of the puzzle itself.
+    The task of recasting this puzzle as a search problem is left to
+    the EightPuzzleSearchProblem class.
+
+    The list of numbers:
+    [1, 0, 2, 3, 4, 5, 6, 7, 8]
+
+    Represents the eight puzzle:
+    -------------
+    | 1 |   | 2 |
+    -------------
+    | 3 | 4 | 5 |
+    -------------
+    | 6 | 7 | 8 |
+    ------------
+
+    >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).isGoal()
+    True
+
+    >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).isGoal()
+    False
+
+    >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).legalMoves()
+    ['down', 'right']
+
+    >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]) == \
+        EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).result('left')
+    True
+    """
+
+    SIZE = 3
+
+class FifteenPuzzleState(SlidingPuzzleState):
+    """
+    The 4x4 version of the Eight Puzzle.
+    """
+
+    SIZE = 4
+
 class EightPuzzleSearchProblem(SearchProblem):
     """
     Implementation of a SearchProblem for the Eight Puzzle domain
@@ -261,20 +270,136 @@ def createRandomEightPuzzle(moves = 100):
     a series of 'moves' random moves to a solved
     puzzle.
     """
-    puzzle = EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8])
+
+    return createRandomPuzzle(EightPuzzleState, moves)
+
+def createRandomPuzzle(puzzleClass, moves = 100):
+    """
+    Creates a random puzzle of the given class (e.g. FifteenPuzzleState)
+    by applying a series of 'moves' random moves to a solved puzzle.
+    """
+
+    size = puzzleClass.SIZE
+    moveTable = slidingpuzzle.getMoveTable(size)
+
+    packed = slidingpuzzle.goalState(size)
+    blank = 0
     for i in range(moves):
         # Execute a random legal move
-        puzzle = puzzle.result(random.sample(puzzle.legalMoves(), 1)[0])
-    return puzzle
+        move, newBlank = random.sample(moveTable[blank], 1)[0]
+        packed = slidingpuzzle.applyMove(packed, blank, newBlank)
+        blank = newBlank
+
+    return puzzleClass.fromPacked(packed, blank)
+
+def runBenchmark(puzzleClass, numPuzzles, moves, cacheDir):
+    """
+    Optimally solve a number of random puzzles with IDA* and the pattern database heuristic.
+    Returns the number of puzzles solved per second.
+    """
+
+    size = puzzleClass.SIZE
+
+    startTime = time.time()
+    database = slidingpuzzle.PatternDatabase(size, cacheDir = cacheDir)
+    logging.info('Loaded pattern database in %.2f seconds.' % (time.time() - startTime))
+
+    puzzles = [createRandomPuzzle(puzzleClass, moves) for i in range(numPuzzles)]
+
+    totalMoves = 0
+    startTime = time.time()
+    for puzzle in puzzles:
+        totalMoves += len(slidingpuzzle.solve(puzzle.getPacked(), size, database))
+    elapsed = max(time.time() - startTime, 1e-9)
 
-def main():
+    logging.info('Solved %d puzzles (average solution: %.1f moves) in %.2f seconds (%.1f / sec).' %
+            (numPuzzles, totalMoves / max(1, numPuzzles), elapsed, numPuzzles / elapsed))
+
+    return numPuzzles / elapsed
+
+def parseOptions(argv):
+    description = """
+    DESCRIPTION:
+        Solve a random sliding puzzle with the student's BFS,
+        or benchmark the pattern database solver on many random puzzles.
+
+    EXAMPLES:
+        (1) python -m pacai.bin.eightpuzzle
+            - Step through a BFS solution to a random eight puzzle.
+        (2) python -m pacai.bin.eightpuzzle --benchmark 1000
+            - Optimally solve 1000 random eight puzzles.
+        (3) python -m pacai.bin.eightpuzzle --benchmark 10 --fifteen
+            - Optimally solve 10 random fifteen puzzles.
+    """
+
+    parser = argparse.ArgumentParser(description = textwrap.dedent(description),
+        prog = os.path.basename(__file__), formatter_class = argparse.RawTextHelpFormatter)
+
+    parser.add_argument('-b', '--benchmark', dest = 'benchmark',
+            action = 'store', type = int, default = 0,
+            help = 'optimally solve this many random puzzles and report the speed '
+                + '(default: %(default)s)')
+
+    parser.add_argument('-m', '--moves', dest = 'moves',
+            action = 'store', type = int, default = None,
+            help = 'the number of random moves used to scramble a puzzle '
+                + '(default: 25, or 100 when benchmarking)')
+
+    parser.add_argument('-q', '--quiet', dest = 'quiet',
+            action = 'store_true', default = False,
+            help = 'set logging level to warning (default: %(default)s)')
+
+    parser.add_argument('-s', '--seed', dest = 'seed',
+            action = 'store', type = int, default = None,
+            help = 'seed the random puzzles (default: %(default)s)')
+
+    parser.add_argument('--fifteen', dest = 'fifteen',
+            action = 'store_true', default = False,
+            help = 'use the fifteen puzzle instead of the eight puzzle (default: %(default)s)')
+
+    parser.add_argument('--pdb-dir', dest = 'pdbDir',
+            action = 'store', type = str, default = slidingpuzzle.DEFAULT_CACHE_DIR,
+            help = 'where to cache pattern databases (default: %(default)s)')
+
+    options, otherjunk = parser.parse_known_args(argv)
+
+    if len(otherjunk) != 0:
+        raise ValueError('Unrecognized options: \'%s\'.' % (str(otherjunk)))
+
+    if (options.quiet):
+        updateLoggingLevel(logging.WARNING)
+
+    if (options.seed is not None):
+        random.seed(options.seed)
+
+    return options
+
+def main(argv):
     """
     Entry point for the eightpuzzle simulation.
+    The args are a blind pass of `sys.argv` with the executable stripped.
     """
 
     initLogging()
 
-    puzzle = createRandomEightPuzzle(25)
+    options = parseOptions(argv)
+
+    puzzleClass = EightPuzzleState
+    if (options.fifteen):
+        puzzleClass = FifteenPuzzleState
+
+    if (options.benchmark > 0):
+        moves = options.moves
+        if (moves is None):
+            moves = 100
+
+        return runBenchmark(puzzleClass, options.benchmark, moves, options.pdbDir)
+
+    moves = options.moves
+    if (moves is None):
+        moves = 25
+
+    puzzle = createRandomPuzzle(puzzleClass, moves)
     print('A random puzzle:\n' + str(puzzle))
 
     problem = EightPuzzleSearchProblem(puzzle)
@@ -290,4 +415,4 @@ def main():
         i += 1
 
 if __name__ == '__main__':
-    main()
+    main(sys.argv[1:])
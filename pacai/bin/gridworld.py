@@ -5,10 +5,14 @@ import random
 import sys
 import textwrap
 
+from pacai.agents.learning.policy import PolicyIterationAgent
 from pacai.agents.learning.reinforcement import ReinforcementAgent
+from pacai.agents.learning.weights import loadWeights
+from pacai.agents.learning.weights import saveWeights
 from pacai.core.environment import Environment
 from pacai.core.mdp import MarkovDecisionProcess
 from pacai.student.qlearningAgents import QLearningAgent
+from pacai.student.valueIterationAgent import SWEEP_MODES
 from pacai.student.valueIterationAgent import ValueIterationAgent
 from pacai.ui.gridworld.text import TextGridworldDisplay
 from pacai.ui.gridworld.utils import wait_for_keys
@@ -27,6 +31,14 @@ class Gridworld(MarkovDecisionProcess):
         self.livingReward = 0.0
         self.noise = 0.2
 
+        # The states, rewards, and transitions are computed once and cached,
+        # since planners ask for them in their innermost loops.
+        # The rewards and transitions depend on the parameters,
+        # so they are dropped when those are set.
+        self._states = None
+        self._rewards = None
+        self._transitions = None
+
     def setLivingReward(self, reward):
         """
         The (negative) reward for exiting "normal" states.
@@ -37,6 +49,7 @@ class Gridworld(MarkovDecisionProcess):
         """
 
         self.livingReward = reward
+        self._rewards = None
 
     def setNoise(self, noise):
         """
@@ -44,6 +57,7 @@ class Gridworld(MarkovDecisionProcess):
         """
 
         self.noise = noise
+        self._transitions = None
 
     def getPossibleActions(self, state):
         """
@@ -66,8 +80,15 @@ class Gridworld(MarkovDecisionProcess):
     def getStates(self):
         """
         Return list of all states.
+        The list is shared, so it should not be modified.
         """
 
+        if (self._states is None):
+            self._states = self.__computeStates()
+
+        return self._states
+
+    def __computeStates(self):
         # The true terminal state.
         states = [self.grid.terminalState]
         for x in range(self.grid.width):
@@ -87,6 +108,16 @@ class Gridworld(MarkovDecisionProcess):
         less use this convention).
         """
 
+        if (self._rewards is None):
+            self._rewards = {state: self.__computeReward(state) for state in self.getStates()}
+
+        reward = self._rewards.get(state)
+        if (reward is None):
+            reward = self.__computeReward(state)
+
+        return reward
+
+    def __computeReward(self, state):
         if state == self.grid.terminalState:
             return 0.0
 
@@ -122,8 +153,24 @@ class Gridworld(MarkovDecisionProcess):
         representing the states reachable
         from 'state' by taking 'action' along
         with their transition probabilities.
+        The list is shared, so it should not be modified.
         """
 
+        if (self._transitions is None):
+            self._transitions = {}
+            for cachedState in self.getStates():
+                for cachedAction in self.getPossibleActions(cachedState):
+                    key = (cachedState, cachedAction)
+                    self._transitions[key] = self.__computeTransitions(cachedState, cachedAction)
+
+        # States outside of the cache (walls) and illegal actions take the long way.
+        transitions = self._transitions.get((state, action))
+        if (transitions is None):
+            transitions = self.__computeTransitions(state, action)
+
+        return transitions
+
+    def __computeTransitions(self, state, action):
         if action not in self.getPossibleActions(state):
             raise Exception('Illegal action!')
 
@@ -385,7 +432,8 @@ def parseOptions(argv):
 
     parser.add_argument('-a', '--agent', dest = 'agent',
             action = 'store', type = str, default = 'random',
-            help = 'agent type (options are \'random\', \'value\' and \'q\', default %(default)s)')
+            help = 'agent type (options are \'random\', \'value\', \'policy\' and \'q\', '
+                + 'default %(default)s)')
 
     parser.add_argument('-d', '--debug', dest = 'debug',
             action = 'store_true', default = False,
@@ -401,7 +449,8 @@ def parseOptions(argv):
 
     parser.add_argument('-i', '--iterations', dest = 'iters',
             action = 'store', type = int, default = 10,
-            help = 'number of rounds of value iteration (default %(default)s)')
+            help = 'number of rounds of value (or most rounds of policy) iteration '
+                + '(default %(default)s)')
 
     parser.add_argument('-k', '--episodes', dest = 'episodes',
             action = 'store', type = int, default = 1,
@@ -439,6 +488,39 @@ def parseOptions(argv):
             action = 'store', type = float, default = 0.9,
             help = 'discount on future (default %(default)s)')
 
+    parser.add_argument('--array-table', dest = 'arrayTable',
+            action = 'store_true', default = False,
+            help = 'keep q-learning\'s q-values in an array backed table (default %(default)s)')
+
+    parser.add_argument('--load-weights', dest = 'loadWeights',
+            action = 'store', type = str, default = None,
+            help = 'start q-learning from q-values saved with --save-weights '
+                + '(default %(default)s)')
+
+    parser.add_argument('--save-weights', dest = 'saveWeights',
+            action = 'store', type = str, default = None,
+            help = 'save q-learning\'s q-values after all episodes (default %(default)s)')
+
+    parser.add_argument('--compiled', dest = 'compiled',
+            action = 'store_true', default = False,
+            help = 'run value iteration over a compiled (array) form of the MDP '
+                + '(default %(default)s)')
+
+    parser.add_argument('--sweep', dest = 'sweep',
+            action = 'store', type = str, default = 'sync', choices = SWEEP_MODES,
+            help = 'how value iteration backs up states: in synchronous sweeps, in place sweeps, '
+                + 'or by priority (default %(default)s)')
+
+    parser.add_argument('--tolerance', dest = 'tolerance',
+            action = 'store', type = float, default = None,
+            help = 'stop value iteration once no value changes by more than this '
+                + '(default %(default)s)')
+
+    parser.add_argument('--eval-sweeps', dest = 'evalSweeps',
+            action = 'store', type = int, default = 0,
+            help = 'evaluate policies in policy iteration with this many sweeps, '
+                + 'instead of exactly (default %(default)s)')
+
     parser.add_argument('--manual', dest = 'manual',
             action = 'store_true', default = False,
             help = 'manually control agent (default %(default)s)')
@@ -480,6 +562,10 @@ def parseOptions(argv):
     if options.manual:
         options.pause = True
 
+    if ((options.loadWeights is not None or options.saveWeights is not None)
+            and options.agent != 'q'):
+        raise ValueError('Only the q-learning agent (-a q) has weights to load or save.')
+
     return options
 
 def main(argv):
@@ -518,15 +604,27 @@ def main(argv):
 
     a = None
     if (opts.agent == 'value'):
-        a = ValueIterationAgent(0, mdp, opts.discount, opts.iters)
+        a = ValueIterationAgent(0, mdp, opts.discount, opts.iters, compiled = opts.compiled,
+                sweep = opts.sweep, tolerance = opts.tolerance)
+        logging.info('Value iteration made %d backups in %d sweeps.' %
+                (a.numBackups, a.numSweeps))
+    elif (opts.agent == 'policy'):
+        a = PolicyIterationAgent(0, mdp, gamma = opts.discount, iters = opts.iters,
+                evalSweeps = opts.evalSweeps)
+        logging.info('Policy iteration ran %d iterations in %.3f seconds.' %
+                (a.numIterations, a.runTime))
     elif (opts.agent == 'q'):
         qLearnOpts = {
             'gamma': opts.discount,
             'alpha': opts.learningRate,
             'epsilon': opts.epsilon,
             'actionFn': lambda state: mdp.getPossibleActions(state),
+            'arrayTable': opts.arrayTable,
         }
         a = QLearningAgent(0, **qLearnOpts)
+
+        if (opts.loadWeights is not None):
+            loadWeights(a, opts.loadWeights)
     elif (opts.agent == 'random'):
         # No reason to use the random agent without episodes.
         if (opts.episodes == 0):
@@ -562,7 +660,8 @@ def main(argv):
     if (not opts.manual and opts.agent == 'value'):
         if (opts.valueSteps):
             for i in range(opts.iters):
-                tempAgent = ValueIterationAgent(0, mdp, opts.discount, i)
+                tempAgent = ValueIterationAgent(0, mdp, opts.discount, i,
+                        compiled = opts.compiled, sweep = opts.sweep, tolerance = opts.tolerance)
                 display.displayValues(tempAgent, message = 'VALUES AFTER ' + str(i) + ' ITERATIONS')
                 display.pause()
 
@@ -570,6 +669,12 @@ def main(argv):
         display.pause()
         display.displayQValues(a, message = 'Q-VALUES AFTER ' + str(opts.iters) + ' ITERATIONS')
         display.pause()
+    elif (not opts.manual and opts.agent == 'policy'):
+        message = ' AFTER ' + str(a.numIterations) + ' POLICY ITERATIONS'
+        display.displayValues(a, message = 'VALUES' + message)
+        display.pause()
+        display.displayQValues(a, message = 'Q-VALUES' + message)
+        display.pause()
 
     # Figure out what to display each time step (if anything).
     displayCallback = lambda x: None
@@ -579,7 +684,7 @@ def main(argv):
         else:
             if (opts.agent == 'random'):
                 displayCallback = lambda state: display.displayValues(a, state, 'CURRENT VALUES')
-            elif (opts.agent == 'value'):
+            elif (opts.agent in ['value', 'policy']):
                 displayCallback = lambda state: display.displayValues(a, state, 'CURRENT VALUES')
             elif (opts.agent == 'q'):
                 displayCallback = lambda state: display.displayQValues(a, state, 'CURRENT Q-VALUES')
@@ -611,6 +716,9 @@ def main(argv):
     if (opts.episodes > 0):
         logging.debug('AVERAGE RETURNS FROM START STATE:' + str((returns + 0.0) / opts.episodes))
 
+    if (opts.saveWeights is not None):
+        saveWeights(a, opts.saveWeights)
+
     # Display post-learning values / q-values.
     if (opts.agent == 'q' and not opts.manual):
         display.displayQValues(a, message = 'Q-VALUES AFTER ' + str(opts.episodes) + ' EPISODES')
@@ -16,6 +16,9 @@ import sys
 from pacai.agents.base import BaseAgent
 from pacai.agents.ghost.random import RandomGhost
 from pacai.agents.greedy import GreedyAgent
+from pacai.agents.learning.reinforcement import ReinforcementAgent
+from pacai.agents.learning.weights import loadWeights
+from pacai.agents.learning.weights import saveWeights
 from pacai.bin.arguments import getParser
 from pacai.core.actions import Actions
 from pacai.core.directions import Directions
@@ -385,6 +388,12 @@ def readCommand(argv):
             - Starts an interactive game.
         (2) python -m pacai.bin.pacman --layout smallClassic
             - Starts an interactive game on a smaller board.
+        (3) python -m pacai.bin.pacman -p PacmanQAgent -l smallGrid --num-training 2000 -n 2000 \\
+                --null-graphics --save-weights q.weights
+            - Trains a q-learning pacman and saves what it learned.
+        (4) python -m pacai.bin.pacman -p PacmanQAgent -l smallGrid -n 10 \\
+                --load-weights q.weights
+            - Plays games with the trained pacman, without retraining.
     """
 
     parser = getParser(description, os.path.basename(__file__))
@@ -410,6 +419,16 @@ def readCommand(argv):
             help = 'comma separated arguments to be passed to agents (e.g. \'opt1=val1,opt2\')'
                 + '(default: %(default)s)')
 
+    parser.add_argument('--load-weights', dest = 'loadWeights',
+            action = 'store', type = str, default = None,
+            help = 'start a learning pacman from weights saved with --save-weights '
+                + '(default: %(default)s)')
+
+    parser.add_argument('--save-weights', dest = 'saveWeights',
+            action = 'store', type = str, default = None,
+            help = 'save what a learning pacman learned after all games '
+                + '(default: %(default)s)')
+
     parser.add_argument('--timeout', dest = 'timeout',
             action = 'store', type = int, default = 30,
             help = 'maximum time limit (seconds) an agent can spend computing per game '
@@ -453,6 +472,10 @@ def readCommand(argv):
         if 'numTraining' not in agentOpts:
             agentOpts['numTraining'] = options.numTraining
 
+    # Nobody will see search highlights in a headless run, so don't pay to record them.
+    if ((options.nullGraphics or options.textGraphics) and options.gif is None):
+        agentOpts.setdefault('recordVisits', False)
+
     # Don't display training games.
     if 'numTrain' in agentOpts:
         options.numQuiet = int(agentOpts['numTrain'])
@@ -484,8 +507,18 @@ def readCommand(argv):
     args['numGames'] = options.numGames
     args['pacman'] = BaseAgent.loadAgent(options.pacman, PACMAN_AGENT_INDEX, agentOpts)
     args['record'] = options.record
+    args['saveWeights'] = options.saveWeights
     args['timeout'] = options.timeout
 
+    # Check before any games are played, instead of failing when saving after them.
+    if ((options.loadWeights is not None or options.saveWeights is not None)
+            and not isinstance(args['pacman'], ReinforcementAgent)):
+        raise ValueError('Only learning agents have weights to load or save, got %s.' %
+                (options.pacman))
+
+    if (options.loadWeights is not None):
+        loadWeights(args['pacman'], options.loadWeights)
+
     return args
 
 def replayGame(layout, actions, display):
@@ -580,7 +613,12 @@ def main(argv):
 
         return
 
-    return runGames(**args)
+    games = runGames(**args)
+
+    if (args['saveWeights'] is not None):
+        saveWeights(args['pacman'], args['saveWeights'])
+
+    return games
 
 if __name__ == '__main__':
     main(sys.argv[1:])
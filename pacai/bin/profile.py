@@ -0,0 +1,153 @@
+"""
+Summarize the search profiles written by a `pacai.agents.search.profiler.ProfilingAgent`.
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import textwrap
+
+from pacai.agents.search.profiler import DEFAULT_PROFILE_DIR
+from pacai.util.logs import initLogging
+from pacai.util.logs import updateLoggingLevel
+
+def loadProfiles(profileDir):
+    """
+    Load every move profile in the directory, in order.
+    """
+
+    profiles = []
+    for path in sorted(glob.glob(os.path.join(profileDir, 'move-*.json'))):
+        with open(path, 'r') as file:
+            profiles.append(json.load(file))
+
+    profiles.sort(key = lambda profile: (profile['game'], profile['move'], profile['agent']))
+    return profiles
+
+def summarize(profiles):
+    """
+    Reduce move profiles to a dict of summary stats.
+    """
+
+    numMoves = len(profiles)
+    if (numMoves == 0):
+        return {'moves': 0}
+
+    totalTime = sum([profile['time'] for profile in profiles])
+    successorTime = sum([profile['successorTime'] for profile in profiles])
+    evalTime = sum([profile['evalTime'] for profile in profiles])
+    successors = sum([profile['successors'] for profile in profiles])
+    branchingFactor = sum([profile['branchingFactor'] for profile in profiles]) / numMoves
+
+    summary = {
+        'moves': numMoves,
+        'meanTime': totalTime / numMoves,
+        'maxTime': max([profile['time'] for profile in profiles]),
+        'successors': successors,
+        'evaluations': sum([profile['evaluations'] for profile in profiles]),
+        'successorsPerSecond': successors / max(totalTime, 1e-9),
+        'successorTimeFraction': successorTime / max(totalTime, 1e-9),
+        'evalTimeFraction': evalTime / max(totalTime, 1e-9),
+        'otherTimeFraction': max(0.0, totalTime - successorTime - evalTime) / max(totalTime, 1e-9),
+        'meanBranchingFactor': branchingFactor,
+        'maxPly': max([profile['maxPly'] for profile in profiles]),
+    }
+
+    engineProfiles = [profile['engine'] for profile in profiles if 'engine' in profile]
+    if (len(engineProfiles) > 0):
+        choiceNodes = sum([engine.get('choiceNodes', 0) for engine in engineProfiles])
+        cutoffs = sum([engine.get('cutoffs', 0) for engine in engineProfiles])
+        probes = sum([engine.get('tableProbes', 0) for engine in engineProfiles])
+        hits = sum([engine.get('tableHits', 0) for engine in engineProfiles])
+
+        summary['cutoffs'] = cutoffs
+        summary['cutoffRate'] = cutoffs / max(1, choiceNodes)
+        summary['tableHitRate'] = hits / max(1, probes)
+
+    return summary
+
+def formatSummary(summary):
+    if (summary['moves'] == 0):
+        return 'No moves were profiled.'
+
+    timeSplit = (100.0 * summary['successorTimeFraction'], 100.0 * summary['evalTimeFraction'],
+            100.0 * summary['otherTimeFraction'])
+
+    lines = [
+        'Moves: %d' % (summary['moves']),
+        'Time per move: %.4f s mean, %.4f s max' % (summary['meanTime'], summary['maxTime']),
+        'Successors: %d (%.0f / sec)' % (summary['successors'], summary['successorsPerSecond']),
+        'Evaluations: %d' % (summary['evaluations']),
+        'Time split: %.1f%% successors, %.1f%% evaluation, %.1f%% other' % timeSplit,
+        'Effective branching factor: %.2f (mean), deepest ply: %d' % (
+            summary['meanBranchingFactor'], summary['maxPly']),
+    ]
+
+    if ('cutoffs' in summary):
+        lines.append('Cutoffs: %d (%.1f%% of choice nodes)' % (summary['cutoffs'],
+                100.0 * summary['cutoffRate']))
+        lines.append('Table hit rate: %.1f%%' % (100.0 * summary['tableHitRate']))
+
+    return "\n".join(lines)
+
+def parseOptions(argv):
+    description = """
+    DESCRIPTION:
+        Summarize the per-move search profiles written by a ProfilingAgent.
+
+    EXAMPLES:
+        (1) python -m pacai.bin.pacman -p ProfilingAgent --null-graphics \\
+                --agent-args agent=AdversarialSearchAgent,depth=3,profileDir=profile
+            python -m pacai.bin.profile profile
+            - Profile a depth 3 alpha-beta search, and summarize it.
+    """
+
+    parser = argparse.ArgumentParser(description = textwrap.dedent(description),
+        prog = os.path.basename(__file__), formatter_class = argparse.RawTextHelpFormatter)
+
+    parser.add_argument('profileDir', metavar = 'PROFILE_DIR',
+            action = 'store', type = str, nargs = '?', default = DEFAULT_PROFILE_DIR,
+            help = 'the directory of profiles to summarize (default: %(default)s)')
+
+    parser.add_argument('--json', dest = 'json',
+            action = 'store_true', default = False,
+            help = 'print the summary as JSON (default: %(default)s)')
+
+    parser.add_argument('-q', '--quiet', dest = 'quiet',
+            action = 'store_true', default = False,
+            help = 'set logging level to warning (default: %(default)s)')
+
+    options, otherjunk = parser.parse_known_args(argv)
+
+    if len(otherjunk) != 0:
+        raise ValueError('Unrecognized options: \'%s\'.' % (str(otherjunk)))
+
+    if (options.quiet):
+        updateLoggingLevel(logging.WARNING)
+
+    return options
+
+def main(argv):
+    """
+    Entry point for summarizing search profiles.
+    The args are a blind pass of `sys.argv` with the executable stripped.
+    """
+
+    initLogging()
+
+    options = parseOptions(argv)
+
+    summary = summarize(loadProfiles(options.profileDir))
+
+    if (options.json):
+        print(json.dumps(summary, indent = 4))
+    else:
+        print(formatSummary(summary))
+
+    return summary
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
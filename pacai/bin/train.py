@@ -0,0 +1,530 @@
+"""
+Headless training for pacman reinforcement agents.
+
+`pacai.bin.pacman` plays training games through full `pacai.core.game.Game`s
+(with a view, rules, and timing) and only reports at the end of a run.
+This trainer instead plays episodes in a tight loop: the layout and starting state are built once,
+there is no view, and the agents are called directly.
+Progress (the reward curve) is appended to a JSONL log every few episodes,
+and the agent's learned values/weights are checkpointed, so long runs can be left unattended
+(and resumed).
+
+Agents with linear weights (like `pacai.student.qlearningAgents.ApproximateQAgent`)
+can also be trained by several actors at once (see `trainParallel`).
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import random
+import sys
+import textwrap
+import time
+
+from pacai.agents.base import BaseAgent
+from pacai.bin.pacman import PACMAN_AGENT_INDEX
+from pacai.bin.pacman import PacmanGameState
+from pacai.bin.pacman import parseAgentArgs
+from pacai.core.layout import getLayout
+from pacai.util.logs import initLogging
+from pacai.util.logs import updateLoggingLevel
+
+# The agent attributes that hold what a learning agent has learned.
+LEARNED_ATTRIBUTES = ['values', 'qTable', 'weights', 'featureWeights']
+
+# The number of episodes each actor plays between weight merges.
+DEFAULT_SYNC_EPISODES = 10
+
+# The agents of an actor (see `_initActor`).
+_actorAgents = None
+_actorState = None
+
+def loadCheckpoint(agent, path):
+    """
+    Restore what an agent has learned (and how many episodes it has seen) from a checkpoint.
+    """
+
+    with open(path, 'rb') as file:
+        checkpoint = pickle.load(file)
+
+    for (name, value) in checkpoint['learned'].items():
+        setattr(agent, name, value)
+
+    agent.episodesSoFar = checkpoint['episodes']
+
+    logging.info('Loaded a checkpoint of %d episodes from %s.' % (agent.episodesSoFar, path))
+
+def runEpisode(state, agents):
+    """
+    Play a single game from the state, without a view or rules.
+    Returns the final state.
+    """
+
+    for agent in agents:
+        agent.registerInitialState(state)
+
+    agentIndex = PACMAN_AGENT_INDEX
+    numAgents = len(agents)
+
+    while (not state.isOver()):
+        agent = agents[agentIndex]
+
+        agent.observationFunction(state)
+        action = agent.getAction(state)
+
+        state = state.generateSuccessor(agentIndex, action)
+        agentIndex = (agentIndex + 1) % numAgents
+
+    for agent in agents:
+        agent.final(state)
+
+    return state
+
+def saveCheckpoint(agent, path):
+    """
+    Save what an agent has learned (and how many episodes it has seen).
+    The checkpoint is replaced atomically, so an interrupted run never leaves a broken one.
+    """
+
+    learned = {}
+    for name in LEARNED_ATTRIBUTES:
+        if (getattr(agent, name, None) is not None):
+            learned[name] = getattr(agent, name)
+
+    checkpoint = {
+        'agent': agent.__class__.__name__,
+        'episodes': agent.episodesSoFar,
+        'learned': learned,
+    }
+
+    path = os.path.expanduser(path)
+    directory = os.path.dirname(path)
+    if (directory != ''):
+        os.makedirs(directory, exist_ok = True)
+
+    tempPath = path + '.tmp'
+    with open(tempPath, 'wb') as file:
+        pickle.dump(checkpoint, file)
+
+    os.replace(tempPath, path)
+    return path
+
+def train(layout, pacman, ghosts, numEpisodes, logPath = None, logEvery = 100,
+        checkpointPath = None, checkpointEvery = 0):
+    """
+    Train a pacman agent for a number of episodes.
+
+    Args:
+        layout: The `pacai.core.layout.Layout` to play on.
+        pacman: The learning pacman agent
+                (a `pacai.agents.learning.reinforcement.ReinforcementAgent`).
+        ghosts: The ghost agents.
+        numEpisodes: The number of episodes to play.
+        logPath: A JSONL file to append a progress record to every logEvery episodes.
+        checkpointPath: Where to save the agent's checkpoint,
+                        every checkpointEvery episodes (if positive) and at the end.
+
+    Returns the progress records.
+    """
+
+    agents = [pacman] + ghosts[:layout.getNumGhosts()]
+    initialState = PacmanGameState(layout)
+
+    logFile = None
+    if (logPath is not None):
+        logFile = open(os.path.expanduser(logPath), 'a')
+
+    records = []
+    scores = []
+    wins = 0
+
+    startTime = time.time()
+    windowTime = startTime
+
+    try:
+        for episode in range(1, numEpisodes + 1):
+            state = runEpisode(initialState, agents)
+
+            scores.append(state.getScore())
+            wins += int(state.isWin())
+
+            if (episode % logEvery == 0 or episode == numEpisodes):
+                now = time.time()
+
+                record = {
+                    'episode': pacman.episodesSoFar,
+                    'averageScore': sum(scores) / len(scores),
+                    'winRate': wins / len(scores),
+                    'episodesPerSecond': len(scores) / max(now - windowTime, 1e-9),
+                    'seconds': now - startTime,
+                }
+                records.append(record)
+
+                logging.info('Episode %d: average score %.2f, win rate %.2f, %.1f episodes/s.' %
+                        (record['episode'], record['averageScore'], record['winRate'],
+                        record['episodesPerSecond']))
+
+                if (logFile is not None):
+                    logFile.write(json.dumps(record) + '\n')
+                    logFile.flush()
+
+                scores = []
+                wins = 0
+                windowTime = now
+
+            if (checkpointPath is not None and checkpointEvery > 0
+                    and episode % checkpointEvery == 0):
+                saveCheckpoint(pacman, checkpointPath)
+    finally:
+        if (logFile is not None):
+            logFile.close()
+
+    if (checkpointPath is not None):
+        path = saveCheckpoint(pacman, checkpointPath)
+        logging.info('Saved a checkpoint of %d episodes to %s.' % (pacman.episodesSoFar, path))
+
+    return records
+
+def trainParallel(layoutName, agentName, agentArgs, numEpisodes, ghostName = 'RandomGhost',
+        numGhosts = 4, numActors = 2, numWorkers = None, syncEpisodes = DEFAULT_SYNC_EPISODES,
+        seed = None, weights = None, logPath = None, logEvery = 100, checkpointPath = None,
+        checkpointEvery = 0, learner = None):
+    """
+    Train a linear (weights) pacman agent with several actors at once.
+
+    Training runs in rounds.
+    In each round, every actor (a worker process) starts from a snapshot of the current weights
+    and plays syncEpisodes episodes, learning as it goes.
+    The learner then merges the actors' updates (by averaging each actor's change to the weights),
+    and the merged weights are sent out with the next round.
+
+    Every round's actors are seeded from a single stream (from the seed),
+    and an actor's result only depends on its weights and seed,
+    so runs with the same seed learn the same weights however the work lands on processes.
+
+    Progress is logged (and checkpointed) like in `train`,
+    but only between rounds, so at the end of the round that reaches each interval.
+
+    Args:
+        agentName: The agent to train, which must have getWeights()/setWeights().
+        agentArgs: The agent's arguments (a dict).
+        numActors: The number of actors (per round).
+        numWorkers: The number of processes the actors run on (defaults to numActors).
+        weights: The {feature: weight} to start from.
+        learner: An agent (of agentName) to keep the merged weights in
+                 (for checkpoints), one is made if None.
+
+    See `train` for the logging and checkpoint arguments.
+
+    Returns the learner and the progress records.
+    """
+
+    if (numWorkers is None):
+        numWorkers = numActors
+
+    # Actors keep exploring and learning for the whole run.
+    agentArgs = dict(agentArgs)
+    agentArgs.setdefault('numTraining', numEpisodes)
+
+    if (learner is None):
+        learner = BaseAgent.loadAgent(agentName, PACMAN_AGENT_INDEX, agentArgs)
+
+    if (not hasattr(learner, 'setWeights')):
+        raise ValueError('Parallel training needs an agent with weights, got %s.' % (agentName))
+
+    if (weights is not None):
+        learner.setWeights(weights)
+    weights = dict(learner.getWeights())
+
+    rng = random.Random(seed)
+    initArgs = (layoutName, agentName, agentArgs, ghostName, numGhosts)
+
+    pool = None
+    if (numWorkers > 1):
+        pool = multiprocessing.Pool(numWorkers, initializer = _initActor, initargs = initArgs)
+    else:
+        _initActor(*initArgs)
+
+    logFile = None
+    if (logPath is not None):
+        logFile = open(os.path.expanduser(logPath), 'a')
+
+    records = []
+    scores = []
+    wins = 0
+    numPlayed = 0
+
+    startTime = time.time()
+    windowTime = startTime
+
+    try:
+        while (numPlayed < numEpisodes):
+            lastPlayed = numPlayed
+
+            tasks = []
+            for actor in range(numActors):
+                numActorEpisodes = min(syncEpisodes, numEpisodes - numPlayed)
+                numPlayed += numActorEpisodes
+                if (numActorEpisodes > 0):
+                    tasks.append((weights, rng.getrandbits(32), numActorEpisodes))
+
+            if (pool is not None):
+                results = pool.starmap(_runActor, tasks)
+            else:
+                results = [_runActor(*task) for task in tasks]
+
+            weights = _mergeWeights(weights, [result[0] for result in results])
+            learner.setWeights(weights)
+
+            scores += [score for result in results for score in result[1]]
+            wins += sum([result[2] for result in results])
+            learner.episodesSoFar += (numPlayed - lastPlayed)
+
+            if (_crossed(lastPlayed, numPlayed, logEvery) or numPlayed == numEpisodes):
+                now = time.time()
+
+                record = {
+                    'episode': learner.episodesSoFar,
+                    'averageScore': sum(scores) / len(scores),
+                    'winRate': wins / len(scores),
+                    'episodesPerSecond': len(scores) / max(now - windowTime, 1e-9),
+                    'seconds': now - startTime,
+                }
+                records.append(record)
+
+                logging.info('Episode %d: average score %.2f, win rate %.2f, %.1f episodes/s.' %
+                        (record['episode'], record['averageScore'], record['winRate'],
+                        record['episodesPerSecond']))
+
+                if (logFile is not None):
+                    logFile.write(json.dumps(record) + '\n')
+                    logFile.flush()
+
+                scores = []
+                wins = 0
+                windowTime = now
+
+            if (checkpointPath is not None and checkpointEvery > 0
+                    and _crossed(lastPlayed, numPlayed, checkpointEvery)):
+                saveCheckpoint(learner, checkpointPath)
+    finally:
+        if (logFile is not None):
+            logFile.close()
+
+        if (pool is not None):
+            pool.close()
+            pool.join()
+
+    if (checkpointPath is not None):
+        path = saveCheckpoint(learner, checkpointPath)
+        logging.info('Saved a checkpoint of %d episodes to %s.' % (learner.episodesSoFar, path))
+
+    return learner, records
+
+def parseOptions(argv):
+    description = """
+    DESCRIPTION:
+        Train a pacman learning agent headlessly, as fast as possible.
+        Progress is logged (as JSON lines) every few episodes,
+        and what the agent learned is checkpointed.
+
+    EXAMPLES:
+        (1) python -m pacai.bin.train -p PacmanQAgent -l smallGrid -n 10000 \\
+                --agent-args arrayTable=true --log train.jsonl --checkpoint q.ckpt
+            - Train a tabular q-learner for 10000 episodes.
+        (2) python -m pacai.bin.train -p ApproximateQAgent -l mediumClassic -n 1000 \\
+                --agent-args extractor=pacai.core.featureExtractors.FastSimpleExtractor \\
+                --checkpoint approx.ckpt --resume
+            - Continue training an approximate q-learner from its checkpoint.
+        (3) python -m pacai.bin.train -p ApproximateQAgent -l mediumClassic -n 10000 \\
+                --agent-args extractor=pacai.core.featureExtractors.FastSimpleExtractor \\
+                --actors 16 --sync-every 10 --seed 140
+            - Train an approximate q-learner with 16 parallel actors.
+    """
+
+    parser = argparse.ArgumentParser(description = textwrap.dedent(description),
+        prog = os.path.basename(__file__), formatter_class = argparse.RawTextHelpFormatter)
+
+    parser.add_argument('-a', '--agent-args', dest = 'agentArgs',
+            action = 'store', type = str, default = None,
+            help = 'comma separated arguments to be passed to the agent '
+                + '(e.g. \'opt1=val1,opt2,opt3=val3\') (default: %(default)s)')
+
+    parser.add_argument('-g', '--ghosts', dest = 'ghost',
+            action = 'store', type = str, default = 'RandomGhost',
+            help = 'use the specified ghostAgent module for the ghosts (default: %(default)s)')
+
+    parser.add_argument('-k', '--num-ghosts', dest = 'numGhosts',
+            action = 'store', type = int, default = 4,
+            help = 'set the maximum number of ghosts (default: %(default)s)')
+
+    parser.add_argument('-l', '--layout', dest = 'layout',
+            action = 'store', type = str, default = 'smallGrid',
+            help = 'use the specified map layout (default: %(default)s)')
+
+    parser.add_argument('-n', '--num-episodes', dest = 'numEpisodes',
+            action = 'store', type = int, default = 1000,
+            help = 'the number of training episodes (default: %(default)s)')
+
+    parser.add_argument('-p', '--pacman', dest = 'pacman',
+            action = 'store', type = str, default = 'PacmanQAgent',
+            help = 'the learning agent to train (default: %(default)s)')
+
+    parser.add_argument('-q', '--quiet', dest = 'quiet',
+            action = 'store_true', default = False,
+            help = 'set logging level to warning (default: %(default)s)')
+
+    parser.add_argument('-s', '--seed', dest = 'seed',
+            action = 'store', type = int, default = None,
+            help = 'seed the random number generator (default: %(default)s)')
+
+    parser.add_argument('--actors', dest = 'numActors',
+            action = 'store', type = int, default = 1,
+            help = 'train a weights based agent with this many parallel actors '
+                + '(default: %(default)s)')
+
+    parser.add_argument('--checkpoint', dest = 'checkpoint',
+            action = 'store', type = str, default = None,
+            help = 'save what the agent learned here (default: %(default)s)')
+
+    parser.add_argument('--checkpoint-every', dest = 'checkpointEvery',
+            action = 'store', type = int, default = 1000,
+            help = 'also checkpoint every this many episodes (default: %(default)s)')
+
+    parser.add_argument('--log', dest = 'log',
+            action = 'store', type = str, default = None,
+            help = 'append progress records to this JSONL file (default: %(default)s)')
+
+    parser.add_argument('--log-every', dest = 'logEvery',
+            action = 'store', type = int, default = 100,
+            help = 'log progress every this many episodes (default: %(default)s)')
+
+    parser.add_argument('--resume', dest = 'resume',
+            action = 'store_true', default = False,
+            help = 'start from the checkpoint, if it exists (default: %(default)s)')
+
+    parser.add_argument('--sync-every', dest = 'syncEpisodes',
+            action = 'store', type = int, default = DEFAULT_SYNC_EPISODES,
+            help = 'with parallel actors, merge their weights every this many episodes '
+                + '(per actor) (default: %(default)s)')
+
+    options, otherjunk = parser.parse_known_args(argv)
+
+    if len(otherjunk) != 0:
+        raise ValueError('Unrecognized options: \'%s\'.' % (str(otherjunk)))
+
+    if (options.quiet):
+        updateLoggingLevel(logging.WARNING)
+
+    if (options.logEvery <= 0):
+        raise ValueError('--log-every must be positive, got %d.' % (options.logEvery))
+
+    return options
+
+def main(argv):
+    """
+    Entry point for headless training.
+    The args are a blind pass of `sys.argv` with the executable stripped.
+    """
+
+    initLogging()
+
+    options = parseOptions(argv)
+
+    if (options.seed is not None):
+        random.seed(options.seed)
+
+    layout = getLayout(options.layout, maxGhosts = options.numGhosts)
+
+    # Every episode is a training episode.
+    agentArgs = parseAgentArgs(options.agentArgs)
+    agentArgs.setdefault('numTraining', options.numEpisodes)
+
+    pacman = BaseAgent.loadAgent(options.pacman, PACMAN_AGENT_INDEX, agentArgs)
+    ghosts = [BaseAgent.loadAgent(options.ghost, index + 1)
+            for index in range(options.numGhosts)]
+
+    if (options.resume and options.checkpoint is not None
+            and os.path.isfile(os.path.expanduser(options.checkpoint))):
+        loadCheckpoint(pacman, os.path.expanduser(options.checkpoint))
+        pacman.numTraining += pacman.episodesSoFar
+
+    if (options.numActors > 1):
+        learner, records = trainParallel(options.layout, options.pacman, agentArgs,
+                options.numEpisodes, ghostName = options.ghost, numGhosts = options.numGhosts,
+                numActors = options.numActors, syncEpisodes = options.syncEpisodes,
+                seed = options.seed, logPath = options.log, logEvery = options.logEvery,
+                checkpointPath = options.checkpoint, checkpointEvery = options.checkpointEvery,
+                learner = pacman)
+        return records
+
+    return train(layout, pacman, ghosts, options.numEpisodes, logPath = options.log,
+            logEvery = options.logEvery, checkpointPath = options.checkpoint,
+            checkpointEvery = options.checkpointEvery)
+
+def _crossed(start, end, interval):
+    """
+    Whether a multiple of the interval is in (start, end].
+    """
+
+    return (start // interval) != (end // interval)
+
+def _initActor(layoutName, agentName, agentArgs, ghostName, numGhosts):
+    """
+    Build an actor's agents and starting state (once per process).
+    """
+
+    global _actorAgents, _actorState
+
+    layout = getLayout(layoutName, maxGhosts = numGhosts)
+
+    pacman = BaseAgent.loadAgent(agentName, PACMAN_AGENT_INDEX, agentArgs)
+    ghosts = [BaseAgent.loadAgent(ghostName, index + 1) for index in range(numGhosts)]
+
+    _actorAgents = [pacman] + ghosts[:layout.getNumGhosts()]
+    _actorState = PacmanGameState(layout)
+
+def _mergeWeights(weights, actorWeights):
+    """
+    Add the average change (from weights) of the actors' weights to the weights.
+    """
+
+    features = {}
+    for actor in actorWeights:
+        features.update(dict.fromkeys(actor))
+
+    merged = dict(weights)
+    for feature in features:
+        change = 0.0
+        for actor in actorWeights:
+            change += actor.get(feature, 0.0) - weights.get(feature, 0.0)
+
+        merged[feature] = weights.get(feature, 0.0) + change / len(actorWeights)
+
+    return merged
+
+def _runActor(weights, seed, numEpisodes):
+    """
+    Play episodes (learning) from the weights.
+    Returns the learned weights, the scores, and the number of wins.
+    """
+
+    random.seed(seed)
+
+    pacman = _actorAgents[PACMAN_AGENT_INDEX]
+    pacman.setWeights(weights)
+
+    scores = []
+    wins = 0
+    for i in range(numEpisodes):
+        state = runEpisode(_actorState, _actorAgents)
+        scores.append(state.getScore())
+        wins += int(state.isWin())
+
+    return pacman.getWeights(), scores, wins
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
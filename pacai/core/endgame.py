@@ -0,0 +1,412 @@
+"""
+Exact endgames for classic pacman, by retrograde analysis.
+
+Once only a few food pellets are left (and no capsules), the positions of pacman and the ghosts
+and the remaining food make a small state space, and it can be solved exactly:
+for every position, whether pacman can force a win, and in how few moves (plies).
+
+The ghosts are solved as adversaries that may also turn around
+(the real ghosts are not allowed to reverse), so they are at least as strong as any real ghost.
+So a position the table says is won is won against any ghosts,
+and following `EndgameTable.getAction` wins it in at most the table's number of plies.
+Positions that are not won are drawn or lost against the strongest ghosts,
+and are left to the usual search.
+
+The food is encoded as a bitmask over the food the table was built for,
+so a table covers every state with a subset of that food.
+Each mask is a layer that only depends on the layers with one less pellet,
+so layers with the same number of pellets are solved in parallel.
+Within a layer, positions are solved backwards from the wins,
+in order of the number of plies to the win.
+Tables are cached to disk (see `getCachePath`).
+"""
+
+import array
+import hashlib
+import logging
+import multiprocessing
+import os
+
+from pacai.bin.pacman import BOARD_CLEAR_POINTS
+from pacai.bin.pacman import FOOD_POINTS
+from pacai.bin.pacman import PACMAN_AGENT_INDEX
+from pacai.bin.pacman import TIME_PENALTY
+from pacai.core.search import adjacency
+from pacai.util import util
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pacai')
+
+# The largest tables worth building.
+MAX_FOOD = 4
+MAX_GHOSTS = 2
+
+# The value of a position that pacman can not force a win from.
+NOT_WON = 0
+
+# Stored plies are capped to fit the table's element type.
+MAX_PLIES = 2 ** 16 - 1
+
+# Marks ghost positions whose remaining (not yet won) moves have not been counted.
+UNCOUNTED = 255
+
+class EndgameTable(object):
+    """
+    The solved endgames for some walls, food, and number of ghosts.
+    """
+
+    def __init__(self, walls, food, numGhosts, cacheDir = DEFAULT_CACHE_DIR, numWorkers = 1):
+        """
+        Args:
+            walls: The walls (a `pacai.core.grid.Grid`).
+            food: The food positions the table covers (any subset of them is covered).
+            numGhosts: The number of ghosts.
+            cacheDir: Where to load/save the table from/to.
+                      Use None to skip the disk cache.
+            numWorkers: The number of processes used to build the table.
+        """
+
+        food = _normalizeFood(food)
+
+        if (len(food) > MAX_FOOD):
+            raise ValueError('Endgames can have at most %d food, got %d.' % (MAX_FOOD, len(food)))
+
+        if (numGhosts < 1 or numGhosts > MAX_GHOSTS):
+            raise ValueError('Endgames need between 1 and %d ghosts, got %d.' %
+                    (MAX_GHOSTS, numGhosts))
+
+        self._walls = walls
+        self._food = food
+        self._numGhosts = numGhosts
+        self._numAgents = numGhosts + 1
+
+        self._cells = sorted(adjacency.getAdjacency(walls).keys())
+        self._cellIndex = {cell: index for (index, cell) in enumerate(self._cells)}
+        self._foodBits = {cell: bit for (bit, cell) in enumerate(food)}
+
+        self._numCells = len(self._cells)
+        self._layerSize = (self._numCells ** self._numAgents) * self._numAgents
+
+        # {food mask: table, ...} for every non-empty mask.
+        self._layers = self._loadLayers(cacheDir, numWorkers)
+
+    def covers(self, state):
+        """
+        Whether the state is in this table:
+        classic pacman with the same ghosts, no capsules, no scared ghosts,
+        everyone on grid points, and a subset of the table's food.
+        """
+
+        if (hasattr(state, 'getRedTeamIndices') or state.isOver()):
+            return False
+
+        if (state.getWalls() != self._walls or state.getNumAgents() != self._numAgents):
+            return False
+
+        if (len(state.getCapsules()) > 0):
+            return False
+
+        for agentState in state.getAgentStates():
+            position = agentState.getPosition()
+            if (agentState.isScared() or position != util.nearestPoint(position)):
+                return False
+
+        return all([position in self._foodBits for position in state.getFoodList()])
+
+    def getAction(self, state):
+        """
+        Get pacman's fastest winning action and the number of plies it wins in,
+        or None if the state is not covered or not won.
+        """
+
+        if (not self.covers(state)):
+            return None
+
+        best = None
+        for action in state.getLegalActions(PACMAN_AGENT_INDEX):
+            successor = state.generateSuccessor(PACMAN_AGENT_INDEX, action)
+
+            if (successor.isWin()):
+                plies = 1
+            elif (successor.isLose()):
+                continue
+            else:
+                plies = self._lookup(successor, 1)
+                if (plies == NOT_WON):
+                    continue
+
+                plies += 1
+
+            if (best is None or plies < best[1]):
+                best = (action, plies)
+
+        return best
+
+    def getCells(self):
+        return self._cells
+
+    def getFood(self):
+        return self._food
+
+    def getLayers(self):
+        return self._layers
+
+    def getNumGhosts(self):
+        return self._numGhosts
+
+    def getPlies(self, state, agentIndex = PACMAN_AGENT_INDEX):
+        """
+        Get the number of plies (moves by any agent) pacman can force a win in
+        with agentIndex to move, or None if the state is not covered or not won.
+        """
+
+        if (not self.covers(state)):
+            return None
+
+        plies = self._lookup(state, agentIndex)
+        if (plies == NOT_WON):
+            return None
+
+        return plies
+
+    def getValue(self, state, agentIndex = PACMAN_AGENT_INDEX):
+        """
+        Get the final score of a won state with perfect play
+        (pacman winning as fast as possible, and the ghosts delaying it as long as possible),
+        or None if the state is not covered or not won.
+        """
+
+        plies = self.getPlies(state, agentIndex)
+        if (plies is None):
+            return None
+
+        # Pacman makes the last move, count pacman's moves among the plies.
+        firstPacmanPly = (self._numAgents - agentIndex) % self._numAgents
+        pacmanMoves = (plies - 1 - firstPacmanPly) // self._numAgents + 1
+
+        return (state.getScore() + FOOD_POINTS * state.getNumFood() + BOARD_CLEAR_POINTS
+                - TIME_PENALTY * pacmanMoves)
+
+    def _lookup(self, state, agentIndex):
+        mask = 0
+        for position in state.getFoodList():
+            mask |= (1 << self._foodBits[position])
+
+        positions = [self._cellIndex[util.nearestPoint(agentState.getPosition())]
+                for agentState in state.getAgentStates()]
+
+        return self._layers[mask][_stateIndex(positions, agentIndex, self._numCells)]
+
+    def _buildLayers(self, numWorkers):
+        numFood = len(self._food)
+
+        neighbors = [[self._cellIndex[neighbor] for (neighbor, action, cost) in
+                adjacency.getAdjacency(self._walls)[cell]] for cell in self._cells]
+        foodCells = {self._cellIndex[cell]: bit for (cell, bit) in self._foodBits.items()}
+
+        layers = {}
+
+        pool = None
+        if (numWorkers > 1):
+            pool = multiprocessing.Pool(numWorkers)
+
+        try:
+            # Layers with the same amount of food only depend on layers with less food.
+            for count in range(1, numFood + 1):
+                masks = [mask for mask in range(1, 2 ** numFood) if bin(mask).count('1') == count]
+
+                tasks = []
+                for mask in masks:
+                    lower = {bit: layers[mask ^ (1 << bit)] for bit in range(numFood)
+                            if (mask & (1 << bit)) and (mask ^ (1 << bit)) != 0}
+                    tasks.append((neighbors, foodCells, self._numGhosts, mask, lower))
+
+                if (pool is not None):
+                    results = pool.starmap(solveLayer, tasks)
+                else:
+                    results = [solveLayer(*task) for task in tasks]
+
+                for (mask, table) in zip(masks, results):
+                    layers[mask] = table
+
+                logging.debug('Solved the endgames with %d food.' % (count))
+        finally:
+            if (pool is not None):
+                pool.close()
+                pool.join()
+
+        return layers
+
+    def _loadLayers(self, cacheDir, numWorkers):
+        masks = range(1, 2 ** len(self._food))
+
+        path = None
+        if (cacheDir is not None):
+            path = getCachePath(self._walls, self._food, self._numGhosts, cacheDir)
+
+        if (path is not None and os.path.isfile(path)):
+            data = array.array('H')
+            with open(path, 'rb') as file:
+                data.frombytes(file.read())
+
+            if (len(data) == len(masks) * self._layerSize):
+                return {mask: data[(i * self._layerSize):((i + 1) * self._layerSize)]
+                        for (i, mask) in enumerate(masks)}
+
+            logging.warning('Ignoring endgame table with an unexpected size: %s.' % (path))
+
+        logging.info('Building endgame table for %d food and %d ghosts.' %
+                (len(self._food), self._numGhosts))
+        layers = self._buildLayers(numWorkers)
+
+        if (path is not None):
+            # Replace the file atomically, so a table is never loaded while it is being written.
+            os.makedirs(cacheDir, exist_ok = True)
+            with open(path + '.tmp', 'wb') as file:
+                for mask in masks:
+                    file.write(layers[mask].tobytes())
+
+            os.replace(path + '.tmp', path)
+
+        return layers
+
+def getCachePath(walls, food, numGhosts, cacheDir = DEFAULT_CACHE_DIR):
+    """
+    Get where the table for some walls, food, and number of ghosts is cached.
+    A table can be loaded without building it if this file exists.
+    """
+
+    cells = sorted(adjacency.getAdjacency(walls).keys())
+
+    key = repr((walls.getWidth(), walls.getHeight(), cells, _normalizeFood(food), numGhosts))
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+    return os.path.join(cacheDir, 'endgame-%s.bin' % (digest))
+
+def solveLayer(neighbors, foodCells, numGhosts, mask, lower):
+    """
+    Solve the positions of one food mask.
+
+    Args:
+        neighbors: The neighboring cells of each cell.
+        foodCells: {cell: food bit, ...}.
+        numGhosts: The number of ghosts.
+        mask: The food left in this layer.
+        lower: {bit: table, ...} of the (already solved) layers after eating each food in the mask
+               (except for the last food, eating that wins).
+
+    Returns a table (indexed by `_stateIndex`) of the plies to a win (or `NOT_WON`).
+    """
+
+    numCells = len(neighbors)
+    numAgents = numGhosts + 1
+    size = (numCells ** numAgents) * numAgents
+
+    table = array.array('H', bytes(2 * size))
+    remaining = array.array('B', [UNCOUNTED]) * size
+
+    # buckets[plies] holds the positions that might be won in that many plies.
+    buckets = [[], []]
+
+    # Pacman can stop (and so stay in place).
+    pacmanMoves = [neighbors[cell] + [cell] for cell in range(numCells)]
+    eats = [cell in foodCells and bool(mask & (1 << foodCells[cell])) for cell in range(numCells)]
+
+    # Start from the moves that eat food (and so leave this layer).
+    for positionIndex in range(numCells ** numGhosts):
+        ghosts = _unpackPositions(positionIndex, numGhosts, numCells)
+
+        for pacman in range(numCells):
+            if (pacman in ghosts):
+                continue
+
+            best = None
+            for cell in pacmanMoves[pacman]:
+                if (not eats[cell] or cell in ghosts):
+                    continue
+
+                bit = foodCells[cell]
+                if (bit not in lower):
+                    plies = 1
+                else:
+                    after = lower[bit][_stateIndex([cell] + ghosts, 1 % numAgents, numCells)]
+                    if (after == NOT_WON):
+                        continue
+
+                    plies = after + 1
+
+                if (best is None or plies < best):
+                    best = plies
+
+            if (best is not None):
+                _push(buckets, best, _stateIndex([pacman] + ghosts, PACMAN_AGENT_INDEX, numCells))
+
+    plies = 1
+    while (plies < len(buckets)):
+        for index in buckets[plies]:
+            if (table[index] != NOT_WON):
+                continue
+
+            table[index] = min(plies, MAX_PLIES)
+
+            positionIndex, agentIndex = divmod(index, numAgents)
+            positions = _unpackPositions(positionIndex, numAgents, numCells)
+            pacman = positions[PACMAN_AGENT_INDEX]
+
+            previous = (agentIndex - 1) % numAgents
+            if (previous == PACMAN_AGENT_INDEX):
+                # Moves that eat food were already counted.
+                if (eats[pacman]):
+                    continue
+
+                for cell in pacmanMoves[pacman]:
+                    if (cell in positions[1:]):
+                        continue
+
+                    before = _stateIndex([cell] + positions[1:], previous, numCells)
+                    if (table[before] == NOT_WON):
+                        _push(buckets, plies + 1, before)
+            else:
+                for cell in neighbors[positions[previous]]:
+                    if (cell == pacman):
+                        continue
+
+                    beforePositions = list(positions)
+                    beforePositions[previous] = cell
+                    before = _stateIndex(beforePositions, previous, numCells)
+
+                    if (remaining[before] == UNCOUNTED):
+                        remaining[before] = len(neighbors[cell])
+
+                    # The ghost is only lost once every one of its moves loses.
+                    remaining[before] -= 1
+                    if (remaining[before] == 0):
+                        _push(buckets, plies + 1, before)
+
+        buckets[plies] = None
+        plies += 1
+
+    return table
+
+def _normalizeFood(food):
+    return sorted(set([util.nearestPoint(position) for position in food]))
+
+def _push(buckets, plies, index):
+    while (len(buckets) <= plies):
+        buckets.append([])
+
+    buckets[plies].append(index)
+
+def _stateIndex(positions, agentIndex, numCells):
+    positionIndex = 0
+    for cell in reversed(positions):
+        positionIndex = positionIndex * numCells + cell
+
+    return positionIndex * len(positions) + agentIndex
+
+def _unpackPositions(positionIndex, count, numCells):
+    positions = []
+    for i in range(count):
+        positionIndex, cell = divmod(positionIndex, numCells)
+        positions.append(cell)
+
+    return positions
@@ -0,0 +1,389 @@
+"""
+A framework for building cached evaluation functions out of weighted features.
+
+Evaluation functions are called on every leaf of an adversarial search,
+and most of what they compute is the same between sibling leaves
+(e.g. after a ghost moves, the food and pacman have not changed).
+So each `Feature` declares the parts of the state it depends on (see `DEPENDENCIES`),
+and an `Evaluator` caches each feature's value under just those parts.
+Whole evaluations are also cached (by state).
+All caches are bounded LRUs.
+
+Distance features use maze distances from cached distance rows:
+a single breadth-first search from a position gives its distance to every other position,
+so the distances to all the food (or all the ghosts) are just lookups.
+
+To use the default features with any `pacai.agents.search.multiagent.MultiAgentSearchAgent`,
+pass `evalFn=pacai.core.evaluation.evaluate` in its agent args.
+"""
+
+import abc
+import collections
+
+from pacai.core.search import adjacency
+from pacai.util import lru
+from pacai.util import util
+
+# The parts of a state that a feature can depend on.
+DEPENDS_SCORE = 'score'
+DEPENDS_OUTCOME = 'outcome'
+DEPENDS_FOOD = 'food'
+DEPENDS_CAPSULES = 'capsules'
+DEPENDS_PACMAN = 'pacman'
+DEPENDS_GHOSTS = 'ghosts'
+DEPENDENCIES = [DEPENDS_SCORE, DEPENDS_OUTCOME, DEPENDS_FOOD, DEPENDS_CAPSULES,
+        DEPENDS_PACMAN, DEPENDS_GHOSTS]
+
+DEFAULT_CACHE_SIZE = 2 ** 14
+DEFAULT_DISTANCE_ROWS = 2 ** 10
+
+# The distance reported for unreachable positions.
+DEFAULT_DISTANCE = 10000
+
+# How far away ghosts stop mattering.
+DEFAULT_GHOST_RADIUS = 5
+
+PACMAN_AGENT_INDEX = 0
+
+class Feature(abc.ABC):
+    """
+    A weighted part of an evaluation.
+    """
+
+    def __init__(self, weight = 1.0):
+        self._weight = weight
+
+    @abc.abstractmethod
+    def compute(self, state, context):
+        """
+        Compute the (unweighted) value of this feature.
+        The `EvaluationContext` provides cached distances and food lists.
+        """
+
+        pass
+
+    @abc.abstractmethod
+    def getDependencies(self):
+        """
+        The parts of the state (from `DEPENDENCIES`) that this feature's value depends on.
+        """
+
+        pass
+
+    def getName(self):
+        return type(self).__name__
+
+    def getWeight(self):
+        return self._weight
+
+class EvaluationContext(object):
+    """
+    Everything cached for a single board (walls):
+    distance rows, food lists, and each feature's values.
+    """
+
+    def __init__(self, walls, numFeatures, cacheSize = DEFAULT_CACHE_SIZE,
+            maxDistanceRows = DEFAULT_DISTANCE_ROWS):
+        self._walls = walls
+        self._adjacency = adjacency.getAdjacency(walls)
+
+        self._distanceRows = lru.LRUCache(maxDistanceRows)
+        self._foodLists = lru.LRUCache(cacheSize)
+        self._featureCaches = [lru.LRUCache(cacheSize) for i in range(numFeatures)]
+        self._values = lru.LRUCache(cacheSize)
+
+    def getDistanceRow(self, source):
+        """
+        Get the maze distances from the source to every reachable position,
+        as a dict of {position: distance, ...}.
+        """
+
+        source = util.nearestPoint(source)
+
+        row = self._distanceRows.get(source)
+        if (row is None):
+            row = self._computeDistanceRow(source)
+            self._distanceRows.put(source, row)
+
+        return row
+
+    def getDistances(self, source, targets):
+        """
+        Get the maze distances from the source to each target.
+        """
+
+        row = self.getDistanceRow(source)
+        return [row.get(util.nearestPoint(target), DEFAULT_DISTANCE) for target in targets]
+
+    def getFeatureCache(self, featureIndex):
+        return self._featureCaches[featureIndex]
+
+    def getFoodList(self, state):
+        """
+        Get the food positions of the state (shared between states with the same food).
+        """
+
+        key = state.getFoodBitmask()
+
+        food = self._foodLists.get(key)
+        if (food is None):
+            food = state.getFoodList()
+            self._foodLists.put(key, food)
+
+        return food
+
+    def getNearestDistance(self, source, targets, default = 0):
+        """
+        Get the maze distance from the source to the closest target
+        (or the default if there are no targets).
+        """
+
+        if (len(targets) == 0):
+            return default
+
+        return min(self.getDistances(source, targets))
+
+    def getValueCache(self):
+        return self._values
+
+    def getWalls(self):
+        return self._walls
+
+    def _computeDistanceRow(self, source):
+        row = {source: 0}
+        if (source not in self._adjacency):
+            return row
+
+        queue = collections.deque([source])
+        while (len(queue) > 0):
+            position = queue.popleft()
+            distance = row[position] + 1
+
+            for (neighbor, action, cost) in self._adjacency[position]:
+                if (neighbor not in row):
+                    row[neighbor] = distance
+                    queue.append(neighbor)
+
+        return row
+
+class Evaluator(object):
+    """
+    A cached, weighted sum of features.
+    An evaluator is callable, so it can be used anywhere an evaluation function is expected.
+    """
+
+    def __init__(self, features, cacheSize = DEFAULT_CACHE_SIZE):
+        for feature in features:
+            for dependency in feature.getDependencies():
+                if (dependency not in DEPENDENCIES):
+                    raise ValueError("Feature '%s' has an unknown dependency: '%s'." %
+                            (feature.getName(), dependency))
+
+        self._features = list(features)
+        self._cacheSize = cacheSize
+
+        # {walls: EvaluationContext, ...}
+        self._contexts = {}
+        self._lastWalls = None
+        self._lastContext = None
+
+    def getContext(self, state):
+        walls = state.getWalls()
+        if (walls is self._lastWalls):
+            return self._lastContext
+
+        if (walls not in self._contexts):
+            self._contexts[walls] = EvaluationContext(walls, len(self._features),
+                    cacheSize = self._cacheSize)
+
+        self._lastWalls = walls
+        self._lastContext = self._contexts[walls]
+
+        return self._lastContext
+
+    def getFeatures(self):
+        return self._features
+
+    def getFeatureValues(self, state):
+        """
+        Get the (unweighted) value of each feature as a dict of {name: value, ...}.
+        """
+
+        context = self.getContext(state)
+        return {feature.getName(): self._featureValue(state, context, i)
+                for (i, feature) in enumerate(self._features)}
+
+    def _featureValue(self, state, context, featureIndex):
+        feature = self._features[featureIndex]
+        cache = context.getFeatureCache(featureIndex)
+
+        key = dependencyKey(state, feature.getDependencies())
+        value = cache.get(key)
+        if (value is None):
+            value = feature.compute(state, context)
+            cache.put(key, value)
+
+        return value
+
+    def __call__(self, state):
+        context = self.getContext(state)
+        values = context.getValueCache()
+
+        # Keyed by the state itself (not its hash), since different states can share a hash.
+        value = values.get(state)
+        if (value is not None):
+            return value
+
+        value = 0.0
+        for i in range(len(self._features)):
+            value += self._features[i].getWeight() * self._featureValue(state, context, i)
+
+        values.put(state, value)
+        return value
+
+    def __getstate__(self):
+        # The caches can be rebuilt, so don't send them along (e.g. to worker processes).
+        state = self.__dict__.copy()
+        state['_contexts'] = {}
+        state['_lastWalls'] = None
+        state['_lastContext'] = None
+
+        return state
+
+def dependencyKey(state, dependencies):
+    """
+    Build a cache key out of just the given parts of the state.
+    """
+
+    key = []
+
+    for dependency in dependencies:
+        if (dependency == DEPENDS_SCORE):
+            key.append(state.getScore())
+        elif (dependency == DEPENDS_OUTCOME):
+            key.append((state.isOver(), state.isWin()))
+        elif (dependency == DEPENDS_FOOD):
+            key.append(state.getFoodBitmask())
+        elif (dependency == DEPENDS_CAPSULES):
+            key.append(tuple(state.getCapsules()))
+        elif (dependency == DEPENDS_PACMAN):
+            key.append(_agentKey(state.getAgentState(PACMAN_AGENT_INDEX)))
+        elif (dependency == DEPENDS_GHOSTS):
+            key.append(tuple([_agentKey(agentState)
+                    for agentState in state.getAgentStates()[1:]]))
+
+    return tuple(key)
+
+def _agentKey(agentState):
+    return (agentState.getPosition(), agentState.getDirection(), agentState.getScaredTimer())
+
+class ScoreFeature(Feature):
+    """
+    The game score.
+    """
+
+    def compute(self, state, context):
+        return state.getScore()
+
+    def getDependencies(self):
+        return [DEPENDS_SCORE]
+
+class FoodCountFeature(Feature):
+    """
+    The amount of food left.
+    """
+
+    def compute(self, state, context):
+        return state.getNumFood()
+
+    def getDependencies(self):
+        return [DEPENDS_FOOD]
+
+class ClosestFoodFeature(Feature):
+    """
+    The maze distance from pacman to the closest food (0 if there is no food).
+    """
+
+    def compute(self, state, context):
+        return context.getNearestDistance(state.getAgentPosition(PACMAN_AGENT_INDEX),
+                context.getFoodList(state))
+
+    def getDependencies(self):
+        return [DEPENDS_FOOD, DEPENDS_PACMAN]
+
+class CapsuleCountFeature(Feature):
+    """
+    The number of capsules left.
+    """
+
+    def compute(self, state, context):
+        return state.getNumCapsules()
+
+    def getDependencies(self):
+        return [DEPENDS_CAPSULES]
+
+class ClosestCapsuleFeature(Feature):
+    """
+    The maze distance from pacman to the closest capsule (0 if there are no capsules).
+    """
+
+    def compute(self, state, context):
+        return context.getNearestDistance(state.getAgentPosition(PACMAN_AGENT_INDEX),
+                state.getCapsules())
+
+    def getDependencies(self):
+        return [DEPENDS_CAPSULES, DEPENDS_PACMAN]
+
+class GhostThreatFeature(Feature):
+    """
+    How close the closest brave (or scared) ghost is:
+    radius - distance for a ghost within the radius, 0 otherwise.
+    """
+
+    def __init__(self, weight = 1.0, scared = False, radius = DEFAULT_GHOST_RADIUS):
+        super().__init__(weight)
+
+        self._scared = scared
+        self._radius = radius
+
+    def compute(self, state, context):
+        ghosts = [agentState.getPosition() for agentState in state.getAgentStates()[1:]
+                if agentState.isScared() == self._scared]
+
+        distance = context.getNearestDistance(state.getAgentPosition(PACMAN_AGENT_INDEX),
+                ghosts, default = self._radius)
+
+        return max(0, self._radius - distance)
+
+    def getDependencies(self):
+        return [DEPENDS_PACMAN, DEPENDS_GHOSTS]
+
+    def getName(self):
+        if (self._scared):
+            return 'ScaredGhostThreatFeature'
+
+        return 'GhostThreatFeature'
+
+def getDefaultFeatures():
+    """
+    A reasonable set of features for classic pacman.
+    """
+
+    return [
+        ScoreFeature(1.0),
+        FoodCountFeature(-4.0),
+        ClosestFoodFeature(-1.5),
+        CapsuleCountFeature(-20.0),
+        ClosestCapsuleFeature(-0.5),
+        GhostThreatFeature(-10.0, scared = False),
+        GhostThreatFeature(5.0, scared = True),
+    ]
+
+_defaultEvaluator = Evaluator(getDefaultFeatures())
+
+def evaluate(state):
+    """
+    Evaluate a classic pacman state with the default features (and caches).
+    """
+
+    return _defaultEvaluator(state)
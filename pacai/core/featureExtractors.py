@@ -5,8 +5,20 @@ Feature extractors for game states.
 import abc
 
 from pacai.core.actions import Actions
-from pacai.core.search import search
-from pacai.student.searchAgents import AnyFoodSearchProblem
+from pacai.core.search import multigoal
+from pacai.util.lru import LRUCache
+
+# The number of food distance fields kept (by food) for FastSimpleExtractor.
+FOOD_DISTANCES_CACHE_SIZE = 16
+
+# The number of walls grids that FastSimpleExtractor keeps tables for.
+WALLS_TABLES_CACHE_SIZE = 8
+
+# Tables for each walls grid (see `_WallsTable`), and the last one asked for
+# (the same walls are asked for over and over again).
+_wallsTables = LRUCache(WALLS_TABLES_CACHE_SIZE)
+_lastWalls = None
+_lastWallsTable = None
 
 class FeatureExtractor(abc.ABC):
     """
@@ -58,8 +70,54 @@ class SimpleExtractor(FeatureExtractor):
         if not features["#-of-ghosts-1-step-away"] and food[next_x][next_y]:
             features["eats-food"] = 1.0
 
-        prob = AnyFoodSearchProblem(state, start = (next_x, next_y))
-        dist = len(search.bfs(prob))
+        dist = multigoal.nearestTargetDistance(walls, (next_x, next_y), food)
+        if dist is not None:
+            # Make the distance a number less than one otherwise the update will diverge wildly.
+            features["closest-food"] = float(dist) / (walls.getWidth() * walls.getHeight())
+
+        for key in features:
+            features[key] /= 10.0
+
+        return features
+
+class FastSimpleExtractor(FeatureExtractor):
+    """
+    Returns the same features as `SimpleExtractor`, but faster.
+
+    The food grid is never copied,
+    the legal neighbors of ghosts come from a table per layout,
+    and the distance to the closest food comes from a distance field:
+    a single breadth-first search out from all the food at once.
+    A field is shared by all the actions of a state,
+    and by all the states with the same food (it is cached by the food's hash).
+    """
+
+    def getFeatures(self, state, action):
+        walls = state.getWalls()
+        table = _getWallsTable(walls)
+
+        features = {}
+        features["bias"] = 1.0
+
+        # Compute the location of pacman after he takes the action.
+        x, y = state.getPacmanPosition()
+        dx, dy = Actions.directionToVector(action)
+        next_x, next_y = int(x + dx), int(y + dy)
+        nextPosition = (next_x, next_y)
+
+        # Count the number of ghosts 1-step away.
+        numGhosts = 0
+        for (gx, gy) in state.getGhostPositions():
+            if (nextPosition in table.getLegalNeighbors((int(gx + 0.5), int(gy + 0.5)))):
+                numGhosts += 1
+
+        features["#-of-ghosts-1-step-away"] = numGhosts
+
+        # If there is no danger of ghosts then add the food feature.
+        if not features["#-of-ghosts-1-step-away"] and state.hasFood(next_x, next_y):
+            features["eats-food"] = 1.0
+
+        dist = table.getFoodDistance(state, nextPosition)
         if dist is not None:
             # Make the distance a number less than one otherwise the update will diverge wildly.
             features["closest-food"] = float(dist) / (walls.getWidth() * walls.getHeight())
@@ -68,3 +126,115 @@ class SimpleExtractor(FeatureExtractor):
             features[key] /= 10.0
 
         return features
+
+class _WallsTable(object):
+    """
+    Precomputed tables for a walls grid:
+    the open positions numbered by index, their (index) neighbors, the legal neighbors
+    (see `pacai.core.actions.Actions.getLegalNeighbors`) of positions,
+    and recent food distance fields.
+    """
+
+    def __init__(self, walls):
+        self._walls = walls
+
+        self._positions = []
+        for x in range(walls.getWidth()):
+            for y in range(walls.getHeight()):
+                if (not walls[x][y]):
+                    self._positions.append((x, y))
+
+        self._indexes = {position: index for (index, position) in enumerate(self._positions)}
+
+        # The same moves as a search over the board (see `pacai.core.search.adjacency`).
+        self._neighborIndexes = []
+        for (x, y) in self._positions:
+            neighbors = []
+            for (dx, dy) in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
+                index = self._indexes.get((x + dx, y + dy))
+                if (index is not None):
+                    neighbors.append(index)
+
+            self._neighborIndexes.append(tuple(neighbors))
+
+        # {position: frozenset(legal neighbors), ...}, filled in as positions are asked for.
+        self._legalNeighbors = {}
+
+        self._foodDistances = LRUCache(FOOD_DISTANCES_CACHE_SIZE)
+
+    def getFoodDistance(self, state, position):
+        """
+        Get the maze distance from a position to the nearest food,
+        or None if no food can be reached.
+        """
+
+        key = state.getFoodBitmask()
+
+        distances = self._foodDistances.get(key)
+        if (distances is None):
+            distances = self._computeFoodDistances(state.getFoodList())
+            self._foodDistances.put(key, distances)
+
+        index = self._indexes.get(position)
+        if (index is None):
+            return multigoal.nearestTargetDistance(self._walls, position, state.getFoodList())
+
+        distance = distances[index]
+        if (distance < 0):
+            return None
+
+        return distance
+
+    def getLegalNeighbors(self, position):
+        neighbors = self._legalNeighbors.get(position)
+        if (neighbors is None):
+            neighbors = frozenset(Actions.getLegalNeighbors(position, self._walls))
+            self._legalNeighbors[position] = neighbors
+
+        return neighbors
+
+    def _computeFoodDistances(self, food):
+        """
+        Get the distance (by position index) to the nearest food, -1 for unreachable positions.
+        """
+
+        neighborIndexes = self._neighborIndexes
+
+        distances = [-1] * len(self._positions)
+        frontier = []
+
+        for position in food:
+            index = self._indexes[position]
+            distances[index] = 0
+            frontier.append(index)
+
+        distance = 0
+        while (len(frontier) > 0):
+            distance += 1
+            nextFrontier = []
+
+            for index in frontier:
+                for neighbor in neighborIndexes[index]:
+                    if (distances[neighbor] < 0):
+                        distances[neighbor] = distance
+                        nextFrontier.append(neighbor)
+
+            frontier = nextFrontier
+
+        return distances
+
+def _getWallsTable(walls):
+    global _lastWalls, _lastWallsTable
+
+    if (walls is _lastWalls):
+        return _lastWallsTable
+
+    table = _wallsTables.get(walls)
+    if (table is None):
+        table = _WallsTable(walls)
+        _wallsTables.put(walls, table)
+
+    _lastWalls = walls
+    _lastWallsTable = table
+
+    return _lastWallsTable
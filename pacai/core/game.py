@@ -168,6 +168,7 @@ class Game:
             startTime = time.time()
 
             try:
+                agent.registerRules(self.rules)
                 agent.registerInitialState(self.state)
             except Exception as ex:
                 if (not self.catchExceptions):
@@ -33,6 +33,10 @@ class AbstractGameState(abc.ABC):
         self._food = layout.food.copy()
         self._lastFoodEaten = None
 
+        # Hashing the food grid means walking the whole board,
+        # so keep the food's bitmask for as long as the food is shared.
+        self._foodBitmask = None
+
         self._capsulesCopied = False
         self._capsules = layout.capsules.copy()
         self._lastCapsuleEaten = None
@@ -99,6 +103,7 @@ class AbstractGameState(abc.ABC):
             self._foodCopied = True
 
         self._food[x][y] = False
+        self._foodBitmask = None
         self._lastFoodEaten = (x, y)
 
         self._hash = None
@@ -149,6 +154,33 @@ class AbstractGameState(abc.ABC):
 
         return self._food.copy()
 
+    def getFoodBitmask(self):
+        """
+        Get the food as an int with a bit per dot (cached for as long as the food is unchanged).
+        Unlike getFoodHash(), states with different food never share a bitmask,
+        so this is the one to key caches on.
+        """
+
+        if (self._foodBitmask is None):
+            self._foodBitmask = self._food.asBitmask()
+
+        return self._foodBitmask
+
+    def getFoodHash(self):
+        """
+        Get a hash of just the food.
+        """
+
+        return hash(self.getFoodBitmask())
+
+    def getFoodList(self):
+        """
+        Returns a list of positions (x, y) of the remaining food.
+        Unlike getFood(), this does not copy the grid.
+        """
+
+        return self._food.asList()
+
     def getHighlightLocations(self):
         return self._highlightLocations
 
@@ -287,9 +319,17 @@ class AbstractGameState(abc.ABC):
                 and self._agentStates == other._agentStates
                 and self._layout == other._layout)
 
+    def __getstate__(self):
+        # Hashes of strings (like directions) differ between runs,
+        # so a pickled state must not carry its cached hash.
+        state = self.__dict__.copy()
+        state['_hash'] = None
+
+        return state
+
     def __hash__(self):
         if (self._hash is None):
             self._hash = util.buildHash(self._score, self._gameover, self._win, *self._capsules,
-                self._food, *self._agentStates, self._layout)
+                self.getFoodHash(), *self._agentStates, self._layout)
 
         return self._hash
@@ -23,6 +23,23 @@ class Grid:
 
         return values
 
+    def asBitmask(self):
+        """
+        Get the grid as an int, with a bit set for every true cell.
+        Unlike the grid's hash, this is exact: unequal grids (of the same size) never share it.
+        """
+
+        bitmask = 0
+        base = 1
+
+        for row in self._data:
+            for value in row:
+                if (value):
+                    bitmask += base
+                base *= 2
+
+        return bitmask
+
     def copy(self):
         grid = Grid(self._width, self._height)
         grid._data = [row.copy() for row in self._data]
@@ -61,16 +78,7 @@ class Grid:
         return self._data[i]
 
     def __hash__(self):
-        hashcode = 0
-        base = 1
-
-        for row in self._data:
-            for value in row:
-                if (value):
-                    hashcode += base
-                base *= 2
-
-        return hash(hashcode)
+        return hash(self.asBitmask())
 
     def __lt__(self, other):
         return self.__hash__() < other.__hash__()
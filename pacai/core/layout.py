@@ -72,6 +72,20 @@ class Layout(object):
         row, col = [int(x) for x in pacPos]
         return ghostPos in self.visibility[row][col][pacDirection]
 
+    def __eq__(self, other):
+        # Layouts are equal by their text (not identity),
+        # so states from a reloaded layout match states from a fresh one.
+        if (self is other):
+            return True
+
+        if (not isinstance(other, Layout)):
+            return False
+
+        return self.numGhosts == other.numGhosts and self.layoutText == other.layoutText
+
+    def __hash__(self):
+        return hash((self.numGhosts, *self.layoutText))
+
     def __str__(self):
         return "\n".join(self.layoutText)
 
@@ -1,4 +1,10 @@
 import abc
+import array
+
+from pacai.util import priorityQueue
+
+# Pivots smaller than this are taken as zero (a singular system).
+SINGULAR_EPSILON = 1e-12
 
 class MarkovDecisionProcess(abc.ABC):
     @abc.abstractmethod
@@ -59,3 +65,352 @@ class MarkovDecisionProcess(abc.ABC):
         """
 
         pass
+
+class CompiledMDP(object):
+    """
+    A `MarkovDecisionProcess` flattened into index arrays, for fast planning.
+
+    The MDP's transition model is queried exactly once per (state, action).
+    States are numbered in the order of `MarkovDecisionProcess.getStates`,
+    and each (state, action) pair is a row:
+    the rows of state s are rowStarts[s] to rowStarts[s + 1],
+    and the transitions of row q are transitionStarts[q] to transitionStarts[q + 1]
+    (as nextStates, probabilities, and rewards).
+
+    Values are kept as a list indexed by state id.
+    """
+
+    def __init__(self, mdp):
+        self._states = list(mdp.getStates())
+        self._stateIds = {state: stateId for (stateId, state) in enumerate(self._states)}
+
+        self._terminal = [mdp.isTerminal(state) for state in self._states]
+
+        # The actions of each row.
+        self._rowActions = []
+        self._rowStarts = array.array('l', [0])
+
+        self._transitionStarts = array.array('l', [0])
+        self._nextStates = array.array('l')
+        self._probabilities = array.array('d')
+        self._rewards = array.array('d')
+
+        for stateId in range(len(self._states)):
+            state = self._states[stateId]
+
+            if (not self._terminal[stateId]):
+                for action in mdp.getPossibleActions(state):
+                    for (nextState, probability) in mdp.getTransitionStatesAndProbs(state, action):
+                        self._nextStates.append(self._stateIds[nextState])
+                        self._probabilities.append(probability)
+                        self._rewards.append(mdp.getReward(state, action, nextState))
+
+                    self._rowActions.append(action)
+                    self._transitionStarts.append(len(self._nextStates))
+
+            self._rowStarts.append(len(self._rowActions))
+
+        # The states that can transition into each state, built on first use.
+        self._predecessors = None
+
+    def backup(self, stateId, values, discount):
+        """
+        Get the best (q-value, row) of a state, or (0.0, None) if it has no actions.
+        """
+
+        bestValue = 0.0
+        bestRow = None
+
+        for row in range(self._rowStarts[stateId], self._rowStarts[stateId + 1]):
+            value = self.getRowValue(row, values, discount)
+            if (bestRow is None or value > bestValue):
+                bestValue = value
+                bestRow = row
+
+        return bestValue, bestRow
+
+    def evaluatePolicy(self, policyRows, discount, values = None, sweeps = 0):
+        """
+        Get the values (by state id) of following a policy,
+        given as the row each state takes (None for states without actions).
+
+        By default, the values are exact (by solving the linear Bellman equations).
+        With sweeps, they are instead approximated by that many in place sweeps from values
+        (as in modified policy iteration).
+        """
+
+        numStates = len(self._states)
+
+        if (sweeps > 0):
+            if (values is None):
+                values = [0.0] * numStates
+            values = list(values)
+
+            for i in range(sweeps):
+                for stateId in range(numStates):
+                    if (policyRows[stateId] is not None):
+                        values[stateId] = self.getRowValue(policyRows[stateId], values, discount)
+
+            return values
+
+        # V(s) - discount * sum_s' P(s' | s) V(s') = sum_s' P(s' | s) R(s, s')
+        matrix = []
+        vector = []
+
+        for stateId in range(numStates):
+            coefficients = {stateId: 1.0}
+            constant = 0.0
+
+            if (policyRows[stateId] is not None):
+                for (nextId, probability, reward) in self.getTransitions(policyRows[stateId]):
+                    coefficients[nextId] = coefficients.get(nextId, 0.0) - discount * probability
+                    constant += probability * reward
+
+            matrix.append(coefficients)
+            vector.append(constant)
+
+        return solveLinearSystem(matrix, vector)
+
+    def getNumActiveStates(self):
+        """
+        Get the number of states with actions (the states a sweep backs up).
+        """
+
+        return sum([int(self._rowStarts[stateId] < self._rowStarts[stateId + 1])
+                for stateId in range(len(self._states))])
+
+    def getNumStates(self):
+        return len(self._states)
+
+    def getNumRows(self):
+        return len(self._rowActions)
+
+    def getPolicy(self, values, discount):
+        """
+        Get the greedy action of every state (None for states without actions).
+        """
+
+        policy = []
+        for stateId in range(len(self._states)):
+            value, row = self.backup(stateId, values, discount)
+
+            if (row is None):
+                policy.append(None)
+            else:
+                policy.append(self._rowActions[row])
+
+        return policy
+
+    def getPredecessors(self, stateId):
+        """
+        Get the ids of the states that have a transition into a state.
+        """
+
+        if (self._predecessors is None):
+            predecessors = [set() for state in self._states]
+
+            for fromId in range(len(self._states)):
+                for row in self.getRows(fromId):
+                    start = self._transitionStarts[row]
+                    end = self._transitionStarts[row + 1]
+
+                    for nextId in self._nextStates[start:end]:
+                        predecessors[nextId].add(fromId)
+
+            self._predecessors = [sorted(fromIds) for fromIds in predecessors]
+
+        return self._predecessors[stateId]
+
+    def getRow(self, stateId, action):
+        """
+        Get the row of a (state, action) pair, or None if the action is not possible.
+        """
+
+        for row in range(self._rowStarts[stateId], self._rowStarts[stateId + 1]):
+            if (self._rowActions[row] == action):
+                return row
+
+        return None
+
+    def getRowAction(self, row):
+        return self._rowActions[row]
+
+    def getRows(self, stateId):
+        return range(self._rowStarts[stateId], self._rowStarts[stateId + 1])
+
+    def getRowValue(self, row, values, discount):
+        """
+        Get the q-value of a row.
+        """
+
+        nextStates = self._nextStates
+        probabilities = self._probabilities
+        rewards = self._rewards
+
+        value = 0.0
+        for i in range(self._transitionStarts[row], self._transitionStarts[row + 1]):
+            value += probabilities[i] * (rewards[i] + discount * values[nextStates[i]])
+
+        return value
+
+    def getStateId(self, state):
+        return self._stateIds[state]
+
+    def getStates(self):
+        return self._states
+
+    def getTransitions(self, row):
+        """
+        Get the (next state id, probability, reward) of each transition of a row.
+        """
+
+        start = self._transitionStarts[row]
+        end = self._transitionStarts[row + 1]
+
+        return list(zip(self._nextStates[start:end], self._probabilities[start:end],
+                self._rewards[start:end]))
+
+    def isTerminal(self, stateId):
+        return self._terminal[stateId]
+
+    def prioritizedSweep(self, values, discount, tolerance = 0.0, maxBackups = None):
+        """
+        Update values in place by prioritized sweeping:
+        states are backed up in order of their Bellman residual (largest first),
+        and after each backup only the predecessors of the changed state are re-checked.
+        Stops when no state's residual is above the tolerance (or after maxBackups backups).
+        Returns the number of backups made.
+        """
+
+        queue = priorityQueue.PriorityQueue()
+
+        # The priority each state is currently queued with (0.0 when not queued).
+        queued = [0.0] * len(self._states)
+
+        for stateId in range(len(self._states)):
+            value, row = self.backup(stateId, values, discount)
+            residual = abs(value - values[stateId])
+
+            if (residual > tolerance):
+                queue.push(stateId, -residual)
+                queued[stateId] = residual
+
+        numBackups = 0
+        while (not queue.isEmpty() and (maxBackups is None or numBackups < maxBackups)):
+            stateId = queue.pop()
+
+            # A state pushed more than once is only handled for its first (largest) entry.
+            if (queued[stateId] == 0.0):
+                continue
+            queued[stateId] = 0.0
+
+            value, row = self.backup(stateId, values, discount)
+            if (abs(value - values[stateId]) <= tolerance):
+                continue
+
+            values[stateId] = value
+            numBackups += 1
+
+            for fromId in self.getPredecessors(stateId):
+                fromValue, fromRow = self.backup(fromId, values, discount)
+                residual = abs(fromValue - values[fromId])
+
+                if (residual > tolerance and residual > queued[fromId]):
+                    queue.push(fromId, -residual)
+                    queued[fromId] = residual
+
+        return numBackups
+
+    def sweep(self, values, discount, inPlace = False):
+        """
+        Back up every state from the given values (a synchronous Bellman update).
+        With inPlace, the values are updated as the sweep goes (a Gauss-Seidel update),
+        so later states in the sweep already see the new values of earlier ones.
+        Returns the new values and the largest change in any value.
+        """
+
+        rowStarts = self._rowStarts
+        transitionStarts = self._transitionStarts
+        nextStates = self._nextStates
+        probabilities = self._probabilities
+        rewards = self._rewards
+
+        newValues = values
+        if (not inPlace):
+            newValues = [0.0] * len(values)
+
+        residual = 0.0
+
+        for stateId in range(len(self._states)):
+            start = rowStarts[stateId]
+            end = rowStarts[stateId + 1]
+            if (start == end):
+                continue
+
+            best = None
+            for row in range(start, end):
+                value = 0.0
+                for i in range(transitionStarts[row], transitionStarts[row + 1]):
+                    value += probabilities[i] * (rewards[i] + discount * values[nextStates[i]])
+
+                if (best is None or value > best):
+                    best = value
+
+            residual = max(residual, abs(best - values[stateId]))
+            newValues[stateId] = best
+
+        return newValues, residual
+
+def solveLinearSystem(matrix, vector):
+    """
+    Solve the linear system `matrix * x = vector` by Gaussian elimination.
+
+    The matrix is sparse: a list of rows, each a {column: value} dict.
+    There is no pivoting, which is stable for (row) diagonally dominant systems,
+    like policy evaluation with a discount below one.
+    A ValueError is raised if the system is singular.
+    """
+
+    size = len(matrix)
+
+    rows = [dict(row) for row in matrix]
+    vector = list(vector)
+
+    # The rows with an entry in each column.
+    columnRows = [set() for i in range(size)]
+    for (i, row) in enumerate(rows):
+        for j in row:
+            columnRows[j].add(i)
+
+    for k in range(size):
+        pivot = rows[k].get(k, 0.0)
+        if (abs(pivot) < SINGULAR_EPSILON):
+            raise ValueError('Singular linear system (at row %d).' % (k))
+
+        for i in columnRows[k]:
+            if (i <= k):
+                continue
+
+            factor = rows[i].pop(k) / pivot
+            for (j, value) in rows[k].items():
+                if (j == k):
+                    continue
+
+                if (j not in rows[i]):
+                    columnRows[j].add(i)
+                    rows[i][j] = 0.0
+
+                rows[i][j] -= factor * value
+
+            vector[i] -= factor * vector[k]
+
+    solution = [0.0] * size
+    for k in reversed(range(size)):
+        total = vector[k]
+        for (j, value) in rows[k].items():
+            if (j > k):
+                total -= value * solution[j]
+
+        solution[k] = total / rows[k][k]
+
+    return solution
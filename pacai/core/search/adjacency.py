@@ -0,0 +1,83 @@
+"""
+Precomputed adjacency for the open (non-wall) positions of a board.
+
+Walls do not change during a game,
+so every search problem built on the same walls can share the same adjacency
+instead of recomputing neighbors on every expansion.
+"""
+
+from pacai.core.actions import Actions
+from pacai.core.directions import Directions
+from pacai.util.lru import LRUCache
+
+# The number of walls grids to keep adjacency for
+# (enough for a long run of random capture layouts not to grow without bound).
+ADJACENCY_CACHE_SIZE = 32
+
+# Adjacency is cached per walls grid.
+_cache = LRUCache(ADJACENCY_CACHE_SIZE)
+
+# Most callers ask for the same walls over and over again,
+# so remember the last request to avoid hashing the walls every time.
+_lastWalls = None
+_lastAdjacency = None
+
+def getAdjacency(walls):
+    """
+    Get the adjacency for the given walls (a `pacai.core.grid.Grid`).
+
+    The adjacency is a dict mapping every open position (x, y) to a tuple of
+    (neighbor position, action, 1) tuples (in the order of `Directions.CARDINAL`).
+    The trailing 1 is the default (constant) cost of stepping into the neighbor,
+    so the tuples can be handed out directly as successors.
+
+    The returned adjacency is shared, callers should not modify it.
+    """
+
+    global _lastWalls, _lastAdjacency
+
+    if (walls is _lastWalls):
+        return _lastAdjacency
+
+    adjacency = _cache.get(walls)
+    if (adjacency is None):
+        adjacency = _computeAdjacency(walls)
+        _cache.put(walls, adjacency)
+
+    _lastWalls = walls
+    _lastAdjacency = adjacency
+
+    return _lastAdjacency
+
+def getNeighbors(walls, position):
+    """
+    Compute the (neighbor position, action, 1) tuples for a single position
+    without consulting the cache.
+    """
+
+    x, y = position
+    width = walls.getWidth()
+    height = walls.getHeight()
+
+    neighbors = []
+    for action in Directions.CARDINAL:
+        dx, dy = Actions.directionToVector(action)
+        nextx, nexty = int(x + dx), int(y + dy)
+
+        if (nextx < 0 or nextx >= width or nexty < 0 or nexty >= height):
+            continue
+
+        if (not walls[nextx][nexty]):
+            neighbors.append(((nextx, nexty), action, 1))
+
+    return tuple(neighbors)
+
+def _computeAdjacency(walls):
+    adjacency = {}
+
+    for x in range(walls.getWidth()):
+        for y in range(walls.getHeight()):
+            if (not walls[x][y]):
+                adjacency[(x, y)] = getNeighbors(walls, (x, y))
+
+    return adjacency
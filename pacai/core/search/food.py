@@ -1,5 +1,5 @@
 from pacai.core.actions import Actions
-from pacai.core.directions import Directions
+from pacai.core.search import adjacency
 from pacai.core.search.problem import SearchProblem
 
 class FoodSearchProblem(SearchProblem):
@@ -21,6 +21,9 @@ class FoodSearchProblem(SearchProblem):
         self.startingGameState = startingGameState
         self.heuristicInfo = {}  # A dictionary for the heuristic to store information
 
+        # Problems on the same walls share the same (cached) adjacency.
+        self._adjacency = adjacency.getAdjacency(self.walls)
+
     def startingState(self):
         return self.start
 
@@ -34,14 +37,10 @@ class FoodSearchProblem(SearchProblem):
 
         successors = []
         self._numExpanded += 1
-        for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x, y = state[0]
-            dx, dy = Actions.directionToVector(direction)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
-                successors.append((((nextx, nexty), nextFood), direction, 1))
+        for ((nextx, nexty), direction, cost) in self._adjacency[state[0]]:
+            nextFood = state[1].copy()
+            nextFood[nextx][nexty] = False
+            successors.append((((nextx, nexty), nextFood), direction, cost))
 
         return successors
 
@@ -0,0 +1,78 @@
+"""
+Breadth-first search towards many goal positions at once.
+
+Instead of running a separate search for every target (e.g. every food dot),
+a single sweep out from the root finds the nearest targets in order of their maze distance.
+A sweep stops at the k-th nearest target, so it only visits the cells closer than that target,
+but every new root (e.g. after a dot is eaten) takes a new sweep.
+"""
+
+import collections
+
+from pacai.core.grid import Grid
+from pacai.core.search import adjacency
+
+def nearestTargets(walls, start, targets, k = 1):
+    """
+    Returns a list of up to k (target, actions) tuples for the k targets nearest to start
+    (nearest first).
+
+    The targets can be a `pacai.core.grid.Grid` of booleans (like the food grid)
+    or any container of (x, y) positions.
+    """
+
+    if (isinstance(targets, Grid)):
+        isTarget = lambda position: targets[position[0]][position[1]]
+    else:
+        isTarget = targets.__contains__
+
+    return _sweep(walls, adjacency.getAdjacency(walls), start, isTarget, k)
+
+def nearestTargetDistance(walls, start, targets):
+    """
+    Returns the maze distance from start to the nearest target,
+    or None if no target can be reached.
+    See `nearestTargets` for the accepted targets.
+    """
+
+    found = nearestTargets(walls, start, targets, 1)
+    if (len(found) == 0):
+        return None
+
+    return len(found[0][1])
+
+def _buildPath(parents, position):
+    actions = []
+
+    while (parents[position] is not None):
+        position, action = parents[position]
+        actions.append(action)
+
+    actions.reverse()
+    return actions
+
+def _sweep(walls, adjacencyMap, start, isTarget, k):
+    found = []
+
+    # {position: (previous position, action), ...}
+    parents = {start: None}
+    frontier = collections.deque([start])
+
+    while (len(frontier) > 0):
+        position = frontier.popleft()
+
+        if (isTarget(position)):
+            found.append((position, _buildPath(parents, position)))
+            if (len(found) >= k):
+                break
+
+        neighbors = adjacencyMap.get(position)
+        if (neighbors is None):
+            neighbors = adjacency.getNeighbors(walls, position)
+
+        for (nextPosition, action, cost) in neighbors:
+            if (nextPosition not in parents):
+                parents[nextPosition] = (position, action)
+                frontier.append(nextPosition)
+
+    return found
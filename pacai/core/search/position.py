@@ -1,5 +1,5 @@
 from pacai.core.actions import Actions
-from pacai.core.directions import Directions
+from pacai.core.search import adjacency
 from pacai.core.search.problem import SearchProblem
 
 DEFAULT_COST_FUNCTION = lambda x: 1
@@ -27,6 +27,9 @@ class PositionSearchProblem(SearchProblem):
         self.goal = goal
         self.costFn = costFn
 
+        # Problems on the same walls share the same (cached) adjacency.
+        self._adjacency = adjacency.getAdjacency(self.walls)
+
         self.startState = start
         if (self.startState is None):
             self.startState = gameState.getAgentPosition(0)
@@ -43,11 +46,9 @@ class PositionSearchProblem(SearchProblem):
 
         # Register the locations we have visited.
         # This allows the GUI to highlight them.
-        self._visitedLocations.add(state)
         # Note: visit history requires coordinates not states. In this situation
         # they are equivalent.
-        coordinates = state
-        self._visitHistory.append(coordinates)
+        self._recordVisit(state)
 
         return True
 
@@ -56,27 +57,24 @@ class PositionSearchProblem(SearchProblem):
         Returns successor states, the actions they require, and a constant cost of 1.
         """
 
-        successors = []
-
-        for action in Directions.CARDINAL:
-            x, y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-
-            if (not self.walls[nextx][nexty]):
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
+        neighbors = self._adjacency.get(state)
+        if (neighbors is None):
+            # Not an open position on the board (e.g. a start inside a wall).
+            neighbors = adjacency.getNeighbors(self.walls, state)
 
-                successors.append((nextState, action, cost))
+        if (self.costFn is DEFAULT_COST_FUNCTION):
+            # The precomputed successors already have the constant cost.
+            successors = list(neighbors)
+        else:
+            successors = [(nextState, action, self.costFn(nextState))
+                    for (nextState, action, cost) in neighbors]
 
         # Bookkeeping for display purposes (the highlight in the GUI).
         self._numExpanded += 1
-        if (state not in self._visitedLocations):
-            self._visitedLocations.add(state)
+        if (self._recordVisits):
             # Note: visit history requires coordinates not states. In this situation
             # they are equivalent.
-            coordinates = state
-            self._visitHistory.append(coordinates)
+            self._recordVisit(state)
 
         return successors
 
@@ -28,7 +28,12 @@ class SearchProblem(abc.ABC):
 
         # Keep track of the coordinates we have visited.
         # Students are not required to use these,
-        # but doing so will allow the GUI to highlight the visited coordinates.
+        # but doing so (via SearchProblem._recordVisit,
+        # or by adding (x, y) tuples to both of these directly) will allow the GUI
+        # to highlight the visited coordinates.
+        # Recording can be turned off (see SearchProblem.setRecordVisits)
+        # when nobody will be looking at the highlights.
+        self._recordVisits = True
         self._visitedLocations = set()
         self._visitHistory = []
 
@@ -46,8 +51,24 @@ class SearchProblem(abc.ABC):
     def getExpandedCount(self):
         return self._numExpanded
 
-    def getVisitHistory(self):
-        return self._visitHistory
+    def getVisitHistory(self, maxLocations = None):
+        """
+        Get the visited coordinates (in the order they were first visited).
+        If maxLocations is supplied, then the history will be evenly sampled
+        (keeping the order) down to at most that many coordinates.
+        """
+
+        history = self._visitHistory
+        numLocations = len(history)
+
+        if (maxLocations is None or numLocations <= maxLocations):
+            return history
+
+        step = -(-numLocations // max(1, int(maxLocations)))
+        return history[::step]
+
+    def isRecordingVisits(self):
+        return self._recordVisits
 
     @abc.abstractmethod
     def isGoal(self, state):
@@ -71,6 +92,14 @@ class SearchProblem(abc.ABC):
 
         pass
 
+    def setRecordVisits(self, recordVisits):
+        """
+        Turn on/off the recording of visited coordinates.
+        Headless searches have no use for the highlights, so they can skip the bookkeeping.
+        """
+
+        self._recordVisits = bool(recordVisits)
+
     @abc.abstractmethod
     def successorStates(self, state):
         """
@@ -82,3 +111,16 @@ class SearchProblem(abc.ABC):
         """
 
         pass
+
+    def _recordVisit(self, coordinates):
+        """
+        Register a visit to some (x, y) coordinates.
+        This allows the GUI to highlight them.
+        Repeat visits and visits while recording is off are ignored.
+        """
+
+        if (not self._recordVisits or coordinates in self._visitedLocations):
+            return
+
+        self._visitedLocations.add(coordinates)
+        self._visitHistory.append(coordinates)
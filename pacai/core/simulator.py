@@ -0,0 +1,296 @@
+"""
+A fast, mutable simulation of classic pacman for rollouts (e.g. in Monte Carlo tree search).
+
+`pacai.bin.pacman.PacmanGameState.generateSuccessor` copies the state (and all its agent states)
+for every move, and checks every action against freshly computed legal actions.
+That is the right thing for the real game, but a rollout only needs to play out
+a few hundred moves as fast as possible and then look at the score.
+
+A `PacmanSimulator` is created once from a game state and then updated in place.
+Positions are integer tuples, food and capsules are sets,
+and moves are looked up in the shared adjacency of the walls
+(see `pacai.core.search.adjacency`).
+
+The simulation follows the classic rules of `pacai.bin.pacman` (and uses its scoring constants):
+scores, capsules, eating ghosts, and dying,
+with one simplification: instead of moving at half speed,
+scared ghosts only move every other turn (so they always stay on grid points).
+"""
+
+from pacai.bin.pacman import BOARD_CLEAR_POINTS
+from pacai.bin.pacman import FOOD_POINTS
+from pacai.bin.pacman import GHOST_POINTS
+from pacai.bin.pacman import LOSE_POINTS
+from pacai.bin.pacman import PACMAN_AGENT_INDEX
+from pacai.bin.pacman import SCARED_TIME
+from pacai.bin.pacman import TIME_PENALTY
+from pacai.core.actions import Actions
+from pacai.core.directions import Directions
+from pacai.core.search import adjacency
+from pacai.util import util
+
+# The probability that a greedy ghost takes its best move (like `DirectionalGhost`).
+GREEDY_GHOST_PROBABILITY = 0.8
+
+class PacmanSimulator(object):
+    """
+    A compact copy of a classic pacman game that can play moves in place.
+    """
+
+    def __init__(self, state):
+        """
+        Build a simulator from a `pacai.bin.pacman.PacmanGameState`.
+        """
+
+        walls = state.getWalls()
+        self._adjacency = adjacency.getAdjacency(walls)
+
+        agentStates = state.getAgentStates()
+        self._numAgents = len(agentStates)
+
+        self._positions = [util.nearestPoint(agentState.getPosition())
+                for agentState in agentStates]
+        self._directions = [agentState.getDirection() for agentState in agentStates]
+        self._scaredTimers = [agentState.getScaredTimer() for agentState in agentStates]
+        self._starts = [state.getInitialAgentPosition(index) for index in range(self._numAgents)]
+
+        # Scared ghosts move on every other turn, this tracks whose turn is skipped next.
+        self._skipNext = [False] * self._numAgents
+
+        self._food = set(state.getFood().asList())
+        self._capsules = set(state.getCapsules())
+
+        self._score = state.getScore()
+        self._over = state.isOver()
+        self._win = state.isWin()
+
+    def copy(self):
+        simulator = PacmanSimulator.__new__(PacmanSimulator)
+
+        simulator._adjacency = self._adjacency
+        simulator._numAgents = self._numAgents
+        simulator._positions = list(self._positions)
+        simulator._directions = list(self._directions)
+        simulator._scaredTimers = list(self._scaredTimers)
+        simulator._starts = self._starts
+        simulator._skipNext = list(self._skipNext)
+        simulator._food = set(self._food)
+        simulator._capsules = set(self._capsules)
+        simulator._score = self._score
+        simulator._over = self._over
+        simulator._win = self._win
+
+        return simulator
+
+    def getAgentPosition(self, agentIndex):
+        return self._positions[agentIndex]
+
+    def getLegalActions(self, agentIndex):
+        """
+        Get the legal actions, following the same rules as the real game
+        (pacman may stop, ghosts may not stop or turn around unless they are stuck).
+        """
+
+        if (self._over):
+            return []
+
+        neighbors = self._adjacency[self._positions[agentIndex]]
+
+        if (agentIndex == PACMAN_AGENT_INDEX):
+            return [action for (position, action, cost) in neighbors] + [Directions.STOP]
+
+        return [action for (position, action) in self._ghostMoves(agentIndex)]
+
+    def getNumAgents(self):
+        return self._numAgents
+
+    def getNumFood(self):
+        return len(self._food)
+
+    def getScore(self):
+        return self._score
+
+    def isLose(self):
+        return self._over and not self._win
+
+    def isOver(self):
+        return self._over
+
+    def isWin(self):
+        return self._over and self._win
+
+    def rollout(self, agentIndex, rng, maxMoves, greedy = False):
+        """
+        Play out the game (in place) starting with agentIndex to move,
+        until the game is over or maxMoves moves have been made.
+        Each agent uses `PacmanSimulator.sampleAction`.
+        Returns the final score.
+        """
+
+        moves = 0
+        while (not self._over and moves < maxMoves):
+            self.step(agentIndex, self.sampleAction(agentIndex, rng, greedy))
+
+            agentIndex = (agentIndex + 1) % self._numAgents
+            moves += 1
+
+        return self._score
+
+    def sampleAction(self, agentIndex, rng, greedy = False):
+        """
+        Pick an action for a rollout.
+
+        The random policy never has pacman stop or turn around (unless it is stuck),
+        and has ghosts pick uniformly among their legal actions.
+
+        The greedy policy has pacman take food next to it and step away from brave ghosts,
+        and has ghosts chase (or flee when scared) like a `DirectionalGhost`.
+        """
+
+        if (agentIndex == PACMAN_AGENT_INDEX):
+            return self._samplePacmanAction(rng, greedy)
+
+        return self._sampleGhostAction(agentIndex, rng, greedy)
+
+    def step(self, agentIndex, action):
+        """
+        Apply an action in place.
+        The action is not checked, it should come from `PacmanSimulator.getLegalActions`.
+        """
+
+        if (agentIndex == PACMAN_AGENT_INDEX):
+            self._stepPacman(action)
+        else:
+            self._stepGhost(agentIndex, action)
+
+    def _ghostMoves(self, agentIndex):
+        """
+        Get the (position, action) pairs a ghost can move to.
+        """
+
+        neighbors = self._adjacency[self._positions[agentIndex]]
+        reverse = Actions.reverseDirection(self._directions[agentIndex])
+
+        moves = [(position, action) for (position, action, cost) in neighbors
+                if action != reverse]
+        if (len(moves) == 0):
+            moves = [(position, action) for (position, action, cost) in neighbors]
+
+        return moves
+
+    def _samplePacmanAction(self, rng, greedy):
+        neighbors = self._adjacency[self._positions[PACMAN_AGENT_INDEX]]
+        if (len(neighbors) == 0):
+            return Directions.STOP
+
+        reverse = Actions.reverseDirection(self._directions[PACMAN_AGENT_INDEX])
+        moves = [(position, action) for (position, action, cost) in neighbors
+                if action != reverse]
+        if (len(moves) == 0):
+            moves = [(position, action) for (position, action, cost) in neighbors]
+
+        if (greedy):
+            # Stay out of the reach of brave ghosts.
+            danger = set()
+            for index in range(1, self._numAgents):
+                if (self._scaredTimers[index] == 0):
+                    ghostPosition = self._positions[index]
+                    danger.add(ghostPosition)
+                    for (position, action, cost) in self._adjacency[ghostPosition]:
+                        danger.add(position)
+
+            safe = [move for move in moves if move[0] not in danger]
+            if (len(safe) == 0):
+                safe = [(position, action) for (position, action, cost) in neighbors
+                        if position not in danger]
+
+            if (len(safe) > 0):
+                moves = safe
+
+            eating = [move for move in moves if move[0] in self._food or move[0] in self._capsules]
+            if (len(eating) > 0):
+                moves = eating
+
+        return moves[rng.randrange(len(moves))][1]
+
+    def _sampleGhostAction(self, agentIndex, rng, greedy):
+        moves = self._ghostMoves(agentIndex)
+        if (len(moves) == 0):
+            return Directions.STOP
+
+        if (greedy and rng.random() < GREEDY_GHOST_PROBABILITY):
+            px, py = self._positions[PACMAN_AGENT_INDEX]
+            distances = [abs(x - px) + abs(y - py) for ((x, y), action) in moves]
+
+            if (self._scaredTimers[agentIndex] > 0):
+                best = max(distances)
+            else:
+                best = min(distances)
+
+            moves = [moves[i] for i in range(len(moves)) if distances[i] == best]
+
+        return moves[rng.randrange(len(moves))][1]
+
+    def _stepPacman(self, action):
+        position = self._positions[PACMAN_AGENT_INDEX]
+
+        if (action != Directions.STOP):
+            for (nextPosition, nextAction, cost) in self._adjacency[position]:
+                if (nextAction == action):
+                    position = nextPosition
+                    break
+
+            self._positions[PACMAN_AGENT_INDEX] = position
+            self._directions[PACMAN_AGENT_INDEX] = action
+
+        if (position in self._food):
+            self._food.remove(position)
+            self._score += FOOD_POINTS
+
+            if (len(self._food) == 0):
+                self._score += BOARD_CLEAR_POINTS
+                self._over = True
+                self._win = True
+        elif (position in self._capsules):
+            self._capsules.remove(position)
+
+            for index in range(1, self._numAgents):
+                self._scaredTimers[index] = SCARED_TIME
+                self._skipNext[index] = False
+
+        self._score -= TIME_PENALTY
+
+        for index in range(1, self._numAgents):
+            if (self._positions[index] == position):
+                self._collide(index)
+
+    def _stepGhost(self, agentIndex, action):
+        if (self._scaredTimers[agentIndex] > 0 and self._skipNext[agentIndex]):
+            # Scared ghosts move at half speed.
+            self._skipNext[agentIndex] = False
+        else:
+            for (nextPosition, nextAction, cost) in self._adjacency[self._positions[agentIndex]]:
+                if (nextAction == action):
+                    self._positions[agentIndex] = nextPosition
+                    self._directions[agentIndex] = action
+                    break
+
+            self._skipNext[agentIndex] = (self._scaredTimers[agentIndex] > 0)
+
+        if (self._scaredTimers[agentIndex] > 0):
+            self._scaredTimers[agentIndex] -= 1
+
+        if (self._positions[agentIndex] == self._positions[PACMAN_AGENT_INDEX]):
+            self._collide(agentIndex)
+
+    def _collide(self, agentIndex):
+        if (self._scaredTimers[agentIndex] > 0):
+            self._score += GHOST_POINTS
+            self._positions[agentIndex] = self._starts[agentIndex]
+            self._directions[agentIndex] = Directions.STOP
+            self._scaredTimers[agentIndex] = 0
+            self._skipNext[agentIndex] = False
+        elif (not self._over):
+            self._score += LOSE_POINTS
+            self._over = True
+            self._win = False
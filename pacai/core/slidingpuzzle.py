@@ -0,0 +1,346 @@
+"""
+Fast machinery for sliding tile puzzles (the eight puzzle and the fifteen puzzle).
+
+A puzzle is packed into a single integer with 4 bits per cell:
+cell i (in row-major order) occupies bits [4i, 4i + 4) and holds the tile number (0 for the blank).
+So the eight puzzle fits into 36 bits and the fifteen puzzle into 64 bits.
+Moves are precomputed per blank cell, so a move is just a few integer operations.
+
+For estimating the distance to the goal, this module provides an additive pattern database:
+the tiles are split into disjoint groups (patterns),
+and for each pattern a backward breadth-first search from the goal records the exact number of
+moves of that pattern's tiles needed to put them in place (moves of other tiles are free).
+Since every move moves exactly one tile, the sum over the patterns is admissible.
+The tables are generated once and cached to disk.
+"""
+
+import collections
+import logging
+import os
+
+BITS_PER_CELL = 4
+CELL_MASK = (1 << BITS_PER_CELL) - 1
+
+UNKNOWN_DISTANCE = 255
+
+# The blank moves (not the tiles).
+MOVES = {
+    'up': (-1, 0),
+    'down': (1, 0),
+    'left': (0, -1),
+    'right': (0, 1),
+}
+
+# The order moves are reported in.
+MOVE_ORDER = ['up', 'down', 'left', 'right']
+
+DEFAULT_PATTERNS = {
+    3: ((1, 2, 3, 4), (5, 6, 7, 8)),
+    4: ((1, 2, 3, 4, 5), (6, 7, 8, 9, 10), (11, 12, 13, 14, 15)),
+}
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pacai')
+
+# {size: moveTable, ...}
+_moveTables = {}
+
+def pack(numbers):
+    """
+    Pack a row-major list of tile numbers (0 for the blank) into an integer.
+    """
+
+    packed = 0
+    for cell in range(len(numbers)):
+        packed |= (numbers[cell] << (cell * BITS_PER_CELL))
+
+    return packed
+
+def unpack(packed, size):
+    """
+    Unpack an integer into a row-major list of tile numbers.
+    """
+
+    return [(packed >> (cell * BITS_PER_CELL)) & CELL_MASK for cell in range(size * size)]
+
+def findBlank(packed, size):
+    """
+    Get the cell that holds the blank.
+    """
+
+    for cell in range(size * size):
+        if (((packed >> (cell * BITS_PER_CELL)) & CELL_MASK) == 0):
+            return cell
+
+    raise ValueError('Puzzle has no blank.')
+
+def goalState(size):
+    """
+    The goal has the blank in the top-left corner and the tiles in order after it.
+    """
+
+    return pack(list(range(size * size)))
+
+def getMoveTable(size):
+    """
+    Get the moves available for each blank cell.
+    The table is indexed by the blank's cell and holds a tuple of (move, new blank cell) pairs
+    (in `MOVE_ORDER`).
+    """
+
+    if (size not in _moveTables):
+        table = []
+        for cell in range(size * size):
+            row, col = divmod(cell, size)
+
+            moves = []
+            for move in MOVE_ORDER:
+                dRow, dCol = MOVES[move]
+                newRow, newCol = row + dRow, col + dCol
+
+                if (0 <= newRow < size and 0 <= newCol < size):
+                    moves.append((move, newRow * size + newCol))
+
+            table.append(tuple(moves))
+
+        _moveTables[size] = tuple(table)
+
+    return _moveTables[size]
+
+def applyMove(packed, blank, newBlank):
+    """
+    Slide the tile at newBlank into the (blank) cell at blank.
+    """
+
+    tile = (packed >> (newBlank * BITS_PER_CELL)) & CELL_MASK
+    return packed ^ (tile << (newBlank * BITS_PER_CELL)) ^ (tile << (blank * BITS_PER_CELL))
+
+class PatternDatabase(object):
+    """
+    An additive pattern database heuristic for a sliding puzzle of the given size.
+    """
+
+    def __init__(self, size, patterns = None, cacheDir = DEFAULT_CACHE_DIR):
+        """
+        Args:
+            size: The width (and height) of the puzzle.
+            patterns: Disjoint groups of tiles, see `DEFAULT_PATTERNS` for the default.
+            cacheDir: Where to load/save the generated tables from/to.
+                      Use None to skip the disk cache.
+        """
+
+        if (patterns is None):
+            patterns = DEFAULT_PATTERNS[size]
+
+        self._size = size
+        self._numCells = size * size
+        self._patterns = tuple(tuple(pattern) for pattern in patterns)
+
+        # For each tile, the pattern it belongs to and its weight in the pattern's table index.
+        # Tiles without a pattern are free.
+        self._tilePattern = [None] * self._numCells
+        self._tileWeight = [0] * self._numCells
+
+        self._tables = []
+        for patternIndex in range(len(self._patterns)):
+            pattern = self._patterns[patternIndex]
+
+            for i in range(len(pattern)):
+                if (self._tilePattern[pattern[i]] is not None):
+                    raise ValueError('Tile %d appears in more than one pattern.' % (pattern[i]))
+
+                self._tilePattern[pattern[i]] = patternIndex
+                self._tileWeight[pattern[i]] = self._numCells ** i
+
+            self._tables.append(self._loadTable(pattern, cacheDir))
+
+    def estimate(self, packed):
+        """
+        Estimate (admissibly) the number of moves needed to solve the packed puzzle.
+        """
+
+        return sum(self._tables[i][key] for (i, key) in enumerate(self.keys(packed)))
+
+    def getSize(self):
+        return self._size
+
+    def getTileWeights(self):
+        return self._tileWeight
+
+    def getTilePatterns(self):
+        return self._tilePattern
+
+    def getTables(self):
+        return self._tables
+
+    def keys(self, packed):
+        """
+        Get the table index of each pattern for the packed puzzle.
+        """
+
+        keys = [0] * len(self._patterns)
+
+        for cell in range(self._numCells):
+            tile = (packed >> (cell * BITS_PER_CELL)) & CELL_MASK
+            pattern = self._tilePattern[tile]
+
+            if (pattern is not None):
+                keys[pattern] += cell * self._tileWeight[tile]
+
+        return keys
+
+    def _loadTable(self, pattern, cacheDir):
+        path = None
+        if (cacheDir is not None):
+            filename = 'puzzle-%d-%s.pdb' % (self._size, '-'.join([str(tile) for tile in pattern]))
+            path = os.path.join(cacheDir, filename)
+
+        if (path is not None and os.path.isfile(path)):
+            with open(path, 'rb') as file:
+                table = bytearray(file.read())
+
+            if (len(table) == self._numCells ** len(pattern)):
+                return table
+
+            logging.warning('Ignoring pattern database with an unexpected size: %s.' % (path))
+
+        logging.info('Building pattern database for tiles %s.' % (str(pattern)))
+        table = buildPatternTable(self._size, pattern)
+
+        if (path is not None):
+            os.makedirs(cacheDir, exist_ok = True)
+            with open(path, 'wb') as file:
+                file.write(table)
+
+        return table
+
+def buildPatternTable(size, pattern):
+    """
+    Run a backward breadth-first search from the goal over the abstract space of
+    (positions of the pattern tiles, position of the blank).
+    Moving a pattern tile costs one, moving any other tile is free.
+
+    Returns a bytearray indexed by sum(cell(pattern[i]) * (size * size)^i)
+    that holds the fewest pattern moves needed to bring the pattern tiles home.
+    """
+
+    numCells = size * size
+    numTiles = len(pattern)
+    weights = [numCells ** i for i in range(numTiles)]
+    moveTable = getMoveTable(size)
+
+    table = bytearray([UNKNOWN_DISTANCE]) * (numCells ** numTiles)
+    distances = bytearray([UNKNOWN_DISTANCE]) * (numCells ** (numTiles + 1))
+
+    # In the goal, tile t sits in cell t and the blank in cell 0.
+    startKey = sum(pattern[i] * weights[i] for i in range(numTiles))
+    start = startKey * numCells
+
+    distances[start] = 0
+    queue = collections.deque([start])
+
+    while (len(queue) > 0):
+        code = queue.popleft()
+        key, blank = divmod(code, numCells)
+        distance = distances[code]
+
+        if (distance < table[key]):
+            table[key] = distance
+
+        # Decode the cell of each pattern tile.
+        positions = []
+        remaining = key
+        for i in range(numTiles):
+            remaining, cell = divmod(remaining, numCells)
+            positions.append(cell)
+
+        for (move, newBlank) in moveTable[blank]:
+            if (newBlank in positions):
+                # A pattern tile slides into the blank.
+                tileIndex = positions.index(newBlank)
+                newKey = key + (blank - newBlank) * weights[tileIndex]
+                newDistance = distance + 1
+            else:
+                newKey = key
+                newDistance = distance
+
+            newCode = newKey * numCells + newBlank
+            if (newDistance >= distances[newCode]):
+                continue
+
+            distances[newCode] = newDistance
+            if (newDistance == distance):
+                queue.appendleft(newCode)
+            else:
+                queue.append(newCode)
+
+    return table
+
+def solve(packed, size, database):
+    """
+    Find an optimal sequence of (blank) moves that solves the packed puzzle
+    using IDA* guided by a `PatternDatabase`.
+    """
+
+    numCells = size * size
+    moveTable = getMoveTable(size)
+    tilePattern = database.getTilePatterns()
+    tileWeight = database.getTileWeights()
+    tables = database.getTables()
+
+    goal = goalState(size)
+    keys = database.keys(packed)
+    blank = findBlank(packed, size)
+
+    path = []
+    bound = database.estimate(packed)
+
+    def _search(packed, blank, previousBlank, g, h):
+        # Returns the smallest f that exceeded the bound, or None when solved.
+        f = g + h
+        if (f > bound):
+            return f
+
+        if (packed == goal):
+            return None
+
+        nextBound = UNKNOWN_DISTANCE * numCells
+
+        for (move, newBlank) in moveTable[blank]:
+            if (newBlank == previousBlank):
+                continue
+
+            tile = (packed >> (newBlank * BITS_PER_CELL)) & CELL_MASK
+            newPacked = (packed ^ (tile << (newBlank * BITS_PER_CELL))
+                    ^ (tile << (blank * BITS_PER_CELL)))
+
+            pattern = tilePattern[tile]
+            newH = h
+            oldKey = 0
+            if (pattern is not None):
+                oldKey = keys[pattern]
+                keys[pattern] = oldKey + (blank - newBlank) * tileWeight[tile]
+                newH = h - tables[pattern][oldKey] + tables[pattern][keys[pattern]]
+
+            path.append(move)
+            result = _search(newPacked, newBlank, blank, g + 1, newH)
+            if (result is None):
+                return None
+
+            path.pop()
+            if (pattern is not None):
+                keys[pattern] = oldKey
+
+            if (result < nextBound):
+                nextBound = result
+
+        return nextBound
+
+    while (True):
+        result = _search(packed, blank, None, 0, database.estimate(packed))
+        if (result is None):
+            return path
+
+        if (result >= UNKNOWN_DISTANCE * numCells):
+            raise ValueError('Puzzle cannot be solved.')
+
+        bound = result
@@ -1,7 +1,13 @@
 from cmath import inf
 from random import choice
+from pacai.agents.learning.features import FeatureWeights
+from pacai.agents.learning.qtable import QTable
 from pacai.agents.learning.reinforcement import ReinforcementAgent
-from pacai.util import reflection, probability
+from pacai.util import reflection, probability, util
+from pacai.util.lru import LRUCache
+
+# Enough cached feature vectors for every action of the last two states.
+FEATURE_CACHE_SIZE = 16
 
 
 class QLearningAgent(ReinforcementAgent):
@@ -45,12 +51,18 @@ class QLearningAgent(ReinforcementAgent):
     DESCRIPTION: <Write something here so we know what you did.>
     """
 
-    def __init__(self, index, **kwargs):
+    def __init__(self, index, arrayTable=False, **kwargs):
         super().__init__(index, **kwargs)
 
         # A dictionary which holds the q-values for each state.
         self.values = {}
 
+        # With arrayTable set, the q-values are instead kept in a
+        # `pacai.agents.learning.qtable.QTable` (states interned to ids, values in a flat array).
+        self.qTable = None
+        if util.parseBool(arrayTable):
+            self.qTable = QTable()
+
     def getQValue(self, state, action):
         """
         Get the Q-Value for a `pacai.core.gamestate.AbstractGameState`
@@ -61,6 +73,10 @@ class QLearningAgent(ReinforcementAgent):
         if action is None:
             return 0.0
 
+        if self.qTable is not None:
+            return self.qTable.getValue(self.qTable.getStateId(state),
+                self.qTable.getActionId(action))
+
         if not (state, action) in self.values:
             self.values[state, action] = 0.0
 
@@ -79,6 +95,10 @@ class QLearningAgent(ReinforcementAgent):
         Whereas this method returns the value of the best action.
         """
 
+        if self.qTable is not None:
+            return self.qTable.getBest(self.qTable.getStateId(state),
+                ReinforcementAgent.getLegalActions(self, state))[0]
+
         return self.getQValue(state, self.getPolicy(state))
 
     def getPolicy(self, state):
@@ -94,6 +114,10 @@ class QLearningAgent(ReinforcementAgent):
         Whereas this method returns the best action itself.
         """
 
+        if self.qTable is not None:
+            return self.qTable.getBest(self.qTable.getStateId(state),
+                ReinforcementAgent.getLegalActions(self, state))[1]
+
         bestValue = -inf
         bestAction = None
 
@@ -125,6 +149,15 @@ class QLearningAgent(ReinforcementAgent):
         alpha = ReinforcementAgent.getAlpha(self)
         discountRate = ReinforcementAgent.getDiscountRate(self)
 
+        if self.qTable is not None:
+            stateId = self.qTable.getStateId(state)
+            actionId = self.qTable.getActionId(action)
+
+            sample = reward + (discountRate * self.getValue(nextState))
+            self.qTable.setValue(stateId, actionId, (1 - alpha)
+                * self.qTable.getValue(stateId, actionId) + (alpha * sample))
+            return None
+
         sample = reward + (discountRate * self.getValue(nextState))
         self.values[state, action] = (1 - alpha) * \
             self.getQValue(state, action) + (alpha * sample)
@@ -178,13 +211,23 @@ class ApproximateQAgent(PacmanQAgent):
     """
 
     def __init__(self, index,
-                 extractor='pacai.core.featureExtractors.IdentityExtractor', **kwargs):
+                 extractor='pacai.core.featureExtractors.IdentityExtractor',
+                 sparseFeatures=False, **kwargs):
         super().__init__(index, **kwargs)
         self.featExtractor = reflection.qualifiedImport(extractor)
 
         # A dictionary which holds the weights.
         self.weights = {}
 
+        # With sparseFeatures set, the weights are instead kept in a
+        # `pacai.agents.learning.features.FeatureWeights` array,
+        # and the features of recent (state, action) pairs are cached as sparse vectors,
+        # since a step asks for the same features several times.
+        self.featureWeights = None
+        if util.parseBool(sparseFeatures):
+            self.featureWeights = FeatureWeights()
+            self.featureCache = LRUCache(FEATURE_CACHE_SIZE)
+
     def getQValue(self, state, action):
         """
         Get the Q-Value for a `pacai.core.gamestate.AbstractGameState`
@@ -195,6 +238,9 @@ class ApproximateQAgent(PacmanQAgent):
         if action is None:
             return 0.0
 
+        if self.featureWeights is not None:
+            return self.featureWeights.dot(self.getSparseFeatures(state, action))
+
         features = self.featExtractor.getFeatures(self, state, action)
 
         # Return q-value for each feature key, set weight to 0 on first pass
@@ -219,6 +265,10 @@ class ApproximateQAgent(PacmanQAgent):
         correction = (reward + (discountRate * self.getValue(nextState))
                       ) - self.getQValue(state, action)
 
+        if self.featureWeights is not None:
+            self.featureWeights.add(self.getSparseFeatures(state, action), alpha * correction)
+            return None
+
         features = self.featExtractor.getFeatures(self, state, action)
 
         # Set weight for each feature key
@@ -228,6 +278,45 @@ class ApproximateQAgent(PacmanQAgent):
 
         return None
 
+    def getSparseFeatures(self, state, action):
+        """
+        Get the (cached) features of a (state, action) pair as a sparse vector.
+        """
+
+        key = (state, action)
+
+        vector = self.featureCache.get(key)
+        if vector is None:
+            features = self.featExtractor.getFeatures(self, state, action)
+            vector = self.featureWeights.toSparse(features)
+            self.featureCache.put(key, vector)
+
+        return vector
+
+    def getWeights(self):
+        """
+        Get the weights as a {feature: weight} dict.
+        """
+
+        if self.featureWeights is not None:
+            return self.featureWeights.getWeights()
+
+        return self.weights
+
+    def setWeights(self, weights):
+        """
+        Replace the weights with a {feature: weight} dict.
+        """
+
+        if self.featureWeights is not None:
+            self.featureWeights = FeatureWeights()
+            for feature, weight in weights.items():
+                self.featureWeights.setWeight(feature, weight)
+            self.featureCache.clear()
+            return
+
+        self.weights = dict(weights)
+
     def final(self, state):
         """
         Called at the end of each game.
@@ -1,6 +1,9 @@
 from cmath import inf
 from pacai.agents.learning.value import ValueEstimationAgent
+from pacai.core.mdp import CompiledMDP
+from pacai.util import util
 
+SWEEP_MODES = ['sync', 'gauss-seidel', 'prioritized']
 
 class ValueIterationAgent(ValueEstimationAgent):
     """
@@ -32,12 +35,37 @@ class ValueIterationAgent(ValueEstimationAgent):
     you should return None.
     """
 
-    def __init__(self, index, mdp, discountRate=0.9, iters=100, **kwargs):
+    def __init__(self, index, mdp, discountRate=0.9, iters=100, compiled=False,
+            sweep='sync', tolerance=None, **kwargs):
         super().__init__(index, **kwargs)
 
         self.mdp = mdp
         self.discountRate = discountRate
-        self.iters = iters
+        self.iters = int(iters)
+
+        # How states are backed up (see SWEEP_MODES):
+        # sync sweeps from the previous sweep's values, gauss-seidel sweeps in place,
+        # and prioritized backs up states by residual (with a budget of iters sweeps of backups).
+        if sweep not in SWEEP_MODES:
+            raise ValueError('Unknown sweep mode: %s.' % (sweep))
+        self.sweep = sweep
+
+        # With a tolerance, stop early once the largest change in a sweep is below it.
+        self.tolerance = None
+        if tolerance is not None:
+            self.tolerance = float(tolerance)
+
+        self.numSweeps = 0
+        self.numBackups = 0
+
+        # With compiled set, the mdp is flattened into a `pacai.core.mdp.CompiledMDP` once
+        # and the sweeps run over its arrays.
+        # The in place and prioritized sweeps only run compiled.
+        self.compiledMDP = None
+        if util.parseBool(compiled) or sweep != 'sync':
+            self.compiledMDP = CompiledMDP(mdp)
+            self._runCompiled()
+            return
 
         # A dictionary which holds the q-values for each state.
         # Each state starts with value 0.0
@@ -46,14 +74,21 @@ class ValueIterationAgent(ValueEstimationAgent):
             self.values[state] = 0.0
 
         # Set the q-value for each state over iters iterations
-        for _ in range(iters):
+        for _ in range(self.iters):
             values = dict(self.values)
+            residual = 0.0
             for state in self.mdp.getStates():
                 bestAction = self.getPolicy(state)
                 if not bestAction:  # terminal state, value stays 0.0
                     continue
                 values[state] = self.getQValue(state, bestAction)
+                residual = max(residual, abs(values[state] - self.values[state]))
+                self.numBackups += 1
             self.values = values
+            self.numSweeps += 1
+
+            if self.tolerance is not None and residual < self.tolerance:
+                break
 
     def getValue(self, state):
         """
@@ -67,6 +102,10 @@ class ValueIterationAgent(ValueEstimationAgent):
         returns the best action according to computed values
         """
 
+        # States outside of the mdp (e.g. walls asked about by a display) use the usual path.
+        if self.compiledMDP is not None and state in self.policy:
+            return self.policy[state]
+
         # return none if so no legal actions remain
         if self.mdp.isTerminal(state):
             return None
@@ -87,6 +126,11 @@ class ValueIterationAgent(ValueEstimationAgent):
         returns the q-value of the (state, action) pair.
         """
 
+        if self.compiledMDP is not None and state in self.policy:
+            stateId = self.compiledMDP.getStateId(state)
+            row = self.compiledMDP.getRow(stateId, action)
+            return self.compiledMDP.getRowValue(row, self.valueList, self.discountRate)
+
         # Q = sum(probabilty(s,a) * (reward(s, a, s') + discountRate * values[s']))
         Q = 0
         for transitionState, probabilty in self.mdp.getTransitionStatesAndProbs(state, action):
@@ -102,3 +146,33 @@ class ValueIterationAgent(ValueEstimationAgent):
         """
 
         return self.getPolicy(state)
+
+    def _runCompiled(self):
+        """
+        Run the iterations over the compiled mdp,
+        and keep the values and policy by state for the usual methods.
+        """
+
+        states = self.compiledMDP.getStates()
+
+        numActive = self.compiledMDP.getNumActiveStates()
+
+        self.valueList = [0.0] * len(states)
+        if self.sweep == 'prioritized':
+            self.numBackups = self.compiledMDP.prioritizedSweep(self.valueList,
+                self.discountRate, tolerance=(self.tolerance or 0.0),
+                maxBackups=(self.iters * numActive))
+        else:
+            inPlace = (self.sweep == 'gauss-seidel')
+            for _ in range(self.iters):
+                self.valueList, residual = self.compiledMDP.sweep(self.valueList,
+                    self.discountRate, inPlace=inPlace)
+                self.numSweeps += 1
+                self.numBackups += numActive
+
+                if self.tolerance is not None and residual < self.tolerance:
+                    break
+
+        self.values = dict(zip(states, self.valueList))
+        self.policy = dict(zip(states,
+            self.compiledMDP.getPolicy(self.valueList, self.discountRate)))
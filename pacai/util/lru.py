@@ -0,0 +1,66 @@
+"""
+A bounded cache container data structure.
+"""
+
+import collections
+
+class LRUCache(object):
+    """
+    A mapping with a maximum size.
+    When full, adding an item evicts the least recently used (read or written) item.
+    """
+
+    def __init__(self, maxSize):
+        if (maxSize <= 0):
+            raise ValueError('An LRU cache needs a positive size, got %d.' % (maxSize))
+
+        self._maxSize = maxSize
+        self._items = collections.OrderedDict()
+
+        self._hits = 0
+        self._misses = 0
+
+    def clear(self):
+        self._items.clear()
+
+    def get(self, key, default = None):
+        """
+        Get the item for the key (marking it as recently used),
+        or the default if the key is not in the cache.
+        """
+
+        if (key not in self._items):
+            self._misses += 1
+            return default
+
+        self._hits += 1
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def getMaxSize(self):
+        return self._maxSize
+
+    def getStats(self):
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'size': len(self._items),
+        }
+
+    def put(self, key, value):
+        """
+        Add (or replace) an item, evicting the least recently used item if the cache is full.
+        """
+
+        if (key in self._items):
+            self._items.move_to_end(key)
+        elif (len(self._items) >= self._maxSize):
+            self._items.popitem(last = False)
+
+        self._items[key] = value
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
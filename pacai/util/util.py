@@ -55,6 +55,16 @@ def nearestPoint(pos):
 
     return (grid_row, grid_col)
 
+def parseBool(value):
+    """
+    Interpret a value (typically a string agent argument from the command line) as a boolean.
+    """
+
+    if (isinstance(value, str)):
+        return value.strip().lower() in ('1', 'true', 't', 'yes', 'y', 'on')
+
+    return bool(value)
+
 def sign(x):
     """
     Returns 1 or -1 depending on the sign of x
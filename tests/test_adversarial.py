@@ -0,0 +1,411 @@
+import copy
+import os
+import random
+import tempfile
+import time
+import unittest
+
+from pacai.agents.ghost.directional import DirectionalGhost
+from pacai.agents.ghost.model import GhostModel
+from pacai.agents.search import adversarial
+from pacai.agents.search import book
+from pacai.agents.search import ordering
+from pacai.agents.search import parallel
+from pacai.agents.search import profiler
+from pacai.bin import book as bookBin
+from pacai.bin import pacman
+from pacai.bin import profile
+from pacai.bin.pacman import PacmanGameState
+from pacai.core import evaluation
+from pacai.core.eval import score
+from pacai.core.layout import getLayout
+
+"""
+Test the adversarial search engine.
+"""
+class AdversarialTest(unittest.TestCase):
+    def test_transposition_table(self):
+        # The table should never change the value of a search.
+        for state in _randomStates('smallClassic', 5):
+            for mode in adversarial.MODES:
+                plain = adversarial.AdversarialSearch(score, mode = mode, tableSize = 0)
+                cached = adversarial.AdversarialSearch(score, mode = mode)
+
+                expected, _ = plain.search(state, 0, 2)
+                self.assertAlmostEqual(expected, cached.search(state, 0, 2)[0])
+
+                # Search again with a warm table.
+                self.assertAlmostEqual(expected, cached.search(state, 0, 2)[0])
+
+    def test_alpha_beta_matches_minimax(self):
+        for state in _randomStates('smallClassic', 5):
+            minimax = adversarial.AdversarialSearch(score, mode = adversarial.MODE_MINIMAX)
+            alphaBeta = adversarial.AdversarialSearch(score, mode = adversarial.MODE_ALPHA_BETA)
+
+            self.assertEqual(minimax.search(state, 0, 3)[0], alphaBeta.search(state, 0, 3)[0])
+
+    def test_move_ordering(self):
+        # Ordering should never change the value of a search, only how much is searched.
+        orderedNodes = 0
+        unorderedNodes = 0
+
+        for state in _randomStates('smallClassic', 5):
+            minimax = adversarial.AdversarialSearch(score, mode = adversarial.MODE_MINIMAX)
+            expected, _ = minimax.search(state, 0, 3)
+
+            for heuristics in ([], ordering.HEURISTICS):
+                engine = adversarial.AdversarialSearch(score, tableSize = 0,
+                        moveOrdering = ordering.MoveOrdering(heuristics))
+
+                for depth in range(1, 4):
+                    value, _ = engine.search(state, 0, depth)
+                self.assertEqual(expected, value)
+
+                if (len(heuristics) == 0):
+                    unorderedNodes += engine.getStats()['nodes']
+                else:
+                    orderedNodes += engine.getStats()['nodes']
+
+        self.assertLessEqual(orderedNodes, unorderedNodes)
+
+    def test_killers_and_history(self):
+        state = _randomStates('smallClassic', 1)[0]
+        actions = state.getLegalActions(0)
+        moveOrdering = ordering.MoveOrdering([ordering.HEURISTIC_KILLERS])
+
+        moveOrdering.recordCutoff(state, 0, actions[-1], 2, 1)
+        self.assertEqual(actions[-1], moveOrdering.order(state, 0, actions, 2, None, True,
+                score)[0][0])
+
+        # Killers are per ply.
+        self.assertEqual(actions[0], moveOrdering.order(state, 0, actions, 3, None, True,
+                score)[0][0])
+
+        moveOrdering = ordering.MoveOrdering([ordering.HEURISTIC_HISTORY])
+        moveOrdering.recordCutoff(state, 0, actions[-1], 2, 1)
+        moveOrdering.recordCutoff(state, 0, actions[-2], 2, 3)
+        ordered = [action for (action, successor) in moveOrdering.order(state, 0, actions, 5,
+                None, True, score)]
+        self.assertEqual([actions[-2], actions[-1]], ordered[:2])
+
+    def test_parallel(self):
+        states = _randomStates('smallClassic', 3)
+
+        for mode in adversarial.MODES:
+            engine = parallel.ParallelSearch(score, numWorkers = 2, mode = mode)
+
+            try:
+                for state in states:
+                    serial = adversarial.AdversarialSearch(score, mode = mode, tableSize = 0)
+                    expected, _ = serial.search(state, 0, 2)
+
+                    value, action = engine.search(state, 0, 2)
+                    self.assertEqual(expected, value)
+                    self.assertIn(action, state.getLegalActions(0))
+
+                    value, action, depth = engine.iterativeSearch(state, 0, maxDepth = 2,
+                            deadline = time.time() + 10)
+                    self.assertEqual((expected, 2), (value, depth))
+            finally:
+                engine.close()
+
+    def test_parallel_ghost_model(self):
+        # The parallel engine (and its workers) follow the ghost model and reduce chance nodes.
+        evalFn = evaluation.Evaluator(evaluation.getDefaultFeatures())
+        options = {
+            'mode': adversarial.MODE_EXPECTIMAX,
+            'chanceMode': adversarial.CHANCE_TOP,
+            'fullChancePlies': 1,
+        }
+
+        serial = adversarial.AdversarialSearch(evalFn, tableSize = 0,
+                ghostModel = GhostModel('DirectionalGhost'), **options)
+        uniform = adversarial.AdversarialSearch(evalFn, tableSize = 0, **options)
+
+        agent = parallel.ParallelSearchAgent(0, workers = 2, ghostModel = 'DirectionalGhost',
+                **options)
+        engine = agent.createSearchEngine(evalFn)
+
+        numDifferent = 0
+        try:
+            for state in _randomStates('smallClassic', 3):
+                expected, _ = serial.search(state, 0, 2)
+                value, _ = engine.search(state, 0, 2)
+                self.assertAlmostEqual(expected, value)
+
+                if (expected != uniform.search(state, 0, 2)[0]):
+                    numDifferent += 1
+        finally:
+            engine.close()
+
+        # The ghost model has to matter for this test to mean anything.
+        self.assertLess(0, numDifferent)
+
+    def test_parallel_keeps_ordering(self):
+        # Root moves are searched below the real root:
+        # the move ordering is only reset for a new root, and cutoffs are recorded a ply down.
+        states = _randomStates('smallClassic', 2)
+        engine = parallel.ParallelSearch(score, numWorkers = 2)
+
+        moveOrdering = engine.getMoveOrdering()
+        newRoots = []
+        cutoffPlies = []
+
+        newRoot = moveOrdering.newRoot
+        recordCutoff = moveOrdering.recordCutoff
+        moveOrdering.newRoot = lambda: (newRoots.append(True), newRoot())
+
+        def countingRecordCutoff(state, agentIndex, action, ply, depth):
+            cutoffPlies.append(ply)
+            recordCutoff(state, agentIndex, action, ply, depth)
+
+        moveOrdering.recordCutoff = countingRecordCutoff
+
+        try:
+            for state in states:
+                engine.iterativeSearch(state, 0, maxDepth = 3, deadline = time.time() + 10)
+
+                # Every root move (not just the eldest) is searched below the same root.
+                for action in state.getLegalActions(0):
+                    engine.searchSubtree(state, state.generateSuccessor(0, action), 1, 2,
+                            [0], 0)
+        finally:
+            engine.close()
+
+        self.assertEqual(len(states), len(newRoots))
+        self.assertLess(0, len(cutoffPlies))
+        self.assertLessEqual(1, min(cutoffPlies))
+
+    def test_ghost_model(self):
+        model = GhostModel('DirectionalGhost')
+
+        for state in _randomStates('mediumClassic', 10):
+            for agentIndex in range(1, state.getNumAgents()):
+                expected = DirectionalGhost(agentIndex).getDistribution(state)
+                expected = {action: p for (action, p) in expected.items() if p > 0}
+
+                for i in range(2):
+                    distribution = model.getDistribution(state, agentIndex)
+                    self.assertEqual(sorted(expected.keys()),
+                            sorted([action for (action, p) in distribution]))
+
+                    for (action, p) in distribution:
+                        self.assertAlmostEqual(expected[action], p)
+
+        self.assertGreater(model.getStats()['hits'], 0)
+
+    def test_reduced_chance_nodes(self):
+        model = GhostModel('DirectionalGhost')
+
+        for state in _randomStates('mediumClassic', 3):
+            full = adversarial.AdversarialSearch(score, mode = adversarial.MODE_EXPECTIMAX,
+                    ghostModel = model)
+            expected, _ = full.search(state, 0, 2)
+            self.assertEqual(0.0, full.getErrorBound())
+
+            stats = full.getStats()
+            valueRange = stats['maxLeafValue'] - stats['minLeafValue']
+
+            for chanceMode in [adversarial.CHANCE_TOP, adversarial.CHANCE_SAMPLE]:
+                reduced = adversarial.AdversarialSearch(score,
+                        mode = adversarial.MODE_EXPECTIMAX, ghostModel = model,
+                        chanceMode = chanceMode, chanceOutcomes = 1, valueRange = valueRange,
+                        seed = 4)
+                value, _ = reduced.search(state, 0, 2)
+
+                self.assertLessEqual(abs(expected - value), reduced.getErrorBound() + 1e-9)
+                self.assertLess(reduced.getStats()['nodes'], full.getStats()['nodes'])
+
+    def test_small_table(self):
+        table = adversarial.TranspositionTable(1)
+
+        table.newSearch()
+        table.store(1, 0, 3, 10, adversarial.EXACT, 'North')
+        table.store(2, 0, 1, 20, adversarial.EXACT, 'South')
+
+        # The deeper entry is kept within a search.
+        self.assertEqual((3, 10, adversarial.EXACT, 'North', 0.0), table.probe(1, 0))
+        self.assertIsNone(table.probe(2, 0))
+
+        # But it can be replaced in a later search.
+        table.newSearch()
+        table.store(2, 0, 1, 20, adversarial.EXACT, 'South')
+        self.assertEqual((1, 20, adversarial.EXACT, 'South', 0.0), table.probe(2, 0))
+
+    def test_table_hash_collision(self):
+        # Game state hashes collide (hash(-1) == hash(-2)), and a probe must not mix them up.
+        state = PacmanGameState(getLayout('smallClassic'))
+        first = copy.copy(state)
+        first.setScore(-1)
+        second = copy.copy(state)
+        second.setScore(-2)
+        self.assertEqual(hash(first), hash(second))
+
+        table = adversarial.TranspositionTable()
+        table.store(first, 0, 3, 10, adversarial.EXACT, 'North')
+        self.assertIsNone(table.probe(second, 0))
+        self.assertEqual((3, 10, adversarial.EXACT, 'North', 0.0), table.probe(first, 0))
+
+    def test_iterative_deepening(self):
+        # Without a deadline, the deepest iteration should match a plain search of that depth.
+        for state in _randomStates('smallClassic', 3):
+            plain = adversarial.AdversarialSearch(score, tableSize = 0)
+            iterative = adversarial.AdversarialSearch(score)
+
+            expected, _ = plain.search(state, 0, 3)
+            value, action, depth = iterative.iterativeSearch(state, 0, maxDepth = 3)
+
+            self.assertEqual(3, depth)
+            self.assertEqual(expected, value)
+            self.assertIn(action, state.getLegalActions(0))
+
+            line = iterative.getPrincipalVariation(state, 0)
+            self.assertEqual((0, action), line[0])
+
+    def test_iterative_deadline(self):
+        state = _randomStates('mediumClassic', 1)[0]
+        engine = adversarial.AdversarialSearch(score)
+
+        # A deadline that already passed still gets the first iteration.
+        value, action, depth = engine.iterativeSearch(state, 0, deadline = time.time() - 1)
+        self.assertEqual(1, depth)
+        self.assertIn(action, state.getLegalActions(0))
+
+        startTime = time.time()
+        value, action, depth = engine.iterativeSearch(state, 0, deadline = startTime + 0.25)
+        self.assertLess(time.time() - startTime, 1.0)
+        self.assertGreater(depth, 0)
+        self.assertIn(action, state.getLegalActions(0))
+
+    def test_agent(self):
+        pacman.main(['--null-graphics', '-l', 'smallClassic', '-p', 'AdversarialSearchAgent',
+                '--agent-args', 'depth=2,mode=expectimax'])
+
+    def test_iterative_agent(self):
+        pacman.main(['--null-graphics', '-l', 'smallClassic', '-p', 'AdversarialSearchAgent',
+                '--agent-args', 'iterative,moveTime=0.01', '-n', '1'])
+
+    def test_move_time(self):
+        # The rules' (30 second) timeout only caps the default move time.
+        rules = pacman.ClassicGameRules(timeout = 30)
+        self.assertEqual(adversarial.DEFAULT_MOVE_TIME, adversarial.getMoveTime(0, None, rules))
+        self.assertEqual(0.5, adversarial.getMoveTime(0, 0.5, rules))
+
+        shortRules = pacman.ClassicGameRules(timeout = 0.5)
+        self.assertLess(adversarial.getMoveTime(0, None, shortRules), 0.5)
+
+        agent = adversarial.AdversarialSearchAgent(0, iterative = True)
+        agent.registerRules(rules)
+        self.assertEqual(adversarial.DEFAULT_MOVE_TIME, agent.getMoveTime())
+
+    def test_parallel_agent(self):
+        pacman.main(['--null-graphics', '-l', 'smallClassic', '-p', 'ParallelSearchAgent',
+                '--agent-args', 'workers=2,depth=1', '-n', '1'])
+
+    def test_opening_book(self):
+        with tempfile.TemporaryDirectory() as bookDir:
+            openingBook = bookBin.main(['-l', 'testClassic', '-a', 'depth=2', '-m', '2', '-q',
+                    '--book-dir', bookDir])[0]
+            self.assertGreater(len(openingBook), 1)
+
+            state = PacmanGameState(getLayout('testClassic'))
+            searcher = adversarial.AdversarialSearchAgent(0, depth = 2)
+            value, action, depth = searcher.searchAction(state)
+            self.assertEqual((action, 2, value), openingBook.lookup(state, 0))
+
+            # Agents only use books with their settings (and depth).
+            for (args, hits) in [({'depth': 2}, 1), ({'depth': 3}, 0),
+                    ({'depth': 2, 'mode': adversarial.MODE_EXPECTIMAX}, 0)]:
+                agent = adversarial.AdversarialSearchAgent(0, bookDir = bookDir, **args)
+                agent.registerInitialState(state)
+
+                self.assertIn(agent.getAction(state), state.getLegalActions(0))
+                self.assertEqual(hits, agent.getBookHits())
+
+            # Every option that changes search values is in the settings.
+            expectimax = {'mode': adversarial.MODE_EXPECTIMAX}
+            for (baseArgs, args) in [({}, {'depth': 3}), ({}, {'iterative': True}),
+                    ({}, expectimax), ({'iterative': True}, {'moveTime': 0.5}),
+                    ({'iterative': True}, {'maxDepth': 4}),
+                    (expectimax, {'chanceMode': adversarial.CHANCE_SAMPLE}),
+                    (expectimax, {'chanceOutcomes': 1}), (expectimax, {'fullChancePlies': 1}),
+                    (expectimax, {'seed': 1})]:
+                base = adversarial.AdversarialSearchAgent(0, **baseArgs)
+                other = adversarial.AdversarialSearchAgent(0, **baseArgs, **args)
+                self.assertNotEqual(base.getBookSettings(), other.getBookSettings())
+
+            # Keys are stable digests, not Python hashes.
+            self.assertEqual(book.positionKey(state, 0),
+                    book.positionKey(PacmanGameState(getLayout('testClassic')), 0))
+            self.assertNotEqual(book.positionKey(state, 0), book.positionKey(state, 1))
+
+            # Food that shares a hash still gets its own key.
+            state = PacmanGameState(getLayout('originalClassic'))
+            first = state._initSuccessor()
+            first.eatFood(1, 18)
+            second = state._initSuccessor()
+            second.eatFood(3, 25)
+
+            self.assertEqual(first.getFoodHash(), second.getFoodHash())
+            self.assertNotEqual(book.positionKey(first, 0), book.positionKey(second, 0))
+
+    def test_profiler(self):
+        state = PacmanGameState(getLayout('smallClassic'))
+        searchProfiler = profiler.SearchProfiler()
+        engine = adversarial.AdversarialSearch(profiler.ProfiledEvaluation(searchProfiler, score),
+                mode = adversarial.MODE_MINIMAX, tableSize = 0)
+
+        engine.search(searchProfiler.startMove(state), 0, 1)
+        result = searchProfiler.finishMove()
+
+        # Every leaf of a full minimax search is a generated successor (at the deepest ply).
+        self.assertEqual(engine.getStats()['evaluations'], result['evaluations'])
+        self.assertEqual(result['evaluations'], result['nodesPerPly'][-1])
+        self.assertEqual(state.getNumAgents(), result['maxPly'])
+        self.assertEqual(len(state.getLegalActions(0)), result['nodesPerPly'][0])
+
+        self.assertAlmostEqual(3.0, profiler.effectiveBranchingFactor(3 + 9, 2), places = 4)
+        self.assertEqual(0.0, profiler.effectiveBranchingFactor(0, 0))
+
+    def test_profiling_agent(self):
+        with tempfile.TemporaryDirectory() as profileDir:
+            pacman.main(['--null-graphics', '-l', 'smallClassic', '-p', 'ProfilingAgent',
+                    '--agent-args', 'depth=1,profileDir=%s' % (profileDir), '-n', '1'])
+
+            profiles = profile.loadProfiles(profileDir)
+            self.assertGreater(len(profiles), 0)
+            self.assertTrue(all(['tableHitRate' in moveProfile for moveProfile in profiles]))
+
+            summary = profile.main([profileDir, '-q'])
+            self.assertEqual(len(profiles), summary['moves'])
+            self.assertGreater(summary['successors'], 0)
+
+        with tempfile.TemporaryDirectory() as parentDir:
+            profileDir = os.path.join(parentDir, 'profile')
+            pacman.main(['--null-graphics', '-l', 'smallClassic', '-p', 'ProfilingAgent',
+                    '--agent-args', 'depth=1,enabled=false,profileDir=%s' % (profileDir),
+                    '-n', '1'])
+
+            self.assertFalse(os.path.exists(profileDir))
+
+def _randomStates(layoutName, count, seed = 140):
+    rng = random.Random(seed)
+    state = PacmanGameState(getLayout(layoutName))
+    states = []
+
+    while (len(states) < count):
+        for agentIndex in range(state.getNumAgents()):
+            if (state.isOver()):
+                state = PacmanGameState(getLayout(layoutName))
+                break
+
+            action = rng.choice(state.getLegalActions(agentIndex))
+            state = state.generateSuccessor(agentIndex, action)
+
+        if (not state.isOver()):
+            states.append(state)
+
+    return states
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import os
+import random
+import tempfile
+import time
+import unittest
+
+from pacai.agents.ghost.directional import DirectionalGhost
+from pacai.agents.ghost.random import RandomGhost
+from pacai.agents.search.adversarial import AdversarialSearchAgent
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.endgame import EndgameTable
+from pacai.core.layout import getLayout
+
+"""
+Test the endgame tables.
+"""
+class EndgameTest(unittest.TestCase):
+    def test_won_endgames(self):
+        # Following the table should win against any ghosts, within the table's plies.
+        rng = random.Random(140)
+        numWon = 0
+
+        for layoutName in ['testClassic', 'trappedClassic']:
+            for game in range(60):
+                state = _randomEndgame(layoutName, 2, rng)
+                if (state is None):
+                    continue
+
+                table = EndgameTable(state.getWalls(), state.getFoodList(), state.getNumGhosts(),
+                        cacheDir = None)
+
+                result = table.getAction(state)
+                if (result is None):
+                    continue
+
+                plies = result[1]
+                value = table.getValue(state)
+                self.assertEqual(plies, table.getPlies(state))
+
+                ghostClass = [RandomGhost, DirectionalGhost][game % 2]
+                ghosts = [ghostClass(index) for index in range(state.getNumAgents())]
+
+                moves = 0
+                agentIndex = 0
+                while (not state.isOver()):
+                    if (agentIndex == 0):
+                        action = table.getAction(state)[0]
+                    else:
+                        action = ghosts[agentIndex].getAction(state)
+
+                    state = state.generateSuccessor(agentIndex, action)
+                    agentIndex = (agentIndex + 1) % state.getNumAgents()
+                    moves += 1
+
+                self.assertTrue(state.isWin())
+                self.assertLessEqual(moves, plies)
+                self.assertGreaterEqual(state.getScore(), value)
+                numWon += 1
+
+        self.assertGreater(numWon, 0)
+
+    def test_parallel_and_cache(self):
+        state = PacmanGameState(getLayout('trappedClassic'))
+        food = state.getFoodList()[:3]
+
+        serial = EndgameTable(state.getWalls(), food, state.getNumGhosts(), cacheDir = None)
+
+        with tempfile.TemporaryDirectory() as cacheDir:
+            parallel = EndgameTable(state.getWalls(), food, state.getNumGhosts(),
+                    cacheDir = cacheDir, numWorkers = 2)
+            self.assertEqual(1, len(os.listdir(cacheDir)))
+
+            cached = EndgameTable(state.getWalls(), food, state.getNumGhosts(),
+                    cacheDir = cacheDir)
+
+        self.assertEqual(serial.getLayers(), parallel.getLayers())
+        self.assertEqual(serial.getLayers(), cached.getLayers())
+
+        # The table does not cover states with other food (or capsules).
+        self.assertFalse(serial.covers(state))
+
+        with self.assertRaises(ValueError):
+            EndgameTable(state.getWalls(), food, 3, cacheDir = None)
+
+    def test_agent(self):
+        rng = random.Random(1234)
+        numMoves = 0
+
+        with tempfile.TemporaryDirectory() as cacheDir:
+            for game in range(20):
+                state = _randomEndgame('testClassic', 3, rng)
+                if (state is None):
+                    continue
+
+                agent = AdversarialSearchAgent(0, depth = 1, endgameFood = 3,
+                        endgameDir = cacheDir)
+                agent.registerInitialState(state)
+
+                result = EndgameTable(state.getWalls(), state.getFoodList(),
+                        state.getNumGhosts(), cacheDir = cacheDir).getAction(state)
+
+                action = agent.getAction(state)
+                if (result is not None):
+                    self.assertEqual(result[0], action)
+                    numMoves += 1
+
+                self.assertEqual(int(result is not None), agent.getEndgameMoves())
+
+        self.assertGreater(numMoves, 0)
+
+    def test_agent_background_build(self):
+        # Missing tables are built in the background, and the agent searches until then.
+        rng = random.Random(1234)
+
+        state = None
+        result = None
+        while (result is None):
+            state = _randomEndgame('testClassic', 3, rng)
+            if (state is not None):
+                result = EndgameTable(state.getWalls(), state.getFoodList(),
+                        state.getNumGhosts(), cacheDir = None).getAction(state)
+
+        with tempfile.TemporaryDirectory() as cacheDir:
+            agent = AdversarialSearchAgent(0, depth = 1, endgameFood = 3, endgameDir = cacheDir)
+            agent.registerInitialState(state)
+
+            self.assertIn(agent.getAction(state), state.getLegalActions(0))
+            self.assertEqual(0, agent.getEndgameMoves())
+            self.assertIsNone(agent.getEndgameTable())
+
+            deadline = time.time() + 60
+            while (agent.getEndgameMoves() == 0 and time.time() < deadline):
+                time.sleep(0.05)
+                action = agent.getAction(state)
+
+            self.assertEqual(1, agent.getEndgameMoves())
+            self.assertEqual(result[0], action)
+
+def _randomEndgame(layoutName, maxFood, rng):
+    """
+    Play (mostly) random moves until there is little food left and pacman is to move.
+    Returns None if the game ended first.
+    """
+
+    state = PacmanGameState(getLayout(layoutName))
+    agentIndex = 0
+
+    while (agentIndex != 0 or state.getNumFood() > maxFood or state.getNumCapsules() > 0
+            or any([ghost.isScared() for ghost in state.getGhostStates()])):
+        if (state.isOver()):
+            return None
+
+        actions = state.getLegalActions(agentIndex)
+        action = rng.choice(actions)
+
+        # Have pacman favor eating, so games get to the endgame.
+        if (agentIndex == 0):
+            for candidate in actions:
+                if (state.generateSuccessor(0, candidate).getNumFood() < state.getNumFood()):
+                    action = candidate
+
+        state = state.generateSuccessor(agentIndex, action)
+        agentIndex = (agentIndex + 1) % state.getNumAgents()
+
+    if (state.isOver()):
+        return None
+
+    return state
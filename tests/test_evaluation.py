@@ -0,0 +1,96 @@
+import copy
+import random
+import unittest
+
+from pacai.bin.pacman import PacmanGameState
+from pacai.core import evaluation
+from pacai.core.distanceCalculator import Distancer
+from pacai.core.layout import getLayout
+
+"""
+Test the cached evaluation framework.
+"""
+class EvaluationTest(unittest.TestCase):
+    def test_cached_values(self):
+        # Cached evaluations should match computing every feature from scratch.
+        features = evaluation.getDefaultFeatures()
+        evaluator = evaluation.Evaluator(features, cacheSize = 16)
+
+        for state in _randomStates('mediumClassic', 50):
+            context = evaluation.EvaluationContext(state.getWalls(), len(features))
+            expected = sum([feature.getWeight() * feature.compute(state, context)
+                    for feature in features])
+
+            self.assertAlmostEqual(expected, evaluator(state))
+            self.assertAlmostEqual(expected, evaluator(state))
+
+    def test_hash_collisions(self):
+        # Food hashes collide for dots 61 cells apart, and state hashes for scores -1 and -2.
+        state = PacmanGameState(getLayout('originalClassic'))
+
+        first = state._initSuccessor()
+        first.eatFood(1, 18)
+        second = state._initSuccessor()
+        second.eatFood(3, 25)
+        self.assertEqual(first.getFoodHash(), second.getFoodHash())
+        self.assertNotEqual(first.getFoodBitmask(), second.getFoodBitmask())
+
+        evaluator = evaluation.Evaluator(evaluation.getDefaultFeatures())
+        context = evaluator.getContext(state)
+        self.assertEqual(first.getFoodList(), context.getFoodList(first))
+        self.assertEqual(second.getFoodList(), context.getFoodList(second))
+
+        scores = []
+        for score in [-1, -2]:
+            scored = copy.copy(state)
+            scored.setScore(score)
+            scores.append(scored)
+
+        self.assertEqual(hash(scores[0]), hash(scores[1]))
+        self.assertNotEqual(evaluator(scores[0]), evaluator(scores[1]))
+
+    def test_shared_features(self):
+        evaluator = evaluation.Evaluator([evaluation.ClosestFoodFeature()])
+        state = PacmanGameState(getLayout('mediumClassic'))
+
+        # A ghost moving does not change the distance to food.
+        evaluator(state)
+        evaluator(state.generateSuccessor(1, state.getLegalActions(1)[0]))
+
+        stats = evaluator.getContext(state).getFeatureCache(0).getStats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+
+    def test_distance_rows(self):
+        layout = getLayout('mediumClassic')
+        context = evaluation.EvaluationContext(layout.walls, 0)
+
+        distancer = Distancer(layout)
+        distancer.getMazeDistances()
+
+        positions = layout.walls.asList(False)
+        rng = random.Random(4)
+
+        for source in rng.sample(positions, 5):
+            targets = rng.sample(positions, 20)
+            expected = [distancer.getDistance(source, target) for target in targets]
+            self.assertEqual(expected, context.getDistances(source, targets))
+
+def _randomStates(layoutName, count, seed = 140):
+    rng = random.Random(seed)
+    state = PacmanGameState(getLayout(layoutName))
+    states = []
+
+    while (len(states) < count):
+        agentIndex = len(states) % state.getNumAgents()
+        if (state.isOver()):
+            state = PacmanGameState(getLayout(layoutName))
+            continue
+
+        state = state.generateSuccessor(agentIndex, rng.choice(state.getLegalActions(agentIndex)))
+        states.append(state)
+
+    return states
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,331 @@
+import json
+import os
+import pickle
+import random
+import tempfile
+import unittest
+
+from pacai.agents.base import BaseAgent
+from pacai.agents.learning.features import FeatureWeights
+from pacai.agents.learning.qtable import QTable
+from pacai.agents.learning.replay import ReplayBuffer
+from pacai.agents.learning.weights import loadWeights
+from pacai.agents.learning.weights import saveWeights
+from pacai.bin import gridworld
+from pacai.bin import pacman
+from pacai.bin import train
+from pacai.bin.pacman import PacmanGameState
+from pacai.core import featureExtractors
+from pacai.core.featureExtractors import FastSimpleExtractor
+from pacai.core.featureExtractors import SimpleExtractor
+from pacai.core.layout import DEFAULT_LAYOUT_DIR
+from pacai.core.layout import getLayout
+from pacai.core.search import multigoal
+from pacai.student.qlearningAgents import QLearningAgent
+
+CLASSIC_LAYOUTS = sorted([os.path.splitext(name)[0] for name in os.listdir(DEFAULT_LAYOUT_DIR)
+        if name.endswith('Classic.lay')])
+
+MAX_PLIES = 400
+
+"""
+Test the learning agents.
+"""
+class LearningTest(unittest.TestCase):
+    def test_qtable(self):
+        table = QTable(width = 2)
+
+        stateId = table.getStateId('a')
+        self.assertEqual(stateId, table.getStateId('a'))
+        self.assertNotEqual(stateId, table.getStateId('b'))
+        self.assertEqual(2, len(table))
+
+        table.setValue(stateId, table.getActionId('north'), 1.0)
+        table.setValue(stateId, table.getActionId('south'), 3.0)
+
+        # Widen the table.
+        self.assertEqual((3.0, 'south'), table.getBest(stateId, ['east', 'north', 'south']))
+        self.assertLess(2, table.getWidth())
+        self.assertEqual(1.0, table.getValue(stateId, table.getActionId('north')))
+        self.assertEqual(0.0, table.getValue(table.getStateId('b'), table.getActionId('north')))
+
+        # Ties go to the first action.
+        self.assertEqual((0.0, 'west'), table.getBest(table.getStateId('b'), ['west', 'north']))
+        self.assertEqual((0.0, None), table.getBest(stateId, []))
+
+    def test_array_table_parity(self):
+        # Learning with either table makes the same decisions and values.
+        mdp = gridworld._getGridWorld('bridgegrid')
+        mdp.setNoise(0.2)
+
+        agents = []
+        for arrayTable in [False, True]:
+            random.seed(140)
+            env = gridworld.GridworldEnvironment(mdp)
+            agent = QLearningAgent(0, actionFn = mdp.getPossibleActions, epsilon = 0.5,
+                    alpha = 0.5, gamma = 0.9, arrayTable = arrayTable)
+
+            for episode in range(50):
+                gridworld.runEpisode(agent, env, 0.9, agent.getAction, lambda state: None,
+                        lambda message: None, lambda: None, episode)
+
+            agents.append(agent)
+
+        expected, agent = agents
+        for state in mdp.getStates():
+            self.assertEqual(expected.getPolicy(state), agent.getPolicy(state))
+            self.assertEqual(expected.getValue(state), agent.getValue(state))
+
+            for action in mdp.getPossibleActions(state):
+                self.assertEqual(expected.getQValue(state, action),
+                        agent.getQValue(state, action))
+
+        scores = []
+        for agentArgs in ['arrayTable=false', 'arrayTable=true']:
+            games = pacman.main(['-p', 'PacmanQAgent', '-l', 'smallGrid', '--num-training', '20',
+                    '-n', '22', '--seed', '140', '--null-graphics', '-q',
+                    '--agent-args', agentArgs])
+            scores.append([game.state.getScore() for game in games])
+
+        self.assertEqual(scores[0], scores[1])
+
+    def test_replay_buffer(self):
+        random.seed(140)
+
+        buffer = ReplayBuffer(3, prioritized = True)
+        for i in range(5):
+            buffer.add('s%d' % (i), 'north', 's%d' % (i + 1), float(i), i == 4)
+
+        # The oldest transitions (and the states only they mention) are gone.
+        self.assertEqual(3, len(buffer))
+        self.assertEqual(4, buffer.getNumStates())
+        self.assertEqual(['s3', 's4', 's5'],
+                sorted([buffer.getTransition(index)[2] for index in range(3)]))
+
+        self.assertEqual(('s4', 'north', 's5', 4.0, True), buffer.getTransition(1))
+
+        # Sampling follows the priorities.
+        for index in range(3):
+            buffer.setPriority(index, 0.0)
+        buffer.setPriority(1, 10.0)
+
+        indexes = buffer.sample(1000)
+        self.assertGreater(indexes.count(1), 900)
+        self.assertTrue(all([0 <= index < 3 for index in indexes]))
+
+        weights = buffer.getImportanceWeights([0, 1])
+        self.assertEqual(1.0, weights[0])
+        self.assertLess(weights[1], 1.0)
+
+    def test_replay(self):
+        # By default, a minibatch is replayed every minibatch size transitions.
+        for (agentArgs, replayEvery) in [('replaySize=1000,replayBatch=4', 4),
+                ('replaySize=1000,replayBatch=4,replayEvery=2,prioritizedReplay=true', 2)]:
+            games = pacman.main(['-p', 'PacmanQAgent', '-l', 'smallGrid', '--num-training', '10',
+                    '-n', '11', '--seed', '140', '--null-graphics', '-q',
+                    '--agent-args', agentArgs])
+
+            agent = games[0].agents[0]
+            self.assertEqual(replayEvery, agent.replayEvery)
+            self.assertLess(0, len(agent.replayBuffer))
+            self.assertNotEqual(set([0.0]), set(agent.values.values()))
+
+    def test_sparse_feature_parity(self):
+        # Sparse (cached) features learn exactly the same weights as feature dicts.
+        weights = []
+        for sparseFeatures in ['false', 'true']:
+            agentArgs = 'extractor=pacai.core.featureExtractors.SimpleExtractor,sparseFeatures='
+            games = pacman.main(['-p', 'ApproximateQAgent', '-l', 'mediumGrid',
+                    '--num-training', '10', '-n', '11', '--seed', '140', '--null-graphics', '-q',
+                    '--agent-args', agentArgs + sparseFeatures])
+            weights.append(games[0].agents[0].getWeights())
+
+        self.assertEqual(weights[0], weights[1])
+        self.assertNotEqual(0.0, weights[1]['closest-food'])
+
+    def test_feature_weights(self):
+        weights = FeatureWeights()
+
+        vector = weights.toSparse({'a': 1.0, 'b': 2.0})
+        self.assertEqual(0.0, weights.dot(vector))
+
+        weights.add(vector, 0.5)
+        self.assertEqual({'a': 0.5, 'b': 1.0}, weights.getWeights())
+        self.assertEqual(2.5, weights.dot(vector))
+        self.assertEqual(1.0, weights.dot(weights.toSparse({'b': 1.0, 'c': 3.0})))
+
+        self.assertEqual(3, len(weights))
+        self.assertEqual(0.0, weights.getWeight('d'))
+
+    def test_fast_simple_extractor(self):
+        # Features match on random playouts (including scared, half speed, ghosts).
+        rng = random.Random(140)
+        numScared = 0
+
+        for layoutName in CLASSIC_LAYOUTS:
+            for game in range(3):
+                state = PacmanGameState(getLayout(layoutName))
+                agentIndex = 0
+
+                for ply in range(MAX_PLIES):
+                    if (state.isOver()):
+                        break
+
+                    if (agentIndex == 0):
+                        for action in state.getLegalActions(0):
+                            self.assertEqual(SimpleExtractor().getFeatures(state, action),
+                                    FastSimpleExtractor().getFeatures(state, action))
+
+                        if (any([ghost.isScared() for ghost in state.getGhostStates()])):
+                            numScared += 1
+
+                    action = rng.choice(state.getLegalActions(agentIndex))
+                    state = state.generateSuccessor(agentIndex, action)
+                    agentIndex = (agentIndex + 1) % state.getNumAgents()
+
+        self.assertGreater(numScared, 0)
+
+    def test_fast_simple_extractor_food_keys(self):
+        # Food sets that share a hash still get their own distances.
+        state = PacmanGameState(getLayout('originalClassic'))
+
+        first = state._initSuccessor()
+        first.eatFood(1, 18)
+        second = state._initSuccessor()
+        second.eatFood(3, 25)
+        self.assertEqual(first.getFoodHash(), second.getFoodHash())
+
+        walls = state.getWalls()
+        table = featureExtractors._getWallsTable(walls)
+
+        for foodState in [first, second, first]:
+            for position in [(1, 18), (3, 25)]:
+                expected = multigoal.nearestTargetDistance(walls, position,
+                        foodState.getFoodList())
+                self.assertEqual(expected, table.getFoodDistance(foodState, position))
+
+    def test_train(self):
+        with tempfile.TemporaryDirectory() as tempDir:
+            logPath = os.path.join(tempDir, 'train.jsonl')
+            checkpointPath = os.path.join(tempDir, 'q.ckpt')
+
+            args = ['-n', '50', '--log', logPath, '--log-every', '20',
+                    '--checkpoint', checkpointPath, '--seed', '140', '-q']
+
+            records = train.main(args + ['--agent-args', 'arrayTable=true'])
+            self.assertEqual([20, 40, 50], [record['episode'] for record in records])
+
+            with open(logPath, 'r') as file:
+                self.assertEqual(records, [json.loads(line) for line in file])
+
+            # Resume in a fresh agent, with the same values.
+            agent = BaseAgent.loadAgent('PacmanQAgent', 0, {'arrayTable': 'true'})
+            train.loadCheckpoint(agent, checkpointPath)
+            self.assertEqual(50, agent.episodesSoFar)
+
+            state = PacmanGameState(getLayout('smallGrid'))
+            numStates = len(agent.qTable)
+            agent.qTable.getStateId(state)
+            self.assertEqual(numStates, len(agent.qTable))
+            self.assertNotEqual(0.0, agent.getValue(state))
+
+            records = train.main(args + ['--resume'])
+            self.assertEqual(100, records[-1]['episode'])
+
+    def test_pickled_state(self):
+        # A pickled state (e.g. a key of a checkpointed table) matches a fresh one.
+        state = PacmanGameState(getLayout('smallGrid'))
+        state = state.generateSuccessor(0, state.getLegalActions(0)[0])
+        hash(state)
+
+        loaded = pickle.loads(pickle.dumps(state))
+        self.assertEqual(state, loaded)
+        self.assertEqual(hash(state), hash(loaded))
+        self.assertEqual({state: 1}.get(loaded), 1)
+
+    def test_train_parallel(self):
+        agentArgs = {'extractor': 'pacai.core.featureExtractors.SimpleExtractor'}
+
+        # The learned weights only depend on the seed, not on the number of processes.
+        results = []
+        for numWorkers in [1, 2]:
+            results.append(train.trainParallel('smallGrid', 'ApproximateQAgent', agentArgs, 25,
+                    numActors = 2, numWorkers = numWorkers, syncEpisodes = 5, seed = 140,
+                    logEvery = 20))
+
+        (serial, serialRecords), (parallel, parallelRecords) = results
+        self.assertEqual(serial.getWeights(), parallel.getWeights())
+        self.assertNotEqual({}, parallel.getWeights())
+
+        # Rounds are 10 episodes, progress is only logged at the rounds that reach 20 (and the end).
+        self.assertEqual([20, 25], [record['episode'] for record in parallelRecords])
+        self.assertEqual([record['averageScore'] for record in serialRecords],
+                [record['averageScore'] for record in parallelRecords])
+
+        with self.assertRaises(ValueError):
+            train.trainParallel('smallGrid', 'PacmanQAgent', {}, 10)
+
+        records = train.main(['-p', 'ApproximateQAgent', '-n', '20', '--actors', '2',
+                '--agent-args', 'extractor=pacai.core.featureExtractors.SimpleExtractor',
+                '--seed', '140', '-q'])
+        self.assertEqual(20, records[-1]['episode'])
+
+    def test_save_weights(self):
+        with tempfile.TemporaryDirectory() as tempDir:
+            path = os.path.join(tempDir, 'q.weights')
+
+            # Q-values load into either backend, whichever saved them.
+            for arrayTable in ['false', 'true']:
+                games = pacman.main(['-p', 'PacmanQAgent', '-l', 'smallGrid',
+                        '--num-training', '20', '-n', '21', '--seed', '140', '--null-graphics',
+                        '-q', '--agent-args', 'arrayTable=' + arrayTable, '--save-weights', path])
+                expected = games[0].agents[0]
+
+                for loadArrayTable in ['false', 'true']:
+                    agent = BaseAgent.loadAgent('PacmanQAgent', 0, {'arrayTable': loadArrayTable})
+                    loadWeights(agent, path)
+
+                    states = list(expected.values)
+                    if (expected.qTable is not None):
+                        states = expected.qTable.getStates()
+
+                    for state in states:
+                        if (arrayTable == 'false'):
+                            state = state[0]
+
+                        for action in state.getLegalActions(0):
+                            self.assertEqual(expected.getQValue(state, action),
+                                    agent.getQValue(state, action))
+
+            # Weights round trip, with or without sparse features.
+            weightsPath = os.path.join(tempDir, 'approx.weights')
+            agentArgs = {'extractor': 'pacai.core.featureExtractors.SimpleExtractor'}
+
+            expected = BaseAgent.loadAgent('ApproximateQAgent', 0, agentArgs)
+            expected.setWeights({'bias': 1.5, 'closest-food': -2.25})
+            saveWeights(expected, weightsPath)
+
+            for sparseFeatures in ['false', 'true']:
+                agent = BaseAgent.loadAgent('ApproximateQAgent', 0,
+                        dict(agentArgs, sparseFeatures = sparseFeatures))
+                loadWeights(agent, weightsPath)
+                self.assertEqual(expected.getWeights(), agent.getWeights())
+
+            with self.assertRaises(ValueError):
+                loadWeights(BaseAgent.loadAgent('PacmanQAgent', 0), weightsPath)
+
+            # Only Q-learning agents take Q-values.
+            with self.assertRaises(ValueError):
+                loadWeights(BaseAgent.loadAgent('GreedyAgent', 0), path)
+
+            # Agents without weights are rejected before any games are played.
+            for option in ['--save-weights', '--load-weights']:
+                with self.assertRaises(ValueError):
+                    pacman.readCommand(['-p', 'GreedyAgent', '--null-graphics', option, path])
+
+            # Warm start gridworld q-learning.
+            gridPath = os.path.join(tempDir, 'grid.weights')
+            gridworld.main(['--null-graphics', '-a', 'q', '-k', '20', '-q',
+                    '--save-weights', gridPath])
+            gridworld.main(['--null-graphics', '-a', 'q', '-k', '1', '-q',
+                    '--load-weights', gridPath, '--array-table'])
@@ -0,0 +1,123 @@
+import random
+import unittest
+
+from pacai.agents.search import mcts
+from pacai.bin import capture
+from pacai.bin import pacman
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.eval import score
+from pacai.core.layout import getLayout
+from pacai.core.simulator import PacmanSimulator
+
+"""
+Test Monte Carlo tree search and its simulator.
+"""
+class MonteCarloTest(unittest.TestCase):
+    def test_simulator_matches_game(self):
+        # Without scared ghosts (which the simulator moves differently),
+        # the simulator should play exactly like the real game.
+        rng = random.Random(140)
+
+        for layoutName in ['smallClassic', 'testClassic', 'trappedClassic']:
+            for game in range(5):
+                state = PacmanGameState(getLayout(layoutName))
+                simulator = PacmanSimulator(state)
+                agentIndex = 0
+
+                while (not state.isOver()):
+                    if (any([ghost.isScared() for ghost in state.getGhostStates()])):
+                        break
+
+                    actions = state.getLegalActions(agentIndex)
+                    self.assertEqual(sorted(actions),
+                            sorted(simulator.getLegalActions(agentIndex)))
+
+                    action = rng.choice(actions)
+                    state = state.generateSuccessor(agentIndex, action)
+                    simulator.step(agentIndex, action)
+
+                    self.assertEqual(state.getScore(), simulator.getScore())
+                    self.assertEqual(state.isOver(), simulator.isOver())
+                    self.assertEqual(state.getNumFood(), simulator.getNumFood())
+
+                    if (not state.isOver()):
+                        for index in range(state.getNumAgents()):
+                            self.assertEqual(state.getAgentPosition(index),
+                                    simulator.getAgentPosition(index))
+
+                    agentIndex = (agentIndex + 1) % state.getNumAgents()
+
+    def test_search_budget(self):
+        state = PacmanGameState(getLayout('smallClassic'))
+
+        for policy in mcts.ROLLOUT_POLICIES:
+            for fast in [True, False]:
+                engine = mcts.MonteCarloTreeSearch(score, rolloutPolicy = policy,
+                        fastRollouts = fast, batchSize = 2, seed = 4)
+                action = engine.search(state, 0, iterations = 50)
+
+                self.assertIn(action, state.getLegalActions(0))
+                self.assertEqual(50, engine.getStats()['iterations'])
+                self.assertEqual(100, engine.getStats()['rollouts'])
+                self.assertEqual(100, engine.getRoot().visits)
+
+    def test_tree_reuse(self):
+        state = PacmanGameState(getLayout('smallClassic'))
+        engine = mcts.MonteCarloTreeSearch(score, seed = 4)
+
+        action = engine.search(state, 0, iterations = 200)
+
+        # Follow the most visited replies down the tree.
+        node = engine.getRoot().children[action]
+        while (node.agentIndex != 0):
+            node = max(node.children.values(), key = lambda child: child.visits)
+
+        visits = node.visits
+        engine.search(node.state, 0, iterations = 10)
+
+        self.assertIs(node, engine.getRoot())
+        self.assertEqual(visits, engine.getStats()['reusedVisits'])
+        self.assertEqual(visits + 10, node.visits)
+
+    def test_workers(self):
+        state = PacmanGameState(getLayout('smallClassic'))
+        engine = mcts.MonteCarloTreeSearch(score, batchSize = 4, numWorkers = 2, seed = 4)
+
+        try:
+            action = engine.search(state, 0, iterations = 10)
+        finally:
+            engine.close()
+
+        self.assertIn(action, state.getLegalActions(0))
+        self.assertEqual(40, engine.getStats()['rollouts'])
+
+    def test_capture(self):
+        state = capture.CaptureGameState(getLayout('tinyCapture'), 100)
+        engine = mcts.MonteCarloTreeSearch(score, seed = 4)
+
+        action = engine.search(state, 0, iterations = 30, maximizers = [0, 2])
+        self.assertIn(action, state.getLegalActions(0))
+
+    def test_capture_team(self):
+        capture.main(['--null-graphics', '-r', 'pacai.agents.search.mcts',
+                '--red-args', 'iterations=10,seed=1', '--max-moves', '20'])
+
+    def test_ghost_values(self):
+        # Classic scores are pacman's, so ghosts search for their negation.
+        state = PacmanGameState(getLayout('smallClassic'))
+
+        for seed in range(5):
+            pacmanValue = mcts.rollout(state, 1, seed, 40, True, True, frozenset([0]), True)
+            ghostValue = mcts.rollout(state, 1, seed, 40, True, True, frozenset([1]), True)
+            self.assertEqual(-pacmanValue, ghostValue)
+
+        agent = mcts.MonteCarloAgent(1, iterations = 5, seed = 1)
+        agent.registerInitialState(state)
+        self.assertIn(agent.getAction(state), state.getLegalActions(1))
+
+    def test_agent(self):
+        pacman.main(['--null-graphics', '-l', 'smallClassic', '-p', 'MonteCarloAgent',
+                '--agent-args', 'iterations=20,seed=1', '-n', '1'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import unittest
+
+from pacai.agents.learning.policy import PolicyIterationAgent
+from pacai.bin import gridworld
+from pacai.core.mdp import CompiledMDP
+from pacai.core.mdp import solveLinearSystem
+from pacai.student.valueIterationAgent import ValueIterationAgent
+
+GRID_NAMES = ['bookgrid', 'bridgegrid', 'cliffgrid', 'cliff2grid', 'discountgrid', 'mazegrid']
+
+"""
+Test planning over MDPs.
+"""
+class MDPTest(unittest.TestCase):
+    def test_compiled_mdp(self):
+        mdp = gridworld._getGridWorld('bookgrid')
+        compiled = CompiledMDP(mdp)
+
+        self.assertEqual(mdp.getStates(), compiled.getStates())
+
+        for state in mdp.getStates():
+            stateId = compiled.getStateId(state)
+            actions = [compiled.getRowAction(row) for row in compiled.getRows(stateId)]
+            self.assertEqual(list(mdp.getPossibleActions(state)), actions)
+            self.assertEqual(mdp.isTerminal(state), compiled.isTerminal(stateId))
+
+            for action in actions:
+                row = compiled.getRow(stateId, action)
+                transitions = [(compiled.getStates()[nextId], probability)
+                        for (nextId, probability, reward) in compiled.getTransitions(row)]
+                self.assertEqual(mdp.getTransitionStatesAndProbs(state, action), transitions)
+
+    def test_compiled_value_iteration(self):
+        for name in GRID_NAMES:
+            mdp = gridworld._getGridWorld(name)
+            mdp.setLivingReward(-0.1)
+
+            for iters in [0, 1, 10, 100]:
+                expected = ValueIterationAgent(0, mdp, 0.9, iters)
+                agent = ValueIterationAgent(0, mdp, 0.9, iters, compiled = True)
+
+                for state in mdp.getStates():
+                    self.assertAlmostEqual(expected.getValue(state), agent.getValue(state))
+                    self.assertEqual(expected.getPolicy(state), agent.getPolicy(state))
+
+                    for action in mdp.getPossibleActions(state):
+                        self.assertAlmostEqual(expected.getQValue(state, action),
+                                agent.getQValue(state, action))
+
+    def test_compiled_gridworld(self):
+        gridworld.main(['--null-graphics', '-a', 'value', '-i', '20', '--compiled', '-q'])
+        gridworld.main(['--null-graphics', '-a', 'value', '-i', '20', '--sweep', 'prioritized',
+                '--tolerance', '0.001', '-q'])
+
+    def test_sweep_modes(self):
+        for name in GRID_NAMES:
+            mdp = gridworld._getGridWorld(name)
+            mdp.setLivingReward(-0.1)
+
+            expected = ValueIterationAgent(0, mdp, 0.9, 1000, tolerance = 1e-6)
+            self.assertLess(expected.numSweeps, 1000)
+
+            for sweep in ['sync', 'gauss-seidel', 'prioritized']:
+                agent = ValueIterationAgent(0, mdp, 0.9, 1000, sweep = sweep, tolerance = 1e-6)
+                self.assertLessEqual(agent.numBackups, expected.numBackups)
+
+                for state in mdp.getStates():
+                    self.assertAlmostEqual(expected.getValue(state), agent.getValue(state),
+                            delta = 1e-4)
+
+        # Without a tolerance, every iteration runs.
+        mdp = gridworld._getGridWorld('bridgegrid')
+        agent = ValueIterationAgent(0, mdp, 0.9, 50, sweep = 'gauss-seidel')
+        self.assertEqual(50, agent.numSweeps)
+
+        with self.assertRaises(ValueError):
+            ValueIterationAgent(0, mdp, 0.9, 10, sweep = 'random')
+
+    def test_predecessors(self):
+        mdp = gridworld._getGridWorld('mazegrid')
+        compiled = CompiledMDP(mdp)
+
+        for stateId in range(compiled.getNumStates()):
+            for row in compiled.getRows(stateId):
+                for (nextId, probability, reward) in compiled.getTransitions(row):
+                    self.assertIn(stateId, compiled.getPredecessors(nextId))
+
+    def test_policy_iteration(self):
+        for name in GRID_NAMES:
+            mdp = gridworld._getGridWorld(name)
+            mdp.setLivingReward(-0.1)
+
+            expected = ValueIterationAgent(0, mdp, 0.9, 10000, compiled = True, tolerance = 1e-12)
+
+            exact = PolicyIterationAgent(0, mdp, gamma = 0.9)
+            modified = PolicyIterationAgent(0, mdp, gamma = 0.9, iters = 1000, evalSweeps = 5,
+                    tolerance = 1e-10)
+
+            self.assertLess(exact.numIterations, 100)
+
+            for agent in [exact, modified]:
+                for state in mdp.getStates():
+                    self.assertAlmostEqual(expected.getValue(state), agent.getValue(state))
+
+                    # The policy is greedy.
+                    action = agent.getPolicy(state)
+                    if (action is not None):
+                        self.assertAlmostEqual(agent.getValue(state),
+                                agent.getQValue(state, action))
+                        self.assertAlmostEqual(expected.getQValue(state, action),
+                                expected.getValue(state))
+
+        gridworld.main(['--null-graphics', '-a', 'policy', '-q'])
+        gridworld.main(['--null-graphics', '-a', 'policy', '--eval-sweeps', '3', '-q'])
+
+    def test_solve_linear_system(self):
+        matrix = [{0: 4.0, 1: -1.0}, {0: -1.0, 1: 4.0, 2: -1.0}, {1: -1.0, 2: 4.0}]
+        solution = solveLinearSystem(matrix, [2.0, 4.0, 10.0])
+
+        for (expected, value) in zip([1.0, 2.0, 3.0], solution):
+            self.assertAlmostEqual(expected, value)
+
+        with self.assertRaises(ValueError):
+            solveLinearSystem([{0: 1.0, 1: 1.0}, {0: 1.0, 1: 1.0}], [1.0, 2.0])
+
+    def test_gridworld_cache(self):
+        mdp = gridworld._getGridWorld('discountgrid')
+        self.assertIs(mdp.getStates(), mdp.getStates())
+
+        for (noise, livingReward) in [(0.2, 0.0), (0.0, -1.0), (0.5, 0.3)]:
+            mdp.setNoise(noise)
+            mdp.setLivingReward(livingReward)
+
+            fresh = gridworld._getGridWorld('discountgrid')
+            fresh.setNoise(noise)
+            fresh.setLivingReward(livingReward)
+
+            for state in fresh.getStates():
+                for action in fresh.getPossibleActions(state):
+                    self.assertEqual(fresh.getTransitionStatesAndProbs(state, action),
+                            mdp.getTransitionStatesAndProbs(state, action))
+
+                    for (nextState, probability) in fresh.getTransitionStatesAndProbs(state,
+                            action):
+                        self.assertEqual(fresh.getReward(state, action, nextState),
+                                mdp.getReward(state, action, nextState))
+
+        with self.assertRaises(Exception):
+            mdp.getTransitionStatesAndProbs(mdp.getStartState(), 'exit')
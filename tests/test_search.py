@@ -0,0 +1,135 @@
+import collections
+import random
+import unittest
+
+from pacai.bin import eightpuzzle
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.actions import Actions
+from pacai.core.directions import Directions
+from pacai.core import slidingpuzzle
+from pacai.core.layout import getLayout
+from pacai.core.grid import Grid
+from pacai.core.search import adjacency
+from pacai.core.search import multigoal
+from pacai.core.search.position import PositionSearchProblem
+
+"""
+Test the core search problems.
+"""
+class SearchTest(unittest.TestCase):
+    def test_eightpuzzle_solve(self):
+        random.seed(140)
+        database = slidingpuzzle.PatternDatabase(3, cacheDir = None)
+
+        for i in range(5):
+            puzzle = eightpuzzle.createRandomEightPuzzle(100)
+            path = slidingpuzzle.solve(puzzle.getPacked(), 3, database)
+
+            # The solution must be legal and optimal.
+            self.assertEqual(_puzzleDistance(puzzle), len(path))
+
+            for move in path:
+                puzzle = puzzle.result(move)
+            self.assertTrue(puzzle.isGoal())
+
+    def test_multigoal_nearest(self):
+        state = PacmanGameState(getLayout('mediumSearch'))
+        walls = state.getWalls()
+        start = state.getPacmanPosition()
+        food = state.getFood()
+
+        found = multigoal.nearestTargets(walls, start, food, k = 5)
+        self.assertEqual(5, len(found))
+
+        distances = [len(actions) for (target, actions) in found]
+        self.assertEqual(sorted(distances), distances)
+        self.assertEqual(distances[0], multigoal.nearestTargetDistance(walls, start, food))
+
+        # Following the path must land on the target.
+        for (target, actions) in found:
+            position = start
+            for action in actions:
+                position = Actions.getSuccessor(position, action)
+                self.assertFalse(walls[int(position[0])][int(position[1])])
+            self.assertEqual(target, position)
+
+        self.assertIsNone(multigoal.nearestTargetDistance(walls, start, []))
+
+    def test_position_successors(self):
+        state = PacmanGameState(getLayout('mediumMaze'))
+        walls = state.getWalls()
+
+        problem = PositionSearchProblem(state)
+        costProblem = PositionSearchProblem(state, costFn = lambda pos: pos[0])
+
+        for position in walls.asList(False):
+            expected = []
+            for action in Directions.CARDINAL:
+                dx, dy = Actions.directionToVector(action)
+                nextPosition = (int(position[0] + dx), int(position[1] + dy))
+                if (not walls[nextPosition[0]][nextPosition[1]]):
+                    expected.append((nextPosition, action))
+
+            self.assertEqual([(nextPosition, action, 1) for (nextPosition, action) in expected],
+                    problem.successorStates(position))
+            expectedCosts = [(nextPosition, action, nextPosition[0])
+                    for (nextPosition, action) in expected]
+            self.assertEqual(expectedCosts, costProblem.successorStates(position))
+
+    def test_adjacency_cache(self):
+        # Many different walls (e.g. random capture layouts) don't grow the cache without bound.
+        for width in range(1, 2 * adjacency.ADJACENCY_CACHE_SIZE + 1):
+            walls = Grid(width, 3)
+            self.assertEqual(3 * width, len(adjacency.getAdjacency(walls)))
+
+        self.assertEqual(adjacency.ADJACENCY_CACHE_SIZE, len(adjacency._cache))
+
+    def test_visit_history(self):
+        state = PacmanGameState(getLayout('mediumMaze'))
+        problem = PositionSearchProblem(state)
+
+        start = problem.startingState()
+        for (successor, action, cost) in problem.successorStates(start):
+            problem.successorStates(successor)
+        problem.successorStates(start)
+
+        history = problem.getVisitHistory()
+        self.assertEqual(start, history[0])
+        self.assertEqual(len(set(history)), len(history))
+        self.assertEqual(2, len(problem.getVisitHistory(2)))
+        self.assertEqual(history[0], problem.getVisitHistory(2)[0])
+
+        # Problems may still append (x, y) visits themselves.
+        problem._visitHistory.append((1, 1))
+        self.assertEqual((1, 1), problem.getVisitHistory()[-1])
+        self.assertEqual(2, len(problem.getVisitHistory(2)))
+
+    def test_visit_history_disabled(self):
+        state = PacmanGameState(getLayout('mediumMaze'))
+        problem = PositionSearchProblem(state)
+        problem.setRecordVisits(False)
+
+        problem.successorStates(problem.startingState())
+
+        self.assertEqual(1, problem.getExpandedCount())
+        self.assertEqual([], problem.getVisitHistory())
+
+def _puzzleDistance(puzzle):
+    distances = {puzzle: 0}
+    queue = collections.deque([puzzle])
+
+    while (len(queue) > 0):
+        current = queue.popleft()
+        if (current.isGoal()):
+            return distances[current]
+
+        for move in current.legalMoves():
+            successor = current.result(move)
+            if (successor not in distances):
+                distances[successor] = distances[current] + 1
+                queue.append(successor)
+
+    return None
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 
+from pacai.util import lru
 from pacai.util import priorityQueue
 from pacai.util import queue
 from pacai.util import stack
@@ -22,6 +23,20 @@ class UtilContainersTest(unittest.TestCase):
         for val in val_list:
             self.assertEqual(val, testQueue.pop())
 
+    def test_lru(self):
+        cache = lru.LRUCache(2)
+
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(1, cache.get('a'))
+
+        # 'b' is now the least recently used.
+        cache.put('c', 3)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+
     def test_stack(self):
         testStack = stack.Stack()
         self.assertTrue(testStack.isEmpty())